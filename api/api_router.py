@@ -13,6 +13,12 @@ from .views import (
     KPIView,
     ScheduleView,
     TraiteView,
+    TraiteFeedView,
+    ForecastView,
+    ChartSeriesView,
+    TransactionJournalView,
+    PeriodCompareView,
+    QueryBudgetView,
     PeriodView
 )
 from .installments_views import PlanTraiteViewSet, TraiteViewSet
@@ -30,6 +36,7 @@ from .cd_views import CdViewSet
 from .facture_views import CommandeProduitViewSet,LineCommandeViewSet,FactureViewSet,PaymentComptantViewSet
 
 from . import dashboard_views
+from . import async_views
 # from .views import MatierePremiereAchatViewSet
 # from .views import FactureAchatMatiereViewSet
 # from .views import BonLivraisonMatiereViewSet
@@ -151,10 +158,48 @@ urlpatterns = [
         BonRetourFournisseurStatsView.as_view(),
         name="bons-retour-fournisseur-stats",
     ),
-    path("api/kpis/", KPIView.as_view()),
+    path("api/kpis/", KPIView.as_view(), name="kpis"),
     path("api/schedule/", ScheduleView.as_view(), name="schedule"),
     path("api/tresorerietraites/", TraiteView.as_view(), name="traites"),
+    path("api/tresorerietraites/feed/", TraiteFeedView.as_view(), name="traites-feed"),
     path('api/period/', PeriodView.as_view(), name="period"),
+    path("api/period/compare/", PeriodCompareView.as_view(), name="period-compare"),
+    path("api/forecast/", ForecastView.as_view(), name="forecast"),
+    path("api/chart/", ChartSeriesView.as_view(), name="chart-series"),
+    path("api/transactions/", TransactionJournalView.as_view(), name="transactions"),
+    path("api/query-budget/", QueryBudgetView.as_view(), name="query-budget"),
+    # Async (ASGI) variants of the read-only reporting endpoints
+    path("api/async/kpis/", async_views.kpis, name="async-kpis"),
+    path("api/async/period/", async_views.period, name="async-period"),
+    path("api/async/tresorerietraites/", async_views.traites, name="async-traites"),
+    path("api/async/schedule/", async_views.schedule, name="async-schedule"),
+    path("api/async/dashboard/counts/", async_views.global_counts, name="async-dashboard-counts"),
+    path(
+        "api/async/dashboard/financial-summary/",
+        async_views.financial_summary,
+        name="async-dashboard-financial-summary",
+    ),
+    path("api/async/dashboard/devis-status/", async_views.devis_status_counts, name="async-dashboard-devis-status"),
+    path(
+        "api/async/dashboard/commande-status/",
+        async_views.commande_status_counts,
+        name="async-dashboard-commande-status",
+    ),
+    path(
+        "api/async/dashboard/recent-commandes/",
+        async_views.recent_commandes,
+        name="async-dashboard-recent-commandes",
+    ),
+    path(
+        "api/async/dashboard/recent-factures/",
+        async_views.recent_factures,
+        name="async-dashboard-recent-factures",
+    ),
+    path(
+        "api/async/dashboard/main-insights/",
+        async_views.main_dashboard_insights,
+        name="async-dashboard-main-insights",
+    ),
 ]
 
 app_name = "api"
\ No newline at end of file
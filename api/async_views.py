@@ -0,0 +1,190 @@
+"""
+Async (ASGI) variants of the read-only reporting endpoints, under api/async/.
+Same payloads and cache entries as the DRF views. The treasury services run
+through sync_to_async, the dashboard aggregates use the async ORM.
+"""
+import asyncio
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Sum, Q
+from django.http import JsonResponse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Client, Produit, FactureProduits, Devis, Commande, Fournisseur, Employe
+from .commande_serializers import CommandeListSerializer
+from .services.cache_service import aget_or_serve_stale
+from .services.chart_data import compute_chart_data
+from .services.kpi_service import compute_kpis
+from .services.period_service import build_period_summary
+from .services.precompute_service import EVOLUTION_WINDOWS, PERIODS
+from .services.schedule_service import get_schedule
+from .services.traite_service import get_all_traites
+from .utils.conditional import aconditional_on_data_version
+from .utils.dates import get_period_range
+from .views import ScheduleView
+
+
+def json_response(data, status=200):
+    # DRF encoder: same JSON as the synchronous views
+    return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+async def get_user(request):
+    """User of the DRF token in the Authorization header, else None (token only, as in REST_FRAMEWORK)."""
+    try:
+        result = await sync_to_async(TokenAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def async_api_view(authenticated=True):
+    """GET only async view; authenticated mirrors the IsAuthenticated permission."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                return json_response({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+            if authenticated and await get_user(request) is None:
+                return json_response({"detail": "Authentication credentials were not provided."}, status=401)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Tresorerie
+
+@async_api_view()
+@aconditional_on_data_version
+async def kpis(request):
+    evolution_weeks = request.GET.get("evolution_weeks", "30d")
+    if evolution_weeks not in EVOLUTION_WINDOWS:
+        return json_response({"message": f"Fenêtre invalide: {evolution_weeks}"}, status=400)
+    data = await aget_or_serve_stale(
+        "kpis", lambda: sync_to_async(compute_kpis)(evolution_weeks), evolution_weeks
+    )
+    return json_response(data)
+
+
+@async_api_view(authenticated=False)
+@aconditional_on_data_version
+async def period(request):
+    period = request.GET.get("period", "week")
+    if period not in PERIODS:
+        return json_response({"message": f"Période invalide: {period}"}, status=400)
+
+    async def compute():
+        range_func, label = get_period_range(period)
+        start_date, end_date = range_func()
+        kpi_data, traites, chart_data = await asyncio.gather(
+            sync_to_async(compute_kpis)(evolution_weeks=4, range_func=range_func),
+            sync_to_async(get_all_traites)(range_func=range_func, globally=False),
+            sync_to_async(compute_chart_data)(start_date, end_date, label, period),
+        )
+        return build_period_summary(period, kpi_data, traites, chart_data)
+
+    return json_response(await aget_or_serve_stale("period", compute, period))
+
+
+@async_api_view()
+@aconditional_on_data_version
+async def traites(request):
+    return json_response(await aget_or_serve_stale("traites", sync_to_async(get_all_traites)))
+
+
+@async_api_view()
+async def schedule(request):
+    try:
+        params = ScheduleView.parse_params(request.GET)
+    except ValueError as e:
+        return json_response({"message": str(e)}, status=400)
+    return json_response(await sync_to_async(get_schedule)(**params))
+
+
+# Dashboard
+
+async def count_all(models):
+    counts = await asyncio.gather(*(model.objects.acount() for model in models.values()))
+    return dict(zip(models, counts))
+
+
+async def get_financials():
+    totals = await FactureProduits.objects.aaggregate(
+        total_invoiced_ttc=Sum("montant_ttc"),
+        total_paid_ttc=Sum("montant_ttc", filter=Q(statut="paid")),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+async def get_status_counts(model):
+    return [
+        row async for row in model.objects.values("statut").annotate(count=Count("statut")).order_by("statut")
+    ]
+
+
+@async_api_view(authenticated=False)
+async def global_counts(request):
+    return json_response(await count_all({
+        "total_clients": Client,
+        "total_produits": Produit,
+        "total_devis": Devis,
+        "total_commandes": Commande,
+        "total_factures_travaux": FactureProduits,
+        "total_fournisseurs": Fournisseur,
+        "total_employees": Employe,
+    }))
+
+
+@async_api_view(authenticated=False)
+async def financial_summary(request):
+    return json_response(await get_financials())
+
+
+@async_api_view(authenticated=False)
+async def devis_status_counts(request):
+    return json_response(await get_status_counts(Devis))
+
+
+@async_api_view(authenticated=False)
+async def commande_status_counts(request):
+    return json_response(await get_status_counts(Commande))
+
+
+@async_api_view(authenticated=False)
+async def recent_commandes(request):
+    commandes = Commande.objects.order_by("-date_creation")[:5]
+    return json_response(await sync_to_async(lambda: CommandeListSerializer(commandes, many=True).data)())
+
+
+@async_api_view(authenticated=False)
+async def recent_factures(request):
+    from .invoice_serializers import FactureProduitsSerializer
+
+    factures = FactureProduits.objects.order_by("-date_creation")[:5]
+    return json_response(await sync_to_async(lambda: FactureProduitsSerializer(factures, many=True).data)())
+
+
+@async_api_view(authenticated=False)
+async def main_dashboard_insights(request):
+    counts, financials, devis_by_status, commandes_by_status = await asyncio.gather(
+        count_all({
+            "clients": Client,
+            "produits": Produit,
+            "devis": Devis,
+            "commandes": Commande,
+            "factures_produits": FactureProduits,
+            "fournisseurs": Fournisseur,
+            "employees": Employe,
+        }),
+        get_financials(),
+        get_status_counts(Devis),
+        get_status_counts(Commande),
+    )
+    return json_response({
+        "counts": counts,
+        "financials": financials,
+        "devis_by_status": devis_by_status,
+        "commandes_by_status": commandes_by_status,
+    })
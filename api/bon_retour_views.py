@@ -5,6 +5,7 @@ from rest_framework.viewsets import ModelViewSet
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.shortcuts import get_object_or_404
 
+from .utils.conditional import ConditionalGetMixin
 from .models import BonRetour, Client, Produit
 from .bon_retour_serializers import (
     BonRetourSerializer,
@@ -13,7 +14,7 @@ from .bon_retour_serializers import (
 )
 
 
-class BonRetourViewSet(ModelViewSet):
+class BonRetourViewSet(ConditionalGetMixin, ModelViewSet):
     """ViewSet for BonRetour with full CRUD operations"""
 
     queryset = BonRetour.objects.select_related("client").prefetch_related(
@@ -1,9 +1,13 @@
+import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
 from django.utils import timezone
 
+from .services.stock_service import InsufficientStockError, reserve_stock
+from .utils.conditional import ConditionalGetMixin
+from .utils.totals import defer_totals, update_totals
 from .models import Cd, PdC, Client, FactureProduits
 from .pdc_serializers import (
     CdListSerializer,
@@ -13,8 +17,41 @@ from .pdc_serializers import (
     CdGenerateInvoiceSerializer,
 )
 
+logger = logging.getLogger(__name__)
 
-class CdViewSet(viewsets.ModelViewSet):
+
+def get_valid_lignes(produits_data):
+    """validated_data of the valid lines; the invalid ones are skipped."""
+    lignes = []
+    for produit_data in produits_data:
+        produit_serializer = CdPSerializer(data=produit_data)
+        if produit_serializer.is_valid():
+            lignes.append(produit_serializer.validated_data)
+        else:
+            logger.warning("Produit invalide: %s", produit_serializer.errors)
+    return lignes
+
+
+def create_pdc(commande, data):
+    return PdC.objects.create(
+        cd=commande,
+        produit=data["produit"],
+        quantite=data["quantite"],
+        prix_unitaire=data.get("prix_unitaire"),
+        remise_pourcentage=data.get("remise_pourcentage", 0),
+        bon_id=data.get("bon_id"),
+        bon_numero=data.get("bon_numero"),
+    )
+
+
+def stock_error_response(error):
+    return Response(
+        {"message": "Stock insuffisant", "errors": error.errors},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
+
+class CdViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing orders (commande)
     """
@@ -41,64 +78,37 @@ class CdViewSet(viewsets.ModelViewSet):
         return CDetailSerializer
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        print("📦 Incoming request data:")
-        print(request.data)
+        logger.debug("Incoming request data: %s", request.data)
         if not serializer.is_valid():
-            print("❌ Validation errors:")
-            print(serializer.errors)
+            logger.warning("Validation errors: %s", serializer.errors)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         bon_ids = request.data.get("bons", [])
-        print("Received bons:", bon_ids)
-
-        with transaction.atomic():
-            commande = serializer.save()
-
-            # Link bons (FactureProduits) to the commande
-            if bon_ids:
-                bons = FactureProduits.objects.filter(id__in=bon_ids)
-                commande.bons.set(bons)
-                print("Bons liés à la commande:", list(bons.values_list("id", flat=True)))
-            else:
-                print("Aucun bon valide reçu")
-
-            # 🔹 Handle produits + decrease stock
-            if "produits" in request.data and isinstance(request.data["produits"], list):
-                for produit_data in request.data["produits"]:
-                    produit_serializer = CdPSerializer(data=produit_data)
-                    if produit_serializer.is_valid():
-                        produit = produit_serializer.validated_data["produit"]
-                        quantite = produit_serializer.validated_data["quantite"]
-
-                        # Check stock
-                        if produit.stock < quantite:
-                            raise ValidationError(
-                                f"Not enough stock for produit {produit.nom_produit}. "
-                                f"Available: {produit.stock}, requested: {quantite}"
-                            )
-
-                        # Create PdC (Produit de Commande)
-                        PdC.objects.create(
-                            cd=commande,
-                            produit=produit,
-                            quantite=quantite,
-                            prix_unitaire=produit_serializer.validated_data.get("prix_unitaire"),
-                            remise_pourcentage=produit_serializer.validated_data.get("remise_pourcentage", 0),
-                            bon_id=produit_serializer.validated_data.get("bon_id"),
-                            bon_numero=produit_serializer.validated_data.get("bon_numero"),
-                        )
-
-                        # 🔹 Decrease stock
-                        produit.stock -= quantite
-                        produit.save(update_fields=["stock"])
-
-                        print(f"✅ Stock updated for {produit.nom_produit}: -{quantite}, remaining {produit.stock}")
-
-                    else:
-                        print(f"Produit invalide: {produit_serializer.errors}")
-
-            commande.calculate_totals()
-            commande.save()
+        logger.debug("Received bons: %s", bon_ids)
+
+        try:
+            with transaction.atomic(), defer_totals():
+                commande = serializer.save()
+
+                # Link bons (FactureProduits) to the commande
+                if bon_ids:
+                    bons = FactureProduits.objects.filter(id__in=bon_ids)
+                    commande.bons.set(bons)
+                    logger.debug("Bons liés à la commande %s: %s", commande.id, bon_ids)
+                else:
+                    logger.debug("Aucun bon valide reçu")
+
+                # 🔹 Handle produits + decrease stock (all lines at once)
+                lignes = []
+                if "produits" in request.data and isinstance(request.data["produits"], list):
+                    lignes = get_valid_lignes(request.data["produits"])
+                reserve_stock([(data["produit"], data["quantite"]) for data in lignes])
+                for data in lignes:
+                    create_pdc(commande, data)
+
+                update_totals(commande)
+        except InsufficientStockError as e:
+            return stock_error_response(e)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -108,7 +118,7 @@ class CdViewSet(viewsets.ModelViewSet):
         serializer = CdPSerializer(data=request.data)
 
         if serializer.is_valid():
-            with transaction.atomic():
+            with transaction.atomic(), defer_totals():
                 # Check if product already exists in commande
                 produit = serializer.validated_data["produit"]
                 bon_id = serializer.validated_data.get("bonId") 
@@ -141,8 +151,7 @@ class CdViewSet(viewsets.ModelViewSet):
                     produit_commande.save()
 
                 # Recalculate commande totals
-                commande.calculate_totals()
-                commande.save()
+                update_totals(commande)
 
                 return Response(PdCSerializer(produit_commande).data)
 
@@ -179,12 +188,9 @@ class CdViewSet(viewsets.ModelViewSet):
                     }
                     for p in existing_products
                 ]
-                print(f"Commande {commande.id} details:")
-                print(f"  - Numero: {commande.numero_commande}")
-                print(f"  - Client: {commande.client.nom_client}")
-                print(f"  - Existing products: {existing_product_details}")
-                print(
-                    f"  - Looking for product ID: {produit_id} (type: {type(produit_id)})"
+                logger.debug(
+                    "Commande %s (%s): existing products %s, looking for product ID %r",
+                    commande.id, commande.numero_commande, existing_product_details, produit_id,
                 )
 
                 # Convert produit_id to int if it's a string
@@ -197,14 +203,10 @@ class CdViewSet(viewsets.ModelViewSet):
                     )
 
                 produit_commande = PdC.objects.get(cd=commande, produit_id=produit_id)
-                print(
-                    f"Found PdC record: {produit_commande.id} for product {produit_commande.produit.nom_produit}"
-                )
+                logger.debug("Found PdC record: %s for product %s", produit_commande.id, produit_id)
 
                 produit_commande.delete()
-                print(
-                    f"Successfully deleted product {produit_id} from commande {commande.id}"
-                )
+                logger.info("Deleted product %s from commande %s", produit_id, commande.id)
 
                 # Recalculate commande totals
                 commande.calculate_totals()
@@ -231,7 +233,7 @@ class CdViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
         except Exception as e:
-            print(f"Unexpected error in remove_product: {str(e)}")
+            logger.exception("Unexpected error in remove_product: %s", e)
             return Response(
                 {"error": f"Unexpected error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -348,58 +350,32 @@ class CdViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         produits_data = request.data.get("produit_commande", [])
-        print(produits_data)
-
-        with transaction.atomic():
-            # 🔹 Restore stock for existing PdC before deleting
-            old_pdcs = PdC.objects.filter(cd=instance)
-            for old_pdc in old_pdcs:
-                produit = old_pdc.produit
-                produit.stock += old_pdc.quantite
-                produit.save(update_fields=["stock"])
-                print(f"♻️ Restored {old_pdc.quantite} to stock of {produit.nom_produit}")
-
-            # Remove old product links
-            old_pdcs.delete()
-
-            # Update the commande instance
-            commande = serializer.save()
-
-            # 🔹 Insert new PdC and decrease stock
-            for produit_data in produits_data:
-                produit_serializer = CdPSerializer(data=produit_data)
-                if produit_serializer.is_valid():
-                    produit = produit_serializer.validated_data["produit"]
-                    quantite = produit_serializer.validated_data["quantite"]
-
-                    # Check stock
-                    if produit.stock < quantite:
-                        raise ValidationError(
-                            f"Not enough stock for produit {produit.nom_produit}. "
-                            f"Available: {produit.stock}, requested: {quantite}"
-                        )
-
-                    # Create new PdC
-                    PdC.objects.create(
-                        cd=commande,
-                        produit=produit,
-                        quantite=quantite,
-                        prix_unitaire=produit_serializer.validated_data.get("prix_unitaire"),
-                        remise_pourcentage=produit_serializer.validated_data.get("remise_pourcentage", 0),
-                        bon_id=produit_serializer.validated_data.get("bon_id"),
-                        bon_numero=produit_serializer.validated_data.get("bon_numero"),
-                    )
+        logger.debug("Produits: %s", produits_data)
 
-                    # Decrease stock
-                    produit.stock -= quantite
-                    produit.save(update_fields=["stock"])
-                    print(f"✅ Stock updated for {produit.nom_produit}: -{quantite}, remaining {produit.stock}")
-                else:
-                    print(f"Produit invalide: {produit_serializer.errors}")
+        try:
+            with transaction.atomic(), defer_totals():
+                # 🔹 Stock: the old lines are given back and the new ones taken in one statement
+                old_pdcs = PdC.objects.filter(cd=instance)
+                lignes = get_valid_lignes(produits_data)
+                reserve_stock(
+                    [(data["produit"], data["quantite"]) for data in lignes],
+                    released=old_pdcs.values_list("produit_id", "quantite"),
+                )
+
+                # Remove old product links
+                old_pdcs.delete()
 
-            # Recalculate totals
-            commande.calculate_totals()
-            commande.save()
+                # Update the commande instance
+                commande = serializer.save()
+
+                # 🔹 Insert new PdC
+                for data in lignes:
+                    create_pdc(commande, data)
+
+                # Recalculate totals
+                update_totals(commande)
+        except InsufficientStockError as e:
+            return stock_error_response(e)
 
         return Response(self.get_serializer(commande).data)
 
@@ -409,34 +385,24 @@ class CdViewSet(viewsets.ModelViewSet):
         """
         Restore a logically deleted invoice/commande
         """
-        print(f"🔄 Attempting to restore Cd with ID: {pk}")
+        logger.debug("Attempting to restore Cd with ID: %s", pk)
         
         try:
             # First, let's check if the object exists at all (including deleted ones)
             try:
                 commande = Cd.objects.get(pk=pk)
-                print(f"✅ Found Cd object: ID={commande.id}, is_deleted={commande.is_deleted}, nature={getattr(commande, 'nature', 'N/A')}")
+                logger.debug("Found Cd object: ID=%s, is_deleted=%s, nature=%s", commande.id, commande.is_deleted, commande.nature)
             except Cd.DoesNotExist:
-                print(f"❌ No Cd object found with ID: {pk}")
-                # Let's see what IDs actually exist
-                existing_ids = list(Cd.objects.all().values_list('id', flat=True))
-                deleted_ids = list(Cd.objects.filter(is_deleted=True).values_list('id', flat=True))
-                print(f"📊 All existing Cd IDs: {existing_ids}")
-                print(f"🗑️ Deleted Cd IDs: {deleted_ids}")
+                logger.warning("No Cd object found with ID: %s", pk)
                 
                 return Response(
-                    {
-                        "error": f"No Cd object found with ID {pk}",
-                        "existing_ids": existing_ids[:10],  # Show first 10 for debugging
-                        "deleted_ids": deleted_ids[:10],
-                        "total_records": len(existing_ids)
-                    },
+                    {"error": f"No Cd object found with ID {pk}"},
                     status=status.HTTP_404_NOT_FOUND,
                 )
             
             # Check if it's actually deleted
             if not commande.is_deleted:
-                print(f"⚠️ Warning: Cd {pk} is not marked as deleted (is_deleted={commande.is_deleted})")
+                logger.warning("Cd %s is not marked as deleted, cannot restore", pk)
                 return Response(
                     {
                         "error": f"Cd {pk} is not deleted and cannot be restored",
@@ -445,20 +411,18 @@ class CdViewSet(viewsets.ModelViewSet):
                     },
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            with transaction.atomic():
-                # 🔹 Restore stock from all linked PdC
-                pdcs = PdC.objects.filter(cd=commande)
-                for pdc in pdcs:
-                    produit = pdc.produit
-                    produit.stock -= pdc.quantite
-                    produit.save(update_fields=["stock"])
-                    print(f"♻️ Restored {pdc.quantite} to stock of {produit.nom_produit}")
-
-            # Restore the record
-            commande.is_deleted = False
-            commande.save()
+            try:
+                with transaction.atomic():
+                    # 🔹 Take the stock of all linked PdC again
+                    reserve_stock(PdC.objects.filter(cd=commande).values_list("produit_id", "quantite"))
+
+                    # Restore the record
+                    commande.is_deleted = False
+                    commande.save()
+            except InsufficientStockError as e:
+                return stock_error_response(e)
             
-            print(f"✅ Successfully restored Cd {pk}")
+            logger.info("Restored Cd %s", pk)
             
             return Response(
                 {
@@ -472,9 +436,7 @@ class CdViewSet(viewsets.ModelViewSet):
             )
             
         except Exception as e:
-            print(f"❌ Unexpected error in restore: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Unexpected error in restore: %s", e)
             
             return Response(
                 {
@@ -490,7 +452,7 @@ class CdViewSet(viewsets.ModelViewSet):
         """
         Soft delete a commande/invoice and restore stock
         """
-        print(f"🗑️ Attempting to soft delete Cd with ID: {pk}")
+        logger.debug("Attempting to soft delete Cd with ID: %s", pk)
 
         try:
             commande = self.get_object()
@@ -503,18 +465,13 @@ class CdViewSet(viewsets.ModelViewSet):
 
             with transaction.atomic():
                 # 🔹 Restore stock from all linked PdC
-                pdcs = PdC.objects.filter(cd=commande)
-                for pdc in pdcs:
-                    produit = pdc.produit
-                    produit.stock += pdc.quantite
-                    produit.save(update_fields=["stock"])
-                    print(f"♻️ Restored {pdc.quantite} to stock of {produit.nom_produit}")
+                reserve_stock([], released=PdC.objects.filter(cd=commande).values_list("produit_id", "quantite"))
 
                 # 🔹 Mark commande as deleted
                 commande.is_deleted = True
                 commande.save(update_fields=["is_deleted"])
 
-            print(f"✅ Successfully soft deleted Cd {pk}")
+            logger.info("Soft deleted Cd %s", pk)
 
             return Response(
                 {
@@ -531,7 +488,7 @@ class CdViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            print(f"❌ Unexpected error in delete_logically: {str(e)}")
+            logger.exception("Unexpected error in delete_logically: %s", e)
             return Response(
                 {"error": f"Unexpected error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -599,7 +556,7 @@ class CdViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
         except Exception as e:
-            print(f"❌ Erreur inattendue dans delete_permanently: {str(e)}")
+            logger.exception("Erreur inattendue dans delete_permanently: %s", e)
             return Response(
                 {"error": f"Erreur serveur: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
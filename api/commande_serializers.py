@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .utils.totals import defer_totals
 from .models import Commande, ProduitCommande, Produit
 
 
@@ -132,19 +133,20 @@ class CommandeDetailSerializer(serializers.ModelSerializer):
             **validated_data
         )
 
-        for produit_data in produits_data:
-            ProduitCommande.objects.create(
-                commande=commande,
-                produit=produit_data["produit"],
-                quantite=produit_data["quantite"],
-                prix_unitaire=produit_data.get("prix_unitaire"),
-                remise_pourcentage=produit_data.get("remise_pourcentage", 0),
-                prix_total=(
-                    produit_data["quantite"]
-                    * produit_data["prix_unitaire"]
-                    * (1 - produit_data.get("remise_pourcentage", 0) / 100)
-                ),
-            )
+        with defer_totals():
+            for produit_data in produits_data:
+                ProduitCommande.objects.create(
+                    commande=commande,
+                    produit=produit_data["produit"],
+                    quantite=produit_data["quantite"],
+                    prix_unitaire=produit_data.get("prix_unitaire"),
+                    remise_pourcentage=produit_data.get("remise_pourcentage", 0),
+                    prix_total=(
+                        produit_data["quantite"]
+                        * produit_data["prix_unitaire"]
+                        * (1 - produit_data.get("remise_pourcentage", 0) / 100)
+                    ),
+                )
 
         return commande
 
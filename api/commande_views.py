@@ -1,9 +1,12 @@
+import logging
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
 from django.utils import timezone
 
+from .utils.conditional import ConditionalGetMixin
+from .utils.totals import defer_totals, update_totals
 from .models import Commande, ProduitCommande, Client
 from .commande_serializers import (
     CommandeListSerializer,
@@ -13,8 +16,10 @@ from .commande_serializers import (
     CommandeGenerateInvoiceSerializer,
 )
 
+logger = logging.getLogger(__name__)
 
-class CommandeViewSet(viewsets.ModelViewSet):
+
+class CommandeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing orders (commande)
     """
@@ -36,28 +41,27 @@ class CommandeViewSet(viewsets.ModelViewSet):
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        print(request.data)
-        with transaction.atomic():
-         commande = serializer.save()
-
-        # Ajout des produits
-        if "produits" in request.data and isinstance(request.data["produits"], list):
-             for produit_data in request.data["produits"]:
-                produit_serializer = CommandeProduitSerializer(data=produit_data)
-                if produit_serializer.is_valid():
-                    ProduitCommande.objects.create(
-                        commande=commande,
-                        produit=produit_serializer.validated_data["produit"],
-                        quantite=produit_serializer.validated_data["quantite"],
-                        prix_unitaire=produit_serializer.validated_data.get("prix_unitaire"),
-                        remise_pourcentage=produit_serializer.validated_data.get("remise_pourcentage", 0),
-                    )
-                else:
-                    print(f"Invalid product data: {produit_serializer.errors}")
-
-        # Mise à jour des totaux
-        commande.calculate_totals()
-        commande.save()
+        logger.debug("Incoming request data: %s", request.data)
+        with transaction.atomic(), defer_totals():
+            commande = serializer.save()
+
+            # Ajout des produits
+            if "produits" in request.data and isinstance(request.data["produits"], list):
+                for produit_data in request.data["produits"]:
+                    produit_serializer = CommandeProduitSerializer(data=produit_data)
+                    if produit_serializer.is_valid():
+                        ProduitCommande.objects.create(
+                            commande=commande,
+                            produit=produit_serializer.validated_data["produit"],
+                            quantite=produit_serializer.validated_data["quantite"],
+                            prix_unitaire=produit_serializer.validated_data.get("prix_unitaire"),
+                            remise_pourcentage=produit_serializer.validated_data.get("remise_pourcentage", 0),
+                        )
+                    else:
+                        logger.warning("Produit invalide: %s", produit_serializer.errors)
+
+            # Mise à jour des totaux, une seule fois pour toutes les lignes
+            update_totals(commande)
 
         updated_serializer = self.get_serializer(commande)
 
@@ -70,7 +74,7 @@ class CommandeViewSet(viewsets.ModelViewSet):
         serializer = CommandeProduitSerializer(data=request.data)
 
         if serializer.is_valid():
-            with transaction.atomic():
+            with transaction.atomic(), defer_totals():
                 # Check if product already exists in commande
                 produit = serializer.validated_data["produit"]
                 produit_commande, created = ProduitCommande.objects.get_or_create(
@@ -99,8 +103,7 @@ class CommandeViewSet(viewsets.ModelViewSet):
                     produit_commande.save()
 
                 # Recalculate commande totals
-                commande.calculate_totals()
-                commande.save()
+                update_totals(commande)
 
                 return Response(ProduitCommandeSerializer(produit_commande).data)
 
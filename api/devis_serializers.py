@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .utils.totals import defer_totals, update_totals
 from .models import Devis, ProduitDevis, Produit, Client
 
 
@@ -137,17 +138,17 @@ class DevisDetailSerializer(serializers.ModelSerializer):
             # Supprimer les anciens produits
             instance.produit_devis.all().delete()
             produits_data = self._group_products(produits_data)
-            # Ajouter les nouveaux produits
-            for prod in produits_data:
-                ProduitDevis.objects.create(
-                    devis=instance,
-                    produit=prod["produit"],
-                    quantite=prod["quantite"],
-                    prix_unitaire=prod.get("prix_unitaire"),
-                    remise_pourcentage=prod.get("remise_pourcentage", 0),
-                )
-            instance.calculate_totals()
-            instance.save()
+            # Ajouter les nouveaux produits, totaux recalculés une seule fois
+            with defer_totals():
+                for prod in produits_data:
+                    ProduitDevis.objects.create(
+                        devis=instance,
+                        produit=prod["produit"],
+                        quantite=prod["quantite"],
+                        prix_unitaire=prod.get("prix_unitaire"),
+                        remise_pourcentage=prod.get("remise_pourcentage", 0),
+                    )
+                update_totals(instance)
         return instance
 
     def create(self, validated_data):
@@ -155,16 +156,16 @@ class DevisDetailSerializer(serializers.ModelSerializer):
         devis = Devis.objects.create(**validated_data)
         if produits_data:
             produits_data = self._group_products(produits_data)
-            for prod in produits_data:
-                ProduitDevis.objects.create(
-                    devis=devis,
-                    produit=prod["produit"],
-                    quantite=prod["quantite"],
-                    prix_unitaire=prod.get("prix_unitaire"),
-                    remise_pourcentage=prod.get("remise_pourcentage", 0),
-                )
-            devis.calculate_totals()
-            devis.save()
+            with defer_totals():
+                for prod in produits_data:
+                    ProduitDevis.objects.create(
+                        devis=devis,
+                        produit=prod["produit"],
+                        quantite=prod["quantite"],
+                        prix_unitaire=prod.get("prix_unitaire"),
+                        remise_pourcentage=prod.get("remise_pourcentage", 0),
+                    )
+                update_totals(devis)
         return devis
 
 
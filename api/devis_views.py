@@ -4,6 +4,8 @@ from rest_framework.response import Response
 from django.db import transaction
 from django.utils import timezone
 
+from .utils.conditional import ConditionalGetMixin
+from .utils.totals import defer_totals, update_totals
 from .models import Devis, ProduitDevis, Client
 from .devis_serializers import (
     DevisListSerializer,
@@ -14,7 +16,7 @@ from .devis_serializers import (
 )
 
 
-class DevisViewSet(viewsets.ModelViewSet):
+class DevisViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing quotes (devis)
     """
@@ -51,7 +53,7 @@ class DevisViewSet(viewsets.ModelViewSet):
         serializer = DevisProduitSerializer(data=request.data)
 
         if serializer.is_valid():
-            with transaction.atomic():
+            with transaction.atomic(), defer_totals():
                 produit = serializer.validated_data["produit"]
                 produit_devis, created = ProduitDevis.objects.get_or_create(
                     devis=devis,
@@ -71,8 +73,7 @@ class DevisViewSet(viewsets.ModelViewSet):
                         produit_devis.remise_pourcentage = serializer.validated_data["remise_pourcentage"]
                     produit_devis.save()
 
-                devis.calculate_totals()
-                devis.save()
+                update_totals(devis)
 
                 return Response(ProduitDevisSerializer(produit_devis).data)
 
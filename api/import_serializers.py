@@ -0,0 +1,63 @@
+from rest_framework import serializers
+from .models import Client, Produit, validate_matricule_fiscal
+
+
+class ProduitImportSerializer(serializers.ModelSerializer):
+    """
+    One row of the product import. Categories are given by name and the
+    uniqueness of ref_produit is checked for the whole file, so validating a
+    row runs no query.
+    """
+
+    categorie = serializers.CharField(required=False)
+    sous_categorie = serializers.CharField(required=False)
+
+    class Meta:
+        model = Produit
+        fields = [
+            "nom_produit",
+            "ref_produit",
+            "categorie",
+            "sous_categorie",
+            "materiau",
+            "fournisseur",
+            "stock",
+            "seuil_alerte",
+            "unite_mesure",
+            "statut",
+            "code_barres",
+            "emplacement",
+            "prix_achat",
+            "prix_unitaire",
+            "description",
+        ]
+        extra_kwargs = {
+            "ref_produit": {"required": False, "validators": []},
+        }
+
+
+class ClientImportSerializer(serializers.ModelSerializer):
+    """
+    One row of the client import. The uniqueness of numero_fiscal is checked
+    for the whole file and code_client is allocated, so validating a row
+    runs no query.
+    """
+
+    class Meta:
+        model = Client
+        fields = [
+            "nom_client",
+            "numero_fiscal",
+            "adresse",
+            "telephone",
+            "nom_responsable",
+            "email",
+            "email_responsable",
+            "telephone_responsable",
+            "autre_numero",
+            "informations_complementaires",
+            "nom_raison_sociale",
+        ]
+        extra_kwargs = {
+            "numero_fiscal": {"validators": [validate_matricule_fiscal]},
+        }
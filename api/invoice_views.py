@@ -7,6 +7,7 @@ from django.db import transaction
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from .utils.conditional import ConditionalGetMixin
 from .models import FactureProduits, Traveaux, Client
 from .invoice_serializers import (
     FactureProduitsSerializer,
@@ -14,7 +15,7 @@ from .invoice_serializers import (
 )
 
 
-class FactureProduitsViewSet(viewsets.ModelViewSet):
+class FactureProduitsViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API pour la gestion des factures de produits.
 
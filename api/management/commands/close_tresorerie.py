@@ -0,0 +1,22 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+
+from api.services.snapshot_service import SNAPSHOT_GRANULARITIES, close_periods, reopen_periods
+
+
+class Command(BaseCommand):
+    help = "Close the complete treasury periods (TresoreriePeriode snapshots), or reopen them for a correction"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--granularity", choices=SNAPSHOT_GRANULARITIES, default="month")
+        parser.add_argument("--until", type=date.fromisoformat, help="Last day to close (YYYY-MM-DD)")
+        parser.add_argument("--reopen", type=date.fromisoformat, metavar="DATE",
+                            help="Reopen the closed periods ending on or after DATE (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        if options["reopen"]:
+            count = reopen_periods(options["reopen"])
+            self.stdout.write(self.style.SUCCESS(f"{count} period(s) reopened"))
+            return
+        count = close_periods(options["granularity"], until=options["until"])
+        self.stdout.write(self.style.SUCCESS(f"{count} period(s) closed"))
@@ -0,0 +1,40 @@
+import logging
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.services.cache_service import WORKER_KEY, get_data_version
+from api.services.precompute_service import precompute
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Keep the KPI / period / traites payloads warm: recompute them whenever the treasury "
+        "data version changes, so that the views serve them without waiting. Needs a cache "
+        "shared with the web processes (CACHE_BACKEND, e.g. FileBasedCache or Redis)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds between two checks")
+        parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+
+    def handle(self, *args, **options):
+        interval = options["interval"]
+        while True:
+            # The views only serve stale results while this key is alive
+            cache.set(WORKER_KEY, time.time(), timeout=max(interval * 5, 10))
+            close_old_connections()
+            try:
+                refreshed = precompute()
+            except Exception:
+                logger.exception("Treasury precompute failed")
+                refreshed = []
+            if refreshed:
+                self.stdout.write(f"Refreshed {len(refreshed)} payload(s) for version {get_data_version()}")
+            if options["once"]:
+                cache.delete(WORKER_KEY)
+                return
+            time.sleep(interval)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.services.rollup_service import rebuild_rollup
+from api.services.transaction_service import rebuild_transactions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the TresorerieJour daily treasury rollup and the Transaction journal from the document tables"
+
+    def handle(self, *args, **options):
+        count = rebuild_rollup()
+        self.stdout.write(self.style.SUCCESS(f"TresorerieJour rebuilt: {count} rows"))
+        count = rebuild_transactions()
+        self.stdout.write(self.style.SUCCESS(f"Transaction journal rebuilt: {count} rows"))
@@ -0,0 +1,114 @@
+import json
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.models import Cd, Devis, Client, Traite, TraiteFournisseur, FichePaie
+
+BENCHMARK_USER = "benchmark"
+
+
+def get_endpoints():
+    """(name, url) of the benchmarked endpoints; detail urls use the first row."""
+    cd_id = Cd.objects.values_list("id", flat=True).first()
+    devis_id = Devis.objects.values_list("id", flat=True).first()
+    endpoints = [
+        ("kpis", "/api/kpis/?evolution_weeks=30d"),
+        ("kpis_1y", "/api/kpis/?evolution_weeks=1y"),
+        ("period_week", "/api/period/?period=week"),
+        ("period_year", "/api/period/?period=year"),
+        ("traites", "/api/tresorerietraites/"),
+        ("schedule", "/api/schedule/"),
+        ("cd_list", "/api/cds/"),
+        ("devis_list", "/api/devis/"),
+        ("dashboard_counts", "/api/dashboard/counts/"),
+        ("dashboard_financial_summary", "/api/dashboard/financial-summary/"),
+        ("dashboard_devis_status", "/api/dashboard/devis-status/"),
+        ("dashboard_commande_status", "/api/dashboard/commande-status/"),
+        ("dashboard_recent_commandes", "/api/dashboard/recent-commandes/"),
+        ("dashboard_recent_factures", "/api/dashboard/recent-factures/"),
+        ("dashboard_main_insights", "/api/dashboard/main-insights/"),
+    ]
+    if cd_id:
+        endpoints.append(("cd_detail", f"/api/cds/{cd_id}/"))
+    if devis_id:
+        endpoints.append(("devis_detail", f"/api/devis/{devis_id}/"))
+    return endpoints
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Time the heavy endpoints against the current database and print a JSON report (see seed_benchmark)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per endpoint")
+        parser.add_argument("--warm", action="store_true", help="Keep the KPI cache between runs")
+        parser.add_argument("--only", nargs="*", help="Benchmark only these endpoint names")
+        parser.add_argument("--output", help="Write the report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USER, defaults={"is_staff": True})
+        # A failing endpoint is reported with its status code instead of stopping the run
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user)
+
+        report = {
+            "commit": get_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "repeat": options["repeat"],
+            "warm": options["warm"],
+            "dataset": {
+                "clients": Client.objects.count(),
+                "cds": Cd.objects.count(),
+                "devis": Devis.objects.count(),
+                "traites": Traite.objects.count(),
+                "traites_fournisseur": TraiteFournisseur.objects.count(),
+                "fiches_paie": FichePaie.objects.count(),
+            },
+            "endpoints": {},
+        }
+
+        for name, url in get_endpoints():
+            if options["only"] and name not in options["only"]:
+                continue
+            timings, queries, status_code, size = [], 0, None, 0
+            for _ in range(options["repeat"]):
+                if not options["warm"]:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries = max(queries, len(captured))
+                status_code, size = response.status_code, len(response.content)
+
+            report["endpoints"][name] = {
+                "url": url,
+                "status": status_code,
+                "queries": queries,
+                "bytes": size,
+                "min_ms": round(min(timings), 2),
+                "median_ms": round(statistics.median(timings), 2),
+                "max_ms": round(max(timings), 2),
+            }
+            self.stderr.write(f"{name}: {report['endpoints'][name]['median_ms']} ms, {queries} queries")
+
+        output = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(output)
+        else:
+            self.stdout.write(output)
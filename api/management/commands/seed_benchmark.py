@@ -0,0 +1,236 @@
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import (
+    Client, Produit, Cd, PdC, Devis, ProduitDevis, PlanTraite, Traite,
+    Fournisseur, PlanTraiteFournisseur, TraiteFournisseur, FactureAchatProduit,
+    Employe, FichePaie,
+)
+from api.services.rollup_service import rebuild_rollup
+from api.services.transaction_service import rebuild_transactions
+
+# Every seeded row is tagged with this prefix so that it can be flushed
+PREFIX = "BENCH"
+
+# Rows per model at scale 1
+BASE_COUNTS = {
+    "clients": 50,
+    "produits": 100,
+    "cds": 500,
+    "devis": 200,
+    "plans_traite": 100,
+    "fournisseurs": 20,
+    "plans_traite_fournisseur": 60,
+    "achats": 200,
+    "employes": 20,
+}
+LINES_PER_DOCUMENT = 3
+TRAITES_PER_PLAN = 6
+BATCH_SIZE = 1000
+# Default anchor of the seeded dates: datasets seeded on different days stay comparable
+REFERENCE_DATE = date(2025, 6, 30)
+
+
+class Command(BaseCommand):
+    help = "Seed a deterministic, scale-parameterized dataset for the benchmarks (run_benchmark)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", type=int, default=1, help="Dataset size multiplier (1, 10, 100...)")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed")
+        parser.add_argument("--flush", action="store_true", help="Delete the previously seeded data first")
+        parser.add_argument(
+            "--today", type=date.fromisoformat, default=REFERENCE_DATE,
+            help=f"Date the dataset is spread around, YYYY-MM-DD (default {REFERENCE_DATE.isoformat()})",
+        )
+
+    def handle(self, *args, **options):
+        if options["flush"]:
+            flush()
+        elif Client.objects.filter(numero_fiscal__startswith=PREFIX).exists():
+            raise CommandError("Benchmark data already seeded, use --flush to replace it")
+
+        counts = {name: count * options["scale"] for name, count in BASE_COUNTS.items()}
+        with transaction.atomic():
+            created = seed(counts, random.Random(options["seed"]), options["today"])
+        # bulk_create bypasses the signals that maintain these tables
+        created["tresorerie_jour"] = rebuild_rollup()
+        created["transactions"] = rebuild_transactions()
+
+        for name, count in created.items():
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmark dataset seeded (scale {options['scale']}, around {options['today'].isoformat()})"
+        ))
+
+
+def flush():
+    Cd.objects.filter(numero_commande__startswith=PREFIX).delete()
+    Devis.objects.filter(numero_devis__startswith=PREFIX).delete()
+    PlanTraite.objects.filter(numero_facture__startswith=PREFIX).delete()
+    PlanTraiteFournisseur.objects.filter(numero_facture__startswith=PREFIX).delete()
+    FactureAchatProduit.objects.filter(numero__startswith=PREFIX).delete()
+    Employe.objects.filter(id_employe__startswith=PREFIX).delete()
+    Fournisseur.objects.filter(num_reg_fiscal__startswith=PREFIX).delete()
+    Produit.objects.filter(ref_produit__startswith=PREFIX).delete()
+    Client.objects.filter(numero_fiscal__startswith=PREFIX).delete()
+
+
+def seed(counts, rng, today):
+    """Bulk inserts the dataset; dates are spread over the year around today (the anchor date)."""
+    def some_day(past=365, future=90):
+        return today + timedelta(days=rng.randint(-past, future))
+
+    def amount(low=100, high=20000):
+        return round(rng.uniform(low, high), 3)
+
+    clients = Client.objects.bulk_create([
+        Client(
+            nom_client=f"Client {i}",
+            numero_fiscal=f"{PREFIX}-{i:07d}",
+            code_client=f"B{i:04d}",
+        )
+        for i in range(counts["clients"])
+    ], batch_size=BATCH_SIZE)
+
+    produits = Produit.objects.bulk_create([
+        Produit(
+            nom_produit=f"Produit {i}",
+            ref_produit=f"{PREFIX}-{i:06d}",
+            stock=rng.randint(0, 500),
+            prix_achat=amount(1, 100),
+            prix_unitaire=amount(100, 500),
+        )
+        for i in range(counts["produits"])
+    ], batch_size=BATCH_SIZE)
+
+    cds = []
+    for i in range(counts["cds"]):
+        mode = rng.choice(["cash", "virement", "cheque", "carte", "mixte", "traite"])
+        montant_ht = amount()
+        cds.append(Cd(
+            numero_commande=f"{PREFIX}-FAC-{i:07d}",
+            client=rng.choice(clients),
+            date_commande=some_day(),
+            statut=rng.choice(["pending", "processing", "completed", "completed", "cancelled"]),
+            mode_paiement=mode,
+            mixte_comptant=int(montant_ht / 2) if mode == "mixte" else 0,
+            montant_ht=montant_ht,
+            montant_tva=round(montant_ht * 0.19, 3),
+            montant_ttc=round(montant_ht * 1.19, 3),
+        ))
+    cds = Cd.objects.bulk_create(cds, batch_size=BATCH_SIZE)
+    lignes_cd = PdC.objects.bulk_create([
+        PdC(cd=cd, produit=produit, quantite=1, prix_unitaire=produit.prix_unitaire,
+            prix_total=produit.prix_unitaire)
+        for cd in cds
+        for produit in rng.sample(produits, LINES_PER_DOCUMENT)
+    ], batch_size=BATCH_SIZE)
+
+    devis = []
+    for i in range(counts["devis"]):
+        date_emission = some_day()
+        montant_ht = amount()
+        devis.append(Devis(
+            numero_devis=f"{PREFIX}-DEV-{i:07d}",
+            client=rng.choice(clients),
+            date_emission=date_emission,
+            date_validite=date_emission + timedelta(days=15),
+            statut=rng.choice(["draft", "sent", "accepted", "rejected"]),
+            montant_ht=montant_ht,
+            montant_ttc=round(montant_ht * 1.19, 3),
+        ))
+    devis = Devis.objects.bulk_create(devis, batch_size=BATCH_SIZE)
+    lignes_devis = ProduitDevis.objects.bulk_create([
+        ProduitDevis(devis=d, produit=produit, quantite=1, prix_unitaire=produit.prix_unitaire,
+                     prix_total=produit.prix_unitaire)
+        for d in devis
+        for produit in rng.sample(produits, LINES_PER_DOCUMENT)
+    ], batch_size=BATCH_SIZE)
+
+    def echeances(start):
+        return [start + timedelta(days=30 * n) for n in range(TRAITES_PER_PLAN)]
+
+    def status(day):
+        return "PAYEE" if day < today and rng.random() < 0.7 else "NON_PAYEE"
+
+    plans = PlanTraite.objects.bulk_create([
+        PlanTraite(
+            client=rng.choice(clients),
+            numero_facture=f"{PREFIX}-PT-{i:07d}",
+            nombre_traite=TRAITES_PER_PLAN,
+            date_premier_echeance=some_day(past=200, future=60),
+            montant_total=amount(1000, 60000),
+        )
+        for i in range(counts["plans_traite"])
+    ], batch_size=BATCH_SIZE)
+    traites = Traite.objects.bulk_create([
+        Traite(plan_traite=plan, date_echeance=day, status=status(day),
+               montant=round(plan.montant_total / TRAITES_PER_PLAN, 3))
+        for plan in plans
+        for day in echeances(plan.date_premier_echeance)
+    ], batch_size=BATCH_SIZE)
+
+    fournisseurs = Fournisseur.objects.bulk_create([
+        Fournisseur(nom=f"Fournisseur {i}", num_reg_fiscal=f"{PREFIX}-{i:07d}", adresse="Tunis", telephone="00000000")
+        for i in range(counts["fournisseurs"])
+    ], batch_size=BATCH_SIZE)
+    plans_fournisseur = PlanTraiteFournisseur.objects.bulk_create([
+        PlanTraiteFournisseur(
+            fournisseur=rng.choice(fournisseurs),
+            numero_facture=f"{PREFIX}-PTF-{i:07d}",
+            nombre_traite=TRAITES_PER_PLAN,
+            date_premier_echeance=some_day(past=200, future=60),
+            montant_total=amount(1000, 60000),
+        )
+        for i in range(counts["plans_traite_fournisseur"])
+    ], batch_size=BATCH_SIZE)
+    traites_fournisseur = TraiteFournisseur.objects.bulk_create([
+        TraiteFournisseur(plan_traite=plan, date_echeance=day, status=status(day),
+                          montant=round(plan.montant_total / TRAITES_PER_PLAN, 3))
+        for plan in plans_fournisseur
+        for day in echeances(plan.date_premier_echeance)
+    ], batch_size=BATCH_SIZE)
+
+    achats = FactureAchatProduit.objects.bulk_create([
+        FactureAchatProduit(
+            numero=f"{PREFIX}-ACH-{i:07d}",
+            fournisseur=rng.choice(fournisseurs).nom,
+            mode_paiement=rng.choice(["cash", "virement", "cheque", "mixte", "traite"]),
+            prix_total=round(amount(), 2),
+            mixte_comptant=rng.randint(0, 1000),
+            date_facture=some_day(future=0),
+        )
+        for i in range(counts["achats"])
+    ], batch_size=BATCH_SIZE)
+
+    employes = Employe.objects.bulk_create([
+        Employe(id_employe=f"{PREFIX}-{i:06d}", nom=f"Employé {i}", salaire=amount(800, 4000))
+        for i in range(counts["employes"])
+    ], batch_size=BATCH_SIZE)
+    fiches = FichePaie.objects.bulk_create([
+        FichePaie(
+            employe=employe,
+            mois=month,
+            annee=today.year,
+            salaire_base=employe.salaire,
+            net_a_payer=round(employe.salaire * 0.8, 3),
+            statut="Payée" if month < today.month else "Générée",
+        )
+        for employe in employes
+        for month in range(1, 13)
+    ], batch_size=BATCH_SIZE)
+
+    return {
+        "clients": len(clients),
+        "produits": len(produits),
+        "cds": len(cds),
+        "lignes_cd": len(lignes_cd),
+        "devis": len(devis),
+        "lignes_devis": len(lignes_devis),
+        "traites": len(traites),
+        "traites_fournisseur": len(traites_fournisseur),
+        "achats": len(achats),
+        "fiches_paie": len(fiches),
+    }
@@ -0,0 +1,124 @@
+import logging
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from api.utils.log import get_correlation_id, set_correlation_id, reset_correlation_id
+from api.utils.memo import request_memo
+from api.utils.query_budget import UNRESOLVED, QueryBudgetExceeded, QueryCounter, get_budget, record
+
+logger = logging.getLogger(__name__)
+
+
+class CorrelationIdMiddleware:
+    """
+    Tags every log record of the request with a correlation id, taken from
+    the X-Request-ID header or generated, and returned in the response.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = set_correlation_id(request.headers.get("X-Request-ID"))
+        try:
+            response = self.get_response(request)
+            response["X-Request-ID"] = get_correlation_id()
+            return response
+        finally:
+            reset_correlation_id(token)
+
+    async def __acall__(self, request):
+        token = set_correlation_id(request.headers.get("X-Request-ID"))
+        try:
+            response = await self.get_response(request)
+            response["X-Request-ID"] = get_correlation_id()
+            return response
+        finally:
+            reset_correlation_id(token)
+
+
+class RequestMemoMiddleware:
+    """Scopes the memoized treasury computations to one request."""
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_memo():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        # The memo is a ContextVar: it follows the request into sync_to_async
+        with request_memo():
+            return await self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the SQL queries and DB time of each request, keyed by the resolved
+    URL name, and compares them to settings.QUERY_BUDGETS (or
+    QUERY_BUDGET_DEFAULT). Overruns are logged, or raised when
+    QUERY_BUDGET_RAISE is set.
+    """
+
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        # Connections are per thread: the wrappers are installed in the thread
+        # where the async ORM (sync_to_async, thread sensitive) runs the queries
+        counter = QueryCounter()
+        stack = ExitStack()
+
+        def enter():
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+
+        await sync_to_async(enter)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.check_budget(request, counter)
+        return response
+
+    def check_budget(self, request, counter):
+        match = request.resolver_match
+        name = match.view_name if match else UNRESOLVED
+        budget = get_budget(name)
+        overrun = budget is not None and counter.count > budget
+        record(name, counter.count, counter.time, overrun)
+
+        if overrun:
+            message = f"{name}: {counter.count} queries ({counter.time * 1000:.1f} ms), budget {budget}"
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded - %s", message)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_categorie_alter_produit_categorie_souscategorie_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TresorerieJour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Flow date')),
+                ('flux', models.CharField(choices=[('cd', 'Factures client payées'), ('cd_mixte', 'Factures client mixtes (partie comptant)'), ('traite', 'Traites client payées'), ('avoir', 'Remboursements avoirs'), ('facture_achat', 'Factures fournisseur réglées'), ('facture_achat_mixte', 'Factures fournisseur mixtes (partie comptant)'), ('traite_fournisseur', 'Traites fournisseur payées'), ('salaire', 'Salaires payés')], help_text='Flow type', max_length=30)),
+                ('montant', models.DecimalField(decimal_places=3, default=0, help_text='Total amount of the day', max_digits=14)),
+                ('nombre', models.PositiveIntegerField(default=0, help_text='Number of documents')),
+                ('derniere_mise_a_jour', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['date', 'flux'],
+                'indexes': [models.Index(fields=['date'], name='api_tresore_date_a65f0b_idx'), models.Index(fields=['flux', 'date'], name='api_tresore_flux_c81157_idx')],
+                'unique_together': {('date', 'flux')},
+            },
+        ),
+    ]
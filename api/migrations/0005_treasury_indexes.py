@@ -0,0 +1,53 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_tresorerie_jour'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='traite',
+            name='api_traite_status_b44c8d_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='traitefournisseur',
+            name='api_traitef_status_1ec3dd_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cd',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['statut', 'mode_paiement', 'date_commande'], name='cd_tresorerie_actifs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cd',
+            index=models.Index(fields=['nature', 'is_deleted'], name='api_cd_nature_236496_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factureachatproduit',
+            index=models.Index(fields=['date_facture'], name='api_facture_date_fa_cfa625_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factureachatproduit',
+            index=models.Index(fields=['mode_paiement', 'date_facture'], name='api_facture_mode_pa_3a4e0e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fichepaie',
+            index=models.Index(fields=['date_paiement'], name='api_fichepa_date_pa_c97a21_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fichepaie',
+            index=models.Index(fields=['statut', 'date_paiement'], name='api_fichepa_statut_83fd4f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traite',
+            index=models.Index(fields=['status', 'date_echeance'], name='api_traite_status_97c1f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traitefournisseur',
+            index=models.Index(fields=['status', 'date_echeance'], name='api_traitef_status_a8869b_idx'),
+        ),
+    ]
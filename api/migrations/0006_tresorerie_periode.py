@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_treasury_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TresoreriePeriode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularite', models.CharField(choices=[('week', 'Semaine'), ('month', 'Mois')], max_length=10)),
+                ('debut', models.DateField(help_text='First day of the period')),
+                ('fin', models.DateField(help_text='Last day of the period')),
+                ('flux', models.CharField(choices=[('cd', 'Factures client payées'), ('cd_mixte', 'Factures client mixtes (partie comptant)'), ('traite', 'Traites client payées'), ('avoir', 'Remboursements avoirs'), ('facture_achat', 'Factures fournisseur réglées'), ('facture_achat_mixte', 'Factures fournisseur mixtes (partie comptant)'), ('traite_fournisseur', 'Traites fournisseur payées'), ('salaire', 'Salaires payés')], help_text='Flow type', max_length=30)),
+                ('montant', models.DecimalField(decimal_places=3, default=0, help_text='Total amount of the period', max_digits=14)),
+                ('nombre', models.PositiveIntegerField(default=0, help_text='Number of documents')),
+                ('date_cloture', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['debut', 'flux'],
+                'indexes': [models.Index(fields=['fin'], name='api_tresore_fin_81a383_idx')],
+                'unique_together': {('debut', 'flux')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_tresorerie_periode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(choices=[('cd', 'Facture client'), ('traite', 'Traite client'), ('avoir', 'Avoir'), ('facture_achat', 'Facture fournisseur'), ('traite_fournisseur', 'Traite fournisseur'), ('fiche_paie', 'Fiche de paie'), ('avance', 'Avance')], max_length=30)),
+                ('source_id', models.PositiveIntegerField()),
+                ('date', models.DateField(blank=True, null=True)),
+                ('direction', models.CharField(choices=[('income', 'Encaissement'), ('expense', 'Décaissement')], max_length=10)),
+                ('amount', models.DecimalField(blank=True, decimal_places=3, max_digits=14, null=True)),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('counterparty', models.CharField(blank=True, max_length=255, null=True)),
+                ('payment_mode', models.CharField(blank=True, max_length=20, null=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['-date', 'source_type', 'source_id'],
+                'indexes': [models.Index(fields=['date'], name='api_transac_date_26e12b_idx'), models.Index(fields=['source_type', 'date'], name='api_transac_source__27f810_idx'), models.Index(fields=['direction', 'date'], name='api_transac_directi_17b10b_idx')],
+                'unique_together': {('source_type', 'source_id')},
+            },
+        ),
+    ]
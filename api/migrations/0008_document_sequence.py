@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-17 02:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_transaction'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='avoir',
+            options={'ordering': ['-created_at'], 'verbose_name': 'Avoir', 'verbose_name_plural': 'Avoirs'},
+        ),
+        migrations.AlterField(
+            model_name='bonretour',
+            name='numero_bon',
+            field=models.CharField(blank=True, help_text='Bon number (generated if empty)', max_length=50, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='devis',
+            name='numero_devis',
+            field=models.CharField(blank=True, help_text='Quote number (generated if empty)', max_length=50, unique=True),
+        ),
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(help_text='Document prefix (FAC, AV-BL, DEV...)', max_length=30)),
+                ('year', models.PositiveIntegerField()),
+                ('last_number', models.PositiveIntegerField(default=0, help_text='Last number issued')),
+            ],
+            options={
+                'unique_together': {('prefix', 'year')},
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+def fill_rollup(apps, schema_editor):
+    # Same rows as rebuild_tresorerie, read through the historical models
+    from api.services.aggregation_service import get_flow_sources
+    from api.services.rollup_service import _daily_rows
+
+    TresorerieJour = apps.get_model('api', 'TresorerieJour')
+    rows = []
+    for model, date_field, flows in get_flow_sources():
+        source = apps.get_model('api', model.__name__)
+        rows.extend(
+            TresorerieJour(date=row.date, flux=row.flux, montant=row.montant, nombre=row.nombre)
+            for row in _daily_rows(source, date_field, flows)
+        )
+    TresorerieJour.objects.all().delete()
+    TresorerieJour.objects.bulk_create(rows, batch_size=1000)
+
+
+def fill_transactions(apps, schema_editor):
+    from api.services.transaction_service import get_transaction_sources, _transaction_rows
+
+    Transaction = apps.get_model('api', 'Transaction')
+    fields = ['source_type', 'source_id', 'direction', 'date', 'amount', 'status', 'counterparty', 'payment_mode', 'is_deleted']
+    rows = []
+    for model, source_type, direction, columns, _ in get_transaction_sources():
+        source = apps.get_model('api', model.__name__)
+        rows.extend(
+            Transaction(**{field: getattr(row, field) for field in fields})
+            for row in _transaction_rows(source, source_type, direction, columns)
+        )
+    Transaction.objects.all().delete()
+    Transaction.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    """
+    Fills the TresorerieJour rollup and the Transaction journal from the
+    existing documents, so that an upgraded database does not report zeros
+    until rebuild_tresorerie is run. No TresoreriePeriode snapshot is
+    created: without a closed period the global totals come from the rollup.
+    """
+
+    dependencies = [
+        ('api', '0008_document_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rollup, migrations.RunPython.noop),
+        migrations.RunPython(fill_transactions, migrations.RunPython.noop),
+    ]
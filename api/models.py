@@ -1,9 +1,13 @@
+import logging
 from datetime import timedelta
 from django.db import models
 import re
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
+from .utils.totals import defer_totals, update_totals
+
+logger = logging.getLogger(__name__)
 
 MATIERE_PREFIXES = {
     "acier": "AC",
@@ -106,13 +110,12 @@ class Client(models.Model):
         return self.nom_client
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            super().save(*args, **kwargs)
-            self.code_client = f"{self.id:05d}"
-            kwargs['force_insert'] = False
-            super().save(*args, **kwargs)
-        else:
-            super().save(*args, **kwargs)
+        # Allocated before the INSERT: a single write per new client
+        if not self.code_client:
+            self.code_client = reserve_codes_client(1)[0]
+        elif self._state.adding and self.code_client.isdigit():
+            reserve_codes_client(0, at_least=int(self.code_client))
+        super().save(*args, **kwargs)
 
 # A supprimer
 # class Matiere(models.Model):
@@ -301,22 +304,16 @@ class Produit(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.ref_produit:
-            prefix = MATIERE_PREFIXES.get(self.materiau, "OT")
-
-           
-            existing_codes = Produit.objects.filter(ref_produit__startswith=prefix + "-") \
-                                            .values_list("ref_produit", flat=True)
-
-            max_number = 0
-            for code in existing_codes:
-                try:
-                    number = int(code.split("-")[-1])
-                    max_number = max(max_number, number)
-                except (ValueError, IndexError):
-                    continue
-
-            self.ref_produit = f"{prefix}-{max_number + 1:04d}"
-
+            self.ref_produit = reserve_refs_produit(MATIERE_PREFIXES.get(self.materiau, "OT"), 1)[0]
+        elif self._state.adding and (parsed := parse_ref_produit(self.ref_produit)):
+            # A code typed by hand moves the sequence past it
+            prefix, number = parsed
+            reserve_refs_produit(prefix, 0, at_least=number)
+
+        # auto_now is only written when listed: a partial save (stock...) must move the ETags too
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "derniere_mise_a_jour" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "derniere_mise_a_jour"]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -749,7 +746,7 @@ class FactureProduit(models.Model):
 class BonRetour(models.Model):
     """Model for product return BON DE RETOUR"""
 
-    numero_bon = models.CharField(max_length=50, unique=True, help_text="Bon number")
+    numero_bon = models.CharField(max_length=50, unique=True, blank=True, help_text="Bon number (generated if empty)")
     client = models.ForeignKey(
         Client,
         on_delete=models.CASCADE,
@@ -802,6 +799,10 @@ class BonRetour(models.Model):
         return f"Bon Retour {self.numero_bon} - {self.client.nom_client}"
 
     def save(self, *args, **kwargs):
+        if not self.numero_bon:
+            self.numero_bon = generate_numero("BR", [(BonRetour.objects.all(), "numero_bon")])
+        elif self._state.adding:
+            record_numero(self.numero_bon, "BR", [(BonRetour.objects.all(), "numero_bon")])
         # No financial calculations needed on save
         super().save(*args, **kwargs)
 
@@ -880,9 +881,8 @@ class ProduitDevis(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Update the devis totals
-        self.devis.calculate_totals()
-        self.devis.save()
+        # Update the devis totals (once per block inside defer_totals())
+        update_totals(self.devis)
 
 
 class Devis(models.Model):
@@ -898,7 +898,7 @@ class Devis(models.Model):
     ]
 
     numero_devis = models.CharField(
-        max_length=50, unique=True, help_text="Quote number"
+        max_length=50, unique=True, blank=True, help_text="Quote number (generated if empty)"
     )
     client = models.ForeignKey(
         Client, on_delete=models.CASCADE, related_name="devis", help_text="Client"
@@ -976,8 +976,7 @@ class Devis(models.Model):
 
 
     def calculate_totals(self):
-        print("Calculating totals for Devis ID:", self.pk)
-        print("Tax rate:", self.tax_rate)
+        logger.debug("Calculating totals for Devis ID: %s, tax rate: %s", self.pk, self.tax_rate)
 
         if not self.pk:
             self.montant_ht = Decimal("0.0")
@@ -991,7 +990,7 @@ class Devis(models.Model):
             if item.prix_total is not None:
                 total_ht += Decimal(item.prix_total)
 
-        print("Total HT:", total_ht)
+        logger.debug("Total HT: %s", total_ht)
 
         tax_rate = Decimal(self.tax_rate or 0)
         fodec = (total_ht * Decimal("0.01")).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
@@ -1003,7 +1002,7 @@ class Devis(models.Model):
         self.montant_ht = total_ht
         self.montant_tva = montant_tva
         self.montant_ttc = montant_ttc
-        print(f"FODEC: {fodec}, TVA: {montant_tva}, Timbre: {timbre}, TTC: {montant_ttc}")
+        logger.debug("FODEC: %s, TVA: %s, Timbre: %s, TTC: %s", fodec, montant_tva, timbre, montant_ttc)
 
         return self.montant_ttc
 
@@ -1016,6 +1015,12 @@ class Devis(models.Model):
         if self.date_emission and not self.date_validite:
             self.date_validite = self.date_emission + timedelta(days=15)
 
+        if not self.numero_devis:
+            self.numero_devis = generate_numero("DEV", [(Devis.objects.all(), "numero_devis")])
+        elif self._state.adding:
+            # A number typed by hand moves the sequence past it
+            record_numero(self.numero_devis, "DEV", [(Devis.objects.all(), "numero_devis")])
+
         is_new = self.pk is None
         if is_new and (self.montant_ht is None):
             self.montant_ht = 0
@@ -1058,15 +1063,16 @@ class Devis(models.Model):
         )
 
         # Copy products from devis to commande
-        for produit_devis in self.produit_devis.all():
-            PdC.objects.create(
-                cd=commande,  # Fixed: was 'commande', should be 'cd'
-                produit=produit_devis.produit,
-                quantite=produit_devis.quantite,
-                prix_unitaire=produit_devis.prix_unitaire,
-                remise_pourcentage=produit_devis.remise_pourcentage,
-                prix_total=produit_devis.prix_total,
-            )
+        with defer_totals():
+            for produit_devis in self.produit_devis.select_related("produit"):
+                PdC.objects.create(
+                    cd=commande,  # Fixed: was 'commande', should be 'cd'
+                    produit=produit_devis.produit,
+                    quantite=produit_devis.quantite,
+                    prix_unitaire=produit_devis.prix_unitaire,
+                    remise_pourcentage=produit_devis.remise_pourcentage,
+                    prix_total=produit_devis.prix_total,
+                )
 
         # Update the devis status
         self.statut = "converted"
@@ -1096,15 +1102,16 @@ class Devis(models.Model):
         )
 
         # Copy products from devis to commande
-        for produit_devis in self.produit_devis.all():
-            ProduitCommande.objects.create(
-                commande=commande,
-                produit=produit_devis.produit,
-                quantite=produit_devis.quantite,
-                prix_unitaire=produit_devis.prix_unitaire,
-                remise_pourcentage=produit_devis.remise_pourcentage,
-                prix_total=produit_devis.prix_total,
-            )
+        with defer_totals():
+            for produit_devis in self.produit_devis.select_related("produit"):
+                ProduitCommande.objects.create(
+                    commande=commande,
+                    produit=produit_devis.produit,
+                    quantite=produit_devis.quantite,
+                    prix_unitaire=produit_devis.prix_unitaire,
+                    remise_pourcentage=produit_devis.remise_pourcentage,
+                    prix_total=produit_devis.prix_total,
+                )
 
         # Update the devis status
         self.statut = "converted"
@@ -1161,9 +1168,8 @@ class ProduitCommande(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Update the commande totals
-        self.commande.calculate_totals()
-        self.commande.save(update_fields=["montant_ht", "montant_tva", "montant_ttc"])
+        # Update the commande totals (once per block inside defer_totals())
+        update_totals(self.commande, update_fields=["montant_ht", "montant_tva", "montant_ttc"])
 
 
 
@@ -1285,8 +1291,7 @@ class Commande(models.Model):
         return f"Commande {self.numero_commande} - {self.client.nom_client}"
 
     def calculate_totals(self):
-        print("Calculating totals for Commande ID:", self.pk)
-        print("Tax rate:", self.tax_rate)
+        logger.debug("Calculating totals for Commande ID: %s, tax rate: %s", self.pk, self.tax_rate)
 
         if not self.pk:
             self.montant_ht = 0
@@ -1311,10 +1316,12 @@ class Commande(models.Model):
             total_remise += remise_value
             total_ht += line_total_ht
 
-            print(f" - ProduitCommande id {item.id}: PU={prix_unitaire}, QTE={quantite}, Remise%={remise_percent}")
-            print(f"   => Brut={line_total_brut}, Remise={remise_value}, HT={line_total_ht}")
+            logger.debug(
+                " - ProduitCommande id %s: PU=%s, QTE=%s, Remise%%=%s => Brut=%s, Remise=%s, HT=%s",
+                item.id, prix_unitaire, quantite, remise_percent, line_total_brut, remise_value, line_total_ht,
+            )
 
-        print(f"Total brut: {total_brut}, Total remise: {total_remise}, Total HT: {total_ht}")
+        logger.debug("Total brut: %s, Total remise: %s, Total HT: %s", total_brut, total_remise, total_ht)
 
         tax_rate = Decimal(self.tax_rate or 0)
         self.montant_ht = total_ht
@@ -1327,40 +1334,17 @@ class Commande(models.Model):
     def save(self, *args, **kwargs):
         # Auto-generate numero_commande if not provided
         if not self.numero_commande:
-            self.numero_commande = self._generate_numero_commande(self.type_facture, self.nature)
+            self.numero_commande = self._generate_numero_commande()
+        elif self._state.adding:
+            # A number typed by hand moves the sequence past it
+            record_numero(self.numero_commande, "CMD", [(Commande.objects.all(), "numero_commande")])
 
         # Don't calculate or reset totals here — that logic should live outside save()
         super().save(*args, **kwargs)
 
-    def _generate_numero_commande(self, type_facture, nature):
-        """Generate next sequential order number, filling gaps if any exist"""
-        from datetime import datetime
-        current_year = datetime.now().year
-        if nature == "facture":
-            prefix_type = "FAC-BL" if type_facture == "bon" else "FAC"
-        elif nature =="avoir-facture":
-            prefix_type = "AV-FAC-BL" if type_facture == "bon" else "AV-FAC"
-        else:
-            prefix_type = "AV-BL" if type_facture == "bon" else "AV"
-        prefix = f"{prefix_type}-{current_year}-"
-        # Find the highest existing number for current year
-        existing_commandes = Cd.objects.filter(
-            numero_commande__startswith=prefix
-        ).order_by("-numero_commande")
-
-        if existing_commandes.exists():
-            last_numero = existing_commandes.first().numero_commande
-            # Extract the sequential number part
-            try:
-                last_number = int(last_numero.split("-")[-1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
-
-        # Format with 5-digit zero padding
-        return f"{prefix}{next_number:05d}"
+    def _generate_numero_commande(self):
+        """Next order number of the year (CMD-YYYY-NNNNN)"""
+        return generate_numero("CMD", [(Commande.objects.all(), "numero_commande")])
 
     def generate_invoice(self):
         """Generate an invoice for this order if it's completed"""
@@ -1582,7 +1566,8 @@ class Traite(models.Model):
         indexes = [
             models.Index(fields=["plan_traite"]),
             models.Index(fields=["date_echeance"]),
-            models.Index(fields=["status"]),
+            # Trésorerie / échéancier : statut + plage d'échéances
+            models.Index(fields=["status", "date_echeance"]),
         ]
 
 
@@ -1790,6 +1775,14 @@ class Cd(models.Model):
             models.Index(fields=["client"]),
             models.Index(fields=["date_commande"]),
             models.Index(fields=["statut"]),
+            # Flux de trésorerie : factures actives par statut / mode de paiement / date
+            models.Index(
+                fields=["statut", "mode_paiement", "date_commande"],
+                condition=models.Q(is_deleted=False),
+                name="cd_tresorerie_actifs_idx",
+            ),
+            # Liste filtrée par nature (facture / avoir...) et corbeille
+            models.Index(fields=["nature", "is_deleted"]),
         ]
 
     def __str__(self):
@@ -1822,6 +1815,12 @@ class Cd(models.Model):
         # Auto-generate numero_commande if not provided
         if not self.numero_commande:
             self.numero_commande = self._generate_numero_commande(self.type_facture, self.nature)
+        elif self._state.adding:
+            # A number typed by hand moves the sequence past it
+            record_numero(
+                self.numero_commande, get_facture_prefix(self.type_facture, self.nature),
+                [(Cd.objects.all(), "numero_commande")],
+            )
 
         is_new = self.pk is None
         if is_new and (self.montant_ht is None):
@@ -1847,34 +1846,8 @@ class Cd(models.Model):
                 )
 
     def _generate_numero_commande(self, type_facture, nature):
-        """Generate next sequential order number for current year (never reuses numbers)"""
-        from datetime import datetime
-        current_year = datetime.now().year
-        if nature == "facture":
-            prefix_type = "FAC-BL" if type_facture == "bon" else "FAC"
-        elif nature == "avoir-facture":
-            prefix_type = "AV-FAC-BL" if type_facture == "bon" else "AV-FAC"
-        else:
-            prefix_type = "AV-BL" if type_facture == "bon" else "AV"
-        prefix = f"{prefix_type}-{current_year}-"
-        # Find the highest existing number for current year
-        existing_commandes = Cd.objects.filter(
-            numero_commande__startswith=prefix
-        ).order_by("-numero_commande")
-
-        if existing_commandes.exists():
-            last_numero = existing_commandes.first().numero_commande
-            # Extract the sequential number part
-            try:
-                last_number = int(last_numero.split("-")[-1])
-                next_number = last_number + 1
-            except (ValueError, IndexError):
-                next_number = 1
-        else:
-            next_number = 1
-
-        # Format with 5-digit zero padding
-        return f"{prefix}{next_number:05d}"
+        """Next number of the year for this nature / type (FAC-BL-YYYY-NNNNN...)"""
+        return generate_numero(get_facture_prefix(type_facture, nature), [(Cd.objects.all(), "numero_commande")])
 
     def generate_invoice(self):
         """Generate an invoice for this order if it's completed"""
@@ -1952,9 +1925,8 @@ class PdC(models.Model):
 
         super().save(*args, **kwargs)
 
-        # Update the cd totals
-        self.cd.calculate_totals()
-        self.cd.save()
+        # Update the cd totals (once per block inside defer_totals())
+        update_totals(self.cd)
 
 
 class MatierePurchase(models.Model):
@@ -2017,6 +1989,12 @@ class FactureAchatProduit(models.Model):
     prix_total = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     date_facture = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_facture"]),
+            models.Index(fields=["mode_paiement", "date_facture"]),
+        ]
+
     def __str__(self):
         return f"Facture {self.numero or self.id}"
 
@@ -2234,7 +2212,8 @@ class TraiteFournisseur(models.Model):
         indexes = [
             models.Index(fields=["plan_traite"]),
             models.Index(fields=["date_echeance"]),
-            models.Index(fields=["status"]),
+            # Trésorerie / échéancier : statut + plage d'échéances
+            models.Index(fields=["status", "date_echeance"]),
         ]
 
 
@@ -2352,6 +2331,12 @@ class FichePaie(models.Model):
     charges_patronales = models.FloatField(default=0)
     net_a_payer = models.FloatField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date_paiement"]),
+            models.Index(fields=["statut", "date_paiement"]),
+        ]
+
 
 
 from django.db import models
@@ -2399,9 +2384,7 @@ class Avoir(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     deleted_at = models.DateTimeField(null=True, blank=True)
-class Meta:
-    db_table = 'avoir'
-    
+
     def soft_delete(self):
         """Suppression soft"""
         self.deleted_at = timezone.now()
@@ -2427,15 +2410,10 @@ class Meta:
     def save(self, *args, **kwargs):
         # Auto-générer le numéro si pas fourni
         if not self.numero:
-            last_avoir = Avoir.objects.filter(numero__startswith='AV-').order_by('id').last()
-            if last_avoir and last_avoir.numero:
-                try:
-                    last_num = int(last_avoir.numero.split('-')[-1])
-                    self.numero = f"AV-2024-{last_num + 1:03d}"
-                except (ValueError, IndexError):
-                    self.numero = "AV-2024-001"
-            else:
-                self.numero = "AV-2024-001"
+            # Own sequence: the "AV" prefix of the Cd avoirs numbers another table
+            self.numero = generate_numero("AV", [(Avoir.objects.all(), "numero")], digits=3, sequence="AVOIR")
+        elif self._state.adding:
+            record_numero(self.numero, "AV", [(Avoir.objects.all(), "numero")], sequence="AVOIR")
         super().save(*args, **kwargs)
 
 
@@ -2466,4 +2444,243 @@ class AvoirArticle(models.Model):
     @property
     def total(self):
         return self.prix * self.quantite
-    
\ No newline at end of file
+    
+
+class TresorerieJour(models.Model):
+    """Daily treasury rollup: one row per (date, flux), kept current by api.signals"""
+
+    FLUX_CHOICES = [
+        ("cd", "Factures client payées"),
+        ("cd_mixte", "Factures client mixtes (partie comptant)"),
+        ("traite", "Traites client payées"),
+        ("avoir", "Remboursements avoirs"),
+        ("facture_achat", "Factures fournisseur réglées"),
+        ("facture_achat_mixte", "Factures fournisseur mixtes (partie comptant)"),
+        ("traite_fournisseur", "Traites fournisseur payées"),
+        ("salaire", "Salaires payés"),
+    ]
+
+    date = models.DateField(help_text="Flow date")
+    flux = models.CharField(max_length=30, choices=FLUX_CHOICES, help_text="Flow type")
+    montant = models.DecimalField(
+        max_digits=14, decimal_places=3, default=0, help_text="Total amount of the day"
+    )
+    nombre = models.PositiveIntegerField(default=0, help_text="Number of documents")
+    derniere_mise_a_jour = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date", "flux"]
+        unique_together = ("date", "flux")
+        indexes = [
+            models.Index(fields=["date"]),
+            models.Index(fields=["flux", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.flux}: {self.montant}"
+
+
+class TresoreriePeriode(models.Model):
+    """Frozen totals per flux of a closed period (week or month), see snapshot_service"""
+
+    GRANULARITE_CHOICES = [
+        ("week", "Semaine"),
+        ("month", "Mois"),
+    ]
+
+    granularite = models.CharField(max_length=10, choices=GRANULARITE_CHOICES)
+    debut = models.DateField(help_text="First day of the period")
+    fin = models.DateField(help_text="Last day of the period")
+    flux = models.CharField(max_length=30, choices=TresorerieJour.FLUX_CHOICES, help_text="Flow type")
+    montant = models.DecimalField(
+        max_digits=14, decimal_places=3, default=0, help_text="Total amount of the period"
+    )
+    nombre = models.PositiveIntegerField(default=0, help_text="Number of documents")
+    date_cloture = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["debut", "flux"]
+        unique_together = ("debut", "flux")
+        indexes = [
+            models.Index(fields=["fin"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        # A closed period is immutable: reopen it (delete) and close it again instead
+        if self.pk:
+            raise ValueError("Une période clôturée ne peut pas être modifiée")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.debut} - {self.fin} - {self.flux}: {self.montant}"
+
+
+class Transaction(models.Model):
+    """
+    Journal of every cash-moving document, one row per document with
+    normalized columns, kept current by api.signals (see transaction_service)
+    """
+
+    SOURCE_CHOICES = [
+        ("cd", "Facture client"),
+        ("traite", "Traite client"),
+        ("avoir", "Avoir"),
+        ("facture_achat", "Facture fournisseur"),
+        ("traite_fournisseur", "Traite fournisseur"),
+        ("fiche_paie", "Fiche de paie"),
+        ("avance", "Avance"),
+    ]
+    DIRECTION_CHOICES = [
+        ("income", "Encaissement"),
+        ("expense", "Décaissement"),
+    ]
+
+    source_type = models.CharField(max_length=30, choices=SOURCE_CHOICES)
+    source_id = models.PositiveIntegerField()
+    date = models.DateField(null=True, blank=True)
+    direction = models.CharField(max_length=10, choices=DIRECTION_CHOICES)
+    amount = models.DecimalField(max_digits=14, decimal_places=3, null=True, blank=True)
+    status = models.CharField(max_length=50, null=True, blank=True)
+    counterparty = models.CharField(max_length=255, null=True, blank=True)
+    payment_mode = models.CharField(max_length=20, null=True, blank=True)
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["-date", "source_type", "source_id"]
+        unique_together = ("source_type", "source_id")
+        indexes = [
+            models.Index(fields=["date"]),
+            models.Index(fields=["source_type", "date"]),
+            models.Index(fields=["direction", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source_type} {self.source_id} - {self.date}: {self.amount}"
+
+
+class DocumentSequence(models.Model):
+    """
+    Last number issued per document prefix and year. Numbers are allocated
+    by an atomic UPDATE of this row (next_number), never by scanning the
+    documents, so two concurrent creations can't get the same number.
+    """
+
+    prefix = models.CharField(max_length=30, help_text="Document prefix (FAC, AV-BL, DEV...)")
+    year = models.PositiveIntegerField()
+    last_number = models.PositiveIntegerField(default=0, help_text="Last number issued")
+
+    class Meta:
+        unique_together = ("prefix", "year")
+
+    def __str__(self):
+        return f"{self.prefix}-{self.year}: {self.last_number}"
+
+    @classmethod
+    def next_number(cls, prefix, year=None, issued=None, count=1, at_least=0):
+        """
+        Allocates the next `count` numbers of (prefix, year), returns the
+        last one. The row lock taken by the UPDATE is held until the
+        surrounding transaction commits.
+        issued: iterable of the numbers already issued for this prefix and
+        year, read once when the sequence is created.
+        at_least: the allocation starts after this number (numbers given by hand).
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models import F, Value
+        from django.db.models.functions import Greatest
+
+        if year is None:
+            year = timezone.localdate().year
+        sequences = cls.objects.filter(prefix=prefix, year=year)
+        next_value = Greatest(F("last_number"), Value(at_least)) + count
+        with transaction.atomic():
+            if not sequences.update(last_number=next_value):
+                try:
+                    with transaction.atomic():
+                        start = max(max(issued or [], default=0), at_least)
+                        return cls.objects.create(prefix=prefix, year=year, last_number=start + count).last_number
+                except IntegrityError:
+                    # Created concurrently
+                    sequences.update(last_number=next_value)
+            return sequences.values_list("last_number", flat=True).get()
+
+
+def get_issued_numbers(queryset, field, prefix):
+    """Sequential part of the numbers of queryset starting with prefix (PREFIX-00042 -> 42)."""
+    for numero in queryset.filter(**{f"{field}__startswith": prefix}).values_list(field, flat=True).iterator():
+        suffix = numero[len(prefix):]
+        if suffix.isdigit():
+            yield int(suffix)
+
+
+def parse_ref_produit(ref):
+    """(prefix, number) of a generated looking code (AC-0042), else None."""
+    prefix, _, number = ref.rpartition("-")
+    if prefix in MATIERE_PREFIXES.values() and number.isdigit():
+        return prefix, int(number)
+    return None
+
+
+def reserve_refs_produit(prefix, count, at_least=0):
+    """
+    Reserves `count` consecutive ref_produit codes PREFIX-NNNN, after
+    at_least; returns them. The codes don't restart every year (year 0).
+    """
+    last = DocumentSequence.next_number(
+        f"REF-{prefix}", 0,
+        issued=get_issued_numbers(Produit.objects.all(), "ref_produit", f"{prefix}-"),
+        count=count, at_least=at_least,
+    )
+    return [f"{prefix}-{number:04d}" for number in range(last - count + 1, last + 1)]
+
+
+def reserve_codes_client(count, at_least=0):
+    """
+    Reserves `count` consecutive code_client values (00042), after at_least;
+    returns them. The sequence starts after the codes already issued, which
+    used to be the client id.
+    """
+    last = DocumentSequence.next_number(
+        "CLIENT", 0, issued=get_issued_numbers(Client.objects.all(), "code_client", ""),
+        count=count, at_least=at_least,
+    )
+    return [f"{number:05d}" for number in range(last - count + 1, last + 1)]
+
+
+def get_facture_prefix(type_facture, nature):
+    if nature == "facture":
+        return "FAC-BL" if type_facture == "bon" else "FAC"
+    if nature == "avoir-facture":
+        return "AV-FAC-BL" if type_facture == "bon" else "AV-FAC"
+    return "AV-BL" if type_facture == "bon" else "AV"
+
+
+def generate_numero(prefix, sources, digits=5, sequence=None):
+    """
+    Next PREFIX-YEAR-NNNNN number from the DocumentSequence `sequence`
+    (default: prefix). sources: (queryset, field) pairs holding the numbers
+    issued before the sequence existed.
+    """
+    year = timezone.localdate().year
+    numero_prefix = f"{prefix}-{year}-"
+    number = DocumentSequence.next_number(
+        sequence or prefix, year,
+        issued=(n for queryset, field in sources for n in get_issued_numbers(queryset, field, numero_prefix)),
+    )
+    return f"{numero_prefix}{number:0{digits}d}"
+
+
+def record_numero(numero, prefix, sources, sequence=None):
+    """
+    Moves the sequence of a PREFIX-YEAR-NNNNN number typed by hand past it,
+    so that generate_numero never hands it out again. Other numbers are ignored.
+    """
+    year, _, number = numero.removeprefix(f"{prefix}-").partition("-")
+    if not (numero.startswith(f"{prefix}-") and year.isdigit() and number.isdigit()):
+        return
+    numero_prefix = f"{prefix}-{year}-"
+    DocumentSequence.next_number(
+        sequence or prefix, int(year),
+        issued=(n for queryset, field in sources for n in get_issued_numbers(queryset, field, numero_prefix)),
+        count=0, at_least=int(number),
+    )
@@ -0,0 +1,216 @@
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.db.models import Sum, Q, DateField, DateTimeField
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from api.utils.memo import memoized
+from api.models import Avoir, Cd, Traite, TraiteFournisseur, FichePaie, FactureAchatProduit, TresorerieJour
+from .snapshot_service import get_closed_totals
+
+INCOME = "income"
+EXPENSE = "expense"
+
+
+def get_flow_sources():
+    """
+    Every cash flow used by the treasury KPIs, grouped by source model.
+    Each flow is (name, direction, amount_field, filter, up_to_today);
+    up_to_today flows only count once their date is reached.
+    """
+    return [
+        (Cd, "date_commande", [
+            # Factures client payées (hors mixte / traite)
+            ("cd", INCOME, "montant_ttc",
+             Q(statut='completed', is_deleted=False) & ~Q(mode_paiement__in=['mixte', 'traite']), False),
+            # Factures client mixtes, partie comptant
+            ("cd_mixte", INCOME, "mixte_comptant",
+             Q(statut='completed', mode_paiement='mixte', is_deleted=False), False),
+        ]),
+        (Traite, "date_echeance", [
+            ("traite", INCOME, "montant", Q(status='PAYEE'), False),
+        ]),
+        (Avoir, "date_avoir", [
+            # Remboursements avoirs fournisseur
+            ("avoir", INCOME, "montant_total", Q(), True),
+        ]),
+        (FactureAchatProduit, "date_facture", [
+            # Factures fournisseur réglées (hors mixte / traite)
+            ("facture_achat", EXPENSE, "prix_total",
+             ~Q(mode_paiement__in=['mixte', 'traite']), True),
+            # Factures fournisseur mixtes, partie comptant
+            ("facture_achat_mixte", EXPENSE, "mixte_comptant", Q(mode_paiement='mixte'), True),
+        ]),
+        (TraiteFournisseur, "date_echeance", [
+            ("traite_fournisseur", EXPENSE, "montant", Q(status='PAYEE'), False),
+        ]),
+        (FichePaie, "date_paiement", [
+            # Salaires payés (net à payer)
+            ("salaire", EXPENSE, "net_a_payer", Q(), False),
+        ]),
+    ]
+
+
+def get_flow_directions():
+    return {
+        name: direction
+        for _, _, flows in get_flow_sources()
+        for name, direction, _, _, _ in flows
+    }
+
+
+def get_model_flows(model):
+    for source_model, date_field, flows in get_flow_sources():
+        if source_model is model:
+            return date_field, flows
+    return None, []
+
+
+def to_decimal(value):
+    if value is None:
+        return Decimal("0")
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def get_date_filter(model, date_field, start=None, end=None):
+    """
+    Q of the rows dated from start to end (both included, both optional).
+    A DateTimeField (ex: FichePaie.date_paiement) is compared with the
+    bounds of the days in the current time zone rather than through
+    __date, which wraps the column and keeps its index unused.
+    """
+    if isinstance(model._meta.get_field(date_field), DateTimeField):
+        def to_bound(day):
+            return timezone.make_aware(datetime.combine(day, time.min))
+        lookups = {"gte": start and to_bound(start), "lt": end and to_bound(end + timedelta(days=1))}
+    else:
+        lookups = {"gte": start, "lte": end}
+    return Q(**{f"{date_field}__{lookup}": value for lookup, value in lookups.items() if value is not None})
+
+
+def get_flow_filter(model, date_field, flow_q, up_to_today, today):
+    if up_to_today:
+        return flow_q & get_date_filter(model, date_field, end=today)
+    return flow_q
+
+
+def _aggregate_model(model, date_field, flows, periods, weekly, today):
+    expressions = {}
+    flow_filters = []
+    for name, _, amount_field, flow_q, up_to_today in flows:
+        flow_q = get_flow_filter(model, date_field, flow_q, up_to_today, today)
+        flow_filters.append(flow_q)
+        expressions[f"{name}__global"] = Sum(amount_field, filter=flow_q)
+        for period, (start_date, end_date) in periods.items():
+            period_q = flow_q & get_date_filter(model, date_field, start_date, end_date)
+            expressions[f"{name}__{period}"] = Sum(amount_field, filter=period_q)
+
+    qs = model.objects.all()
+    if all(flow_filters):
+        # Only scan rows that belong to at least one flow
+        qs = qs.filter(reduce(or_, flow_filters))
+    if not weekly:
+        return [qs.aggregate(**expressions)]
+
+    return list(
+        qs.annotate(week=TruncWeek(date_field, output_field=DateField()))
+        .values("week")
+        .annotate(**expressions)
+        .order_by()
+    )
+
+
+def _aggregate_documents(result, periods, weekly, today):
+    for model, date_field, flows in get_flow_sources():
+        for row in _aggregate_model(model, date_field, flows, periods, weekly, today):
+            for name, _, _, _, _ in flows:
+                amount = to_decimal(row[f"{name}__global"])
+                result["global"][name] += amount
+                if weekly and row["week"] is not None:
+                    result["weeks"][row["week"]][name] += amount
+                for period in periods:
+                    result["periods"][period][name] += to_decimal(row[f"{name}__{period}"])
+
+
+def _aggregate_rollup(result, periods, weekly, today):
+    up_to_today = [
+        name
+        for _, _, flows in get_flow_sources()
+        for name, _, _, _, flag in flows if flag
+    ]
+    expressions = {"montant_global": Sum("montant")}
+    period_filters = []
+    for period, (start_date, end_date) in periods.items():
+        period_filters.append(Q(date__range=(start_date, end_date)))
+        expressions[f"montant_{period}"] = Sum("montant", filter=period_filters[-1])
+
+    qs = TresorerieJour.objects.exclude(flux__in=up_to_today, date__gt=today)
+
+    # Global = closed period snapshots + live delta since the last closed day
+    closed_until, closed_totals = get_closed_totals()
+    if closed_until:
+        for name, amount in closed_totals.items():
+            result["global"][name] += amount
+        live = Q(date__gt=closed_until)
+        expressions["montant_global"] = Sum("montant", filter=live)
+        if not weekly:
+            # Only the delta and the requested periods are read from the daily rollup
+            qs = qs.filter(reduce(or_, period_filters, live))
+    if weekly:
+        # Closed weeks are still charted from the rollup, unfiltered
+        expressions["montant_semaine"] = Sum("montant")
+        qs = qs.annotate(week=TruncWeek("date", output_field=DateField())).values("flux", "week")
+    else:
+        qs = qs.values("flux")
+
+    for row in qs.annotate(**expressions).order_by():
+        name = row["flux"]
+        amount = to_decimal(row["montant_global"])
+        result["global"][name] += amount
+        if weekly:
+            result["weeks"][row["week"]][name] += to_decimal(row["montant_semaine"])
+        for period in periods:
+            result["periods"][period][name] += to_decimal(row[f"montant_{period}"])
+
+
+@memoized
+def aggregate_flows(periods=None, weekly=False, today=None, from_documents=False):
+    """
+    Computes every treasury flow for the whole history and for each named
+    period.
+
+    periods: {"current": (start, end), "previous": (start, end), ...}
+    weekly: also group each flow by week (Monday) of its date.
+    from_documents: read the document tables (one query per source model)
+    instead of the TresorerieJour daily rollup, where the global totals are
+    the TresoreriePeriode snapshots plus the days after the last closed
+    period (two queries).
+
+    Returns {"global": {flow: total}, "periods": {period: {flow: total}},
+    "weeks": {monday: {flow: total}}}.
+    """
+    periods = periods or {}
+    today = today or date.today()
+    result = {
+        "global": defaultdict(Decimal),
+        "periods": {period: defaultdict(Decimal) for period in periods},
+        "weeks": defaultdict(lambda: defaultdict(Decimal)),
+    }
+
+    if from_documents:
+        _aggregate_documents(result, periods, weekly, today)
+    else:
+        _aggregate_rollup(result, periods, weekly, today)
+    return result
+
+
+def split_flows(totals):
+    """Returns (income, expense) for a {flow: total} mapping."""
+    directions = get_flow_directions()
+    income = sum((v for k, v in totals.items() if directions.get(k) == INCOME), Decimal("0"))
+    expense = sum((v for k, v in totals.items() if directions.get(k) == EXPENSE), Decimal("0"))
+    return income, expense
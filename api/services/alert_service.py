@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import Count, Q
+from api.models import Traite, TraiteFournisseur
+from api.services.schedule_service import get_schedule
+
+CRITICAL_FORECAST = 5000
+LARGE_EVENT_AMOUNT = 10000
+SOON_DAYS = 7
+
+
+def count_traites_alerts(today=None):
+    """
+    Returns (echues, bientot_echues): unpaid traites past their échéance and
+    unpaid traites due within SOON_DAYS, with one count query per model.
+    """
+    today = today or date.today()
+    soon = today + timedelta(days=SOON_DAYS)
+    echues = bientot_echues = 0
+    for model in (Traite, TraiteFournisseur):
+        counts = model.objects.filter(plan_traite__is_deleted=False).exclude(status="PAYEE").aggregate(
+            echues=Count("id", filter=Q(date_echeance__lt=today)),
+            bientot_echues=Count("id", filter=Q(date_echeance__range=(today, soon))),
+        )
+        echues += counts["echues"]
+        bientot_echues += counts["bientot_echues"]
+    return echues, bientot_echues
+
+
+def generate_alerts(forecast, balance, expected_income, expected_expense):
+    alerts = []
+
+    # Alert 1: Solde critique
+    if forecast < CRITICAL_FORECAST:
+        alerts.append({
+            "type": "critical",
+            "title": "Solde critique prévu",
+            "description": f"Solde prévisionnel faible : {forecast} DT (seuil: 5,000 DT)",
+        })
+
+    # Alert 2: Solde net négatif
+    if balance < 0:
+        alerts.append({
+            "type": "danger",
+            "title": "Solde actuel négatif",
+            "description": f"Solde de trésorerie actuel est négatif : {balance} DT",
+        })
+
+    # Alert 3: Dépenses prévues supérieures aux recettes attendues
+    if expected_expense > expected_income:
+        delta = expected_expense - expected_income
+        alerts.append({
+            "type": "warning",
+            "title": "Dépenses prévues > Recettes attendues",
+            "description": f"Écart de {delta} DT entre les dépenses ({expected_expense}) et les recettes ({expected_income}) attendues.",
+        })
+
+    # Alert 4: Evénements à venir importants (filtered by amount in SQL)
+    for item in get_schedule(min_amount=LARGE_EVENT_AMOUNT):
+        amount = Decimal(item["amount"])
+        if amount < 0:
+            alerts.append({
+                "type": "info",
+                "title": "Dépense importante à venir",
+                "description": f"{item['description']} le {item['date']} ({-amount} DT)",
+            })
+        else:
+            alerts.append({
+                "type": "info",
+                "title": "Encaissement important prévu",
+                "description": f"{item['description']} le {item['date']} (+{amount} DT)",
+            })
+
+    echues, bientot_echues = count_traites_alerts()
+
+    # Alert 5: Traites en retard
+    if echues:
+        alerts.append({
+            "type": "danger",
+            "title": "Traites en retard",
+            "description": f"{echues} traite(s) sont échues et non payées."
+        })
+
+    # Alert 6: Traites en cours bientôt échues
+    if bientot_echues:
+        alerts.append({
+            "type": "warning",
+            "title": "Traitements bientôt échus",
+            "description": f"{bientot_echues} traite(s) en cours échues dans moins de 7 jours.",
+        })
+
+    return alerts
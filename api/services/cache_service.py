@@ -0,0 +1,146 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+# Treasury data version, bumped on every write to a treasury document
+VERSION_KEY = "tresorerie:version"
+CACHE_TIMEOUT = 60 * 60
+# Set by the precompute_tresorerie worker while it runs
+WORKER_KEY = "tresorerie:worker"
+
+# {"stamp": stamp of the result served} inside track_served_stamp()
+_served_stamp = ContextVar("served_stamp", default=None)
+
+
+def get_data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Time based so that a lost counter never reuses an old version
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+        return version
+
+
+def get_or_compute(name, compute, *params):
+    """
+    Returns compute() cached under (name, params, data version). The day is
+    part of the key too since the results depend on date.today().
+    """
+    key = get_cache_key(name, *params)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def get_cache_key(name, *params):
+    return ":".join(["tresorerie", name, str(get_data_version()), date.today().isoformat(), *map(str, params)])
+
+
+def get_stamp():
+    return get_data_version(), date.today().isoformat()
+
+
+@contextmanager
+def track_served_stamp():
+    """Records the stamp of the results served by get_or_serve_stale in the block."""
+    served = {}
+    token = _served_stamp.set(served)
+    try:
+        yield served
+    finally:
+        _served_stamp.reset(token)
+
+
+def _record_served(stamp):
+    served = _served_stamp.get()
+    if served is not None:
+        served["stamp"] = stamp
+
+
+def get_latest_key(name, *params):
+    return ":".join(["tresorerie", "latest", name, *map(str, params)])
+
+
+def store_latest(name, params, result, stamp):
+    # No timeout: the last good result is served until it is replaced. The
+    # views only accept the params of get_standard_payloads (precompute_service)
+    cache.set(get_latest_key(name, *params), (stamp, result), None)
+
+
+def is_fresh(name, *params):
+    entry = cache.get(get_latest_key(name, *params))
+    return entry is not None and entry[0] == get_stamp()
+
+
+def get_refresh_key(name, *params):
+    return ":".join(["tresorerie", "refresh", name, *map(str, params)])
+
+
+def request_refresh(name, params):
+    # One key per payload: concurrent requests can't overwrite each other
+    cache.add(get_refresh_key(name, *params), True, None)
+
+
+def pop_refresh_requests(payloads):
+    """The (name, params) of payloads whose stale result was served since the last call."""
+    keys = {get_refresh_key(name, *params): (name, tuple(params)) for name, params in payloads}
+    requested = cache.get_many(keys)
+    cache.delete_many(requested)
+    return [payload for key, payload in keys.items() if key in requested]
+
+
+def _get_servable(name, params):
+    """
+    (stamp, entry) where entry is the last result if it is fresh, or if it
+    is stale while the worker is running (a refresh is requested); else None.
+    """
+    stamp = get_stamp()
+    entry = cache.get(get_latest_key(name, *params))
+    if entry is None or entry[0] == stamp:
+        return stamp, entry
+    if cache.get(WORKER_KEY) is not None:
+        request_refresh(name, params)
+        return stamp, entry
+    return stamp, None
+
+
+def get_or_serve_stale(name, compute, *params):
+    """
+    Stale-while-revalidate get_or_compute: when the data changed, the last
+    good result is returned at once and the precompute_tresorerie worker
+    recomputes it. Without a running worker, compute() is called inline.
+    """
+    stamp, entry = _get_servable(name, params)
+    if entry is not None:
+        _record_served(entry[0])
+        return entry[1]
+    result = compute()
+    store_latest(name, params, result, stamp)
+    _record_served(stamp)
+    return result
+
+
+async def aget_or_serve_stale(name, compute, *params):
+    """get_or_serve_stale for the async views: compute is a coroutine function."""
+    stamp, entry = await sync_to_async(_get_servable)(name, params)
+    if entry is not None:
+        _record_served(entry[0])
+        return entry[1]
+    result = await compute()
+    await sync_to_async(store_latest)(name, params, result, stamp)
+    _record_served(stamp)
+    return result
@@ -1,44 +1,151 @@
-from datetime import timedelta
-from django.db.models import Sum
-from api.models import Cd, FactureAchatProduit, TraiteFournisseur, Traite
-from .kpi_service import compute_kpis
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db.models import Sum, DateField
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncQuarter
+from api.models import TresorerieJour
+from .aggregation_service import (
+    INCOME, get_flow_sources, get_flow_directions, get_flow_filter, get_date_filter, to_decimal,
+)
 
-def compute_chart_data(start_date, end_date, labels, period_type):
-    date_groups = []
-    evolution_weeks = '7d'
-    if period_type == "week":
-        # Adjust to Monday of the week
-        monday = start_date - timedelta(days=start_date.weekday())
-        for i in range(6):  # Monday to Saturday
-            d = monday + timedelta(days=i)
-            date_groups.append((d, d))
-    elif period_type == "month":
-        for i in range(4):
-            start = start_date + timedelta(days=i*7)
-            end = start + timedelta(days=6)
-            date_groups.append((start, end))
-            evolution_weeks = '30d'
-    elif period_type == "quarter":
-        for i in range(3):
-            start = start_date + timedelta(days=i*30)
-            end = start + timedelta(days=29)
-            date_groups.append((start, end))
-            evolution_weeks = '90d'
-    elif period_type == "year":
-        for i in range(4):
-            start = start_date + timedelta(days=i*91)
-            end = start + timedelta(days=90)
-            date_groups.append((start, end))
-            evolution_weeks = '1y'
-    # Dynamically override the default range_func
-    def range_func(offset):
-        return date_groups[0][0], date_groups[-1][0]
-    
-    kpis = compute_kpis(evolution_weeks=evolution_weeks, range_func=range_func)
-    chart_data = kpis.get("treasury_chart_data", {})
+# granularity: (truncation, months per bucket, label format)
+CHART_GRANULARITIES = {
+    "day": (TruncDay, 0, "%d/%m"),
+    "week": (TruncWeek, 0, "%d/%m"),
+    "month": (TruncMonth, 1, "%m/%Y"),
+    "quarter": (TruncQuarter, 3, None),
+}
+MAX_BUCKETS = 400
+
+# Period of PeriodView -> granularity of its chart
+PERIOD_CHART_GRANULARITIES = {
+    "week": "day",
+    "month": "week",
+    "quarter": "month",
+    "year": "quarter",
+}
+
+
+def get_bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    _, months, _ = CHART_GRANULARITIES[granularity]
+    if months:
+        return date(day.year, day.month - (day.month - 1) % months, 1)
+    return day
+
+
+def get_buckets(granularity, start_date, end_date):
+    """Start of every bucket between start_date and end_date, gaps included."""
+    _, months, _ = CHART_GRANULARITIES[granularity]
+    bucket = get_bucket_start(start_date, granularity)
+    buckets = []
+    while bucket <= end_date:
+        buckets.append(bucket)
+        if months:
+            year, month = divmod(bucket.year * 12 + bucket.month - 1 + months, 12)
+            bucket = date(year, month + 1, 1)
+        else:
+            bucket += timedelta(days=7 if granularity == "week" else 1)
+    return buckets
+
+
+def get_bucket_label(bucket, granularity):
+    _, _, label_format = CHART_GRANULARITIES[granularity]
+    if label_format is None:
+        return f"T{(bucket.month - 1) // 3 + 1} {bucket.year}"
+    return bucket.strftime(label_format)
+
+
+def _series_from_rollup(granularity, start_date, end_date, today):
+    trunc, _, _ = CHART_GRANULARITIES[granularity]
+    up_to_today = [
+        name
+        for _, _, flows in get_flow_sources()
+        for name, _, _, _, flag in flows if flag
+    ]
+    rows = (
+        TresorerieJour.objects.filter(date__range=(start_date, end_date))
+        .exclude(flux__in=up_to_today, date__gt=today)
+        .annotate(bucket=trunc("date", output_field=DateField()))
+        .values("bucket", "flux")
+        .annotate(montant=Sum("montant"))
+        .order_by()
+    )
+    for row in rows:
+        yield row["bucket"], row["flux"], row["montant"]
 
+
+def _series_from_documents(granularity, start_date, end_date, today):
+    trunc, _, _ = CHART_GRANULARITIES[granularity]
+    for model, date_field, flows in get_flow_sources():
+        expressions = {
+            name: Sum(amount_field, filter=get_flow_filter(model, date_field, flow_q, up_to_today, today))
+            for name, _, amount_field, flow_q, up_to_today in flows
+        }
+        rows = (
+            model.objects.filter(get_date_filter(model, date_field, start_date, end_date))
+            .annotate(bucket=trunc(date_field, output_field=DateField()))
+            .values("bucket")
+            .annotate(**expressions)
+            .order_by()
+        )
+        for row in rows:
+            for name, _, _, _, _ in flows:
+                yield row["bucket"], name, row[name]
+
+
+def get_chart_series(granularity, start_date, end_date, today=None, from_documents=False):
+    """
+    Income, expense and balance per day / week / month / quarter between
+    start_date and end_date, every bucket present (0 when empty), formatted
+    for chart.js.
+
+    The buckets are computed by the database (Trunc* + GROUP BY): a single
+    query on the TresorerieJour rollup, or one query per source model with
+    from_documents.
+    """
+    if granularity not in CHART_GRANULARITIES:
+        raise ValueError(f"Granularité invalide: {granularity}")
+    if start_date > end_date:
+        raise ValueError("La date de début doit précéder la date de fin")
+    buckets = get_buckets(granularity, start_date, end_date)
+    if len(buckets) > MAX_BUCKETS:
+        raise ValueError(f"Trop de points ({len(buckets)}), maximum {MAX_BUCKETS}")
+
+    today = today or date.today()
+    read_series = _series_from_documents if from_documents else _series_from_rollup
+    directions = get_flow_directions()
+    income = defaultdict(Decimal)
+    expense = defaultdict(Decimal)
+    for bucket, flux, amount in read_series(granularity, start_date, end_date, today):
+        totals = income if directions[flux] == INCOME else expense
+        totals[bucket] += to_decimal(amount)
+
+    income_data = [income[bucket] for bucket in buckets]
+    expense_data = [expense[bucket] for bucket in buckets]
+    return {
+        "granularity": granularity,
+        "start": start_date,
+        "end": end_date,
+        "labels": [get_bucket_label(bucket, granularity) for bucket in buckets],
+        "datasets": [
+            {"label": "Encaissements", "data": income_data, "borderColor": "#10b981"},
+            {"label": "Décaissements", "data": expense_data, "borderColor": "#ef4444"},
+            {
+                "label": "Solde",
+                "data": [i - e for i, e in zip(income_data, expense_data)],
+                "borderColor": "#3b82f6",
+            },
+        ],
+    }
+
+
+def compute_chart_data(start_date, end_date, labels, period_type):
+    series = get_chart_series(PERIOD_CHART_GRANULARITIES.get(period_type, "day"), start_date, end_date)
+    income, expense, _ = (dataset["data"] for dataset in series["datasets"])
     return {
-        "labels": chart_data.get("labels", labels), 
-        "encaissements": (kpis["income"]['value'], []),
-        "decaissements": (kpis["expense"]['value'], [])
-    }
\ No newline at end of file
+        "labels": series["labels"] or labels,
+        "encaissements": (sum(income, Decimal("0")), income),
+        "decaissements": (sum(expense, Decimal("0")), expense),
+    }
@@ -0,0 +1,88 @@
+from calendar import monthrange
+from datetime import date, timedelta
+import numpy as np
+from django.db.models import Sum, Q
+from api.models import Cd, Traite, TraiteFournisseur, FichePaie
+from api.services.aggregation_service import aggregate_flows, split_flows
+
+FORECAST_DAYS = 365
+
+
+def _daily_totals(qs, date_field, amount_field):
+    # Grouped by day in SQL: at most one row per distinct date
+    rows = qs.values_list(date_field).annotate(total=Sum(amount_field)).order_by()
+    return [(day, total) for day, total in rows if day is not None and total]
+
+
+def get_future_flows():
+    """
+    Future commitments as (direction, [(date, amount)]) lists, one grouped
+    query per source. Overdue items are kept: they are still expected.
+    """
+    # Factures only: pending avoirs are not incoming cash
+    pending_cd = Cd.objects.filter(is_deleted=False, nature='facture').exclude(statut__in=['cancelled', 'completed'])
+
+    salaires = []
+    fiches = (
+        FichePaie.objects.filter(statut='Générée')
+        .values_list('annee', 'mois').annotate(total=Sum('net_a_payer')).order_by()
+    )
+    for annee, mois, total in fiches:
+        # Salaries are paid at the end of the month
+        if total and 1 <= mois <= 12:
+            salaires.append((date(annee, mois, monthrange(annee, mois)[1]), total))
+
+    return [
+        # Traites clients non payées
+        ("income", _daily_totals(
+            Traite.objects.filter(status='NON_PAYEE', plan_traite__is_deleted=False),
+            'date_echeance', 'montant')),
+        # Factures clients en attente (hors mixte / traite)
+        ("income", _daily_totals(
+            pending_cd.exclude(mode_paiement__in=['mixte', 'traite']), 'date_commande', 'montant_ttc')),
+        # Factures clients mixtes, partie comptant
+        ("income", _daily_totals(
+            pending_cd.filter(mode_paiement='mixte'), 'date_commande', 'mixte_comptant')),
+        # Traites fournisseurs non payées
+        ("expense", _daily_totals(
+            TraiteFournisseur.objects.filter(
+                ~Q(status='PAYEE'), plan_traite__is_deleted=False
+            ), 'date_echeance', 'montant')),
+        # Fiches de paie générées
+        ("expense", salaires),
+    ]
+
+
+def compute_forecast(days=FORECAST_DAYS, today=None):
+    """
+    Projected treasury balance for each of the next `days` days: current
+    balance plus the cumulative sum of the future commitments per day.
+    """
+    today = today or date.today()
+    income = np.zeros(days + 1)
+    expense = np.zeros(days + 1)
+
+    for direction, flows in get_future_flows():
+        if not flows:
+            continue
+        dates = np.array([d for d, _ in flows], dtype="datetime64[D]")
+        amounts = np.array([float(a) for _, a in flows])
+        # Overdue commitments fall on day 0, the ones after the horizon are dropped
+        offsets = np.clip((dates - np.datetime64(today, "D")).astype(int), 0, None)
+        in_horizon = offsets <= days
+        target = income if direction == "income" else expense
+        target += np.bincount(offsets[in_horizon], weights=amounts[in_horizon], minlength=days + 1)
+
+    global_income, global_expense = split_flows(aggregate_flows()["global"])
+    start_balance = float(global_income - global_expense)
+    balance = start_balance + np.cumsum(income - expense)
+    lowest = int(balance.argmin())
+
+    return {
+        "labels": [(today + timedelta(days=i)).isoformat() for i in range(days + 1)],
+        "encaissements": np.round(income, 3).tolist(),
+        "decaissements": np.round(expense, 3).tolist(),
+        "solde": np.round(balance, 3).tolist(),
+        "solde_initial": round(start_balance, 3),
+        "solde_min": {"date": (today + timedelta(days=lowest)).isoformat(), "value": round(float(balance[lowest]), 3)},
+    }
@@ -0,0 +1,194 @@
+import csv
+import io
+import zipfile
+from collections import defaultdict
+from django.db import transaction
+from api.import_serializers import ClientImportSerializer, ProduitImportSerializer
+from api.models import (
+    Categorie, Client, Produit, MATIERE_PREFIXES, parse_ref_produit, reserve_codes_client, reserve_refs_produit,
+)
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ROWS = 50000
+
+
+def read_rows(upload):
+    """
+    [(line number, {column: value})] of an uploaded CSV (',' or ';'
+    separated, UTF-8) or XLSX file; the first line is the header and empty
+    cells are left out.
+    """
+    name = upload.name.lower()
+    if name.endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+            from openpyxl.utils.exceptions import InvalidFileException
+        except ImportError:
+            raise ValueError("L'import XLSX nécessite le paquet openpyxl")
+        try:
+            lines = load_workbook(upload, read_only=True, data_only=True).active.iter_rows(values_only=True)
+        except (zipfile.BadZipFile, InvalidFileException):
+            # Corrupt file, or another format renamed .xlsx
+            raise ValueError("Fichier XLSX illisible")
+    elif name.endswith(".csv"):
+        try:
+            text = upload.read().decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("Le fichier CSV doit être encodé en UTF-8")
+        try:
+            dialect = csv.Sniffer().sniff(text[:4096], delimiters=",;")
+        except csv.Error:
+            dialect = csv.excel
+        lines = csv.reader(io.StringIO(text), dialect)
+    else:
+        raise ValueError("Format non supporté, fichier CSV ou XLSX attendu")
+
+    header = [str(column or "").strip() for column in next(lines, [])]
+    rows = []
+    for number, values in enumerate(lines, start=2):
+        row = {
+            column: value.strip() if isinstance(value, str) else value
+            for column, value in zip(header, values)
+            if column and value not in (None, "")
+        }
+        if row:
+            rows.append((number, row))
+        if len(rows) > MAX_IMPORT_ROWS:
+            raise ValueError(f"Trop de lignes, maximum {MAX_IMPORT_ROWS}")
+    return rows
+
+
+def validate_rows(rows, serializer_class):
+    """Splits the rows into [(line, validated_data)] and [{"row", "errors"}]."""
+    valid, errors = [], []
+    for number, row in rows:
+        serializer = serializer_class(data=row)
+        if serializer.is_valid():
+            valid.append((number, serializer.validated_data))
+        else:
+            errors.append({"row": number, "errors": serializer.errors})
+    return valid, errors
+
+
+def chunks(items, size=IMPORT_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def get_categories(names):
+    """({nom: id}, {(categorie nom, sous-catégorie nom): id}) in one query."""
+    categories, sous_categories = {}, {}
+    rows = Categorie.objects.filter(nom__in=names).values_list(
+        "id", "nom", "sous_categories__id", "sous_categories__nom"
+    )
+    for categorie_id, nom, sous_categorie_id, sous_categorie_nom in rows:
+        categories[nom] = categorie_id
+        if sous_categorie_id is not None:
+            sous_categories[(nom, sous_categorie_nom)] = sous_categorie_id
+    return categories, sous_categories
+
+
+def get_existing_values(model, field, values):
+    existing = set()
+    for chunk in chunks(list(values)):
+        existing.update(model.objects.filter(**{f"{field}__in": chunk}).values_list(field, flat=True))
+    return existing
+
+
+def import_produits(rows):
+    """
+    Creates the products of the file rows. Valid rows are inserted with
+    bulk_create, the others are reported: {"created": n, "errors": [...]}.
+
+    Each row is validated without query, then the whole file at once:
+    categories resolved by name (one query), ref_produit checked against the
+    file and the table (one IN query per chunk), and one contiguous
+    ref_produit range reserved per material prefix for the rows without one.
+    """
+    valid, errors = validate_rows(rows, ProduitImportSerializer)
+
+    categories, sous_categories = get_categories({data["categorie"] for _, data in valid if "categorie" in data})
+    refs = defaultdict(list)
+    for number, data in valid:
+        if data.get("ref_produit"):
+            refs[data["ref_produit"]].append(number)
+    existing_refs = get_existing_values(Produit, "ref_produit", refs)
+
+    produits = []
+    for number, data in valid:
+        row_errors = {}
+        categorie = data.pop("categorie", None)
+        sous_categorie = data.pop("sous_categorie", None)
+        if categorie:
+            if categorie not in categories:
+                row_errors["categorie"] = [f"Catégorie inconnue: {categorie}"]
+            data["categorie_id"] = categories.get(categorie)
+        if sous_categorie:
+            if (categorie, sous_categorie) not in sous_categories:
+                row_errors["sous_categorie"] = [f"Sous-catégorie inconnue pour cette catégorie: {sous_categorie}"]
+            data["sous_categorie_id"] = sous_categories.get((categorie, sous_categorie))
+        ref = data.get("ref_produit")
+        if ref in existing_refs:
+            row_errors["ref_produit"] = [f"Référence déjà utilisée: {ref}"]
+        elif ref and len(refs[ref]) > 1:
+            row_errors["ref_produit"] = [f"Référence en double dans le fichier (lignes {refs[ref]})"]
+        if row_errors:
+            errors.append({"row": number, "errors": row_errors})
+        else:
+            produits.append(Produit(**data))
+
+    # Rows without ref_produit per prefix, codes given by hand per prefix
+    missing = defaultdict(list)
+    given = defaultdict(int)
+    for produit in produits:
+        if not produit.ref_produit:
+            missing[MATIERE_PREFIXES.get(produit.materiau, "OT")].append(produit)
+        elif parsed := parse_ref_produit(produit.ref_produit):
+            prefix, number = parsed
+            given[prefix] = max(given[prefix], number)
+
+    with transaction.atomic():
+        for prefix in missing.keys() | given.keys():
+            codes = reserve_refs_produit(prefix, len(missing[prefix]), at_least=given[prefix])
+            for produit, code in zip(missing[prefix], codes):
+                produit.ref_produit = code
+        for chunk in chunks(produits):
+            Produit.objects.bulk_create(chunk)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": len(produits), "errors": errors}
+
+
+def import_clients(rows):
+    """
+    Creates the clients of the file rows, like import_produits: numero_fiscal
+    checked against the file and the table (one IN query per chunk), one
+    code_client range reserved for the batch, bulk_create.
+    """
+    valid, errors = validate_rows(rows, ClientImportSerializer)
+
+    numeros = defaultdict(list)
+    for number, data in valid:
+        numeros[data["numero_fiscal"]].append(number)
+    existing = get_existing_values(Client, "numero_fiscal", numeros)
+
+    clients = []
+    for number, data in valid:
+        numero_fiscal = data["numero_fiscal"]
+        if numero_fiscal in existing:
+            errors.append({"row": number, "errors": {"numero_fiscal": [f"Client déjà existant: {numero_fiscal}"]}})
+        elif len(numeros[numero_fiscal]) > 1:
+            errors.append({"row": number, "errors": {
+                "numero_fiscal": [f"Numéro fiscal en double dans le fichier (lignes {numeros[numero_fiscal]})"]
+            }})
+        else:
+            clients.append(Client(**data))
+
+    with transaction.atomic():
+        for client, code in zip(clients, reserve_codes_client(len(clients))):
+            client.code_client = code
+        for chunk in chunks(clients):
+            Client.objects.bulk_create(chunk)
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": len(clients), "errors": errors}
@@ -1,95 +1,35 @@
 from django.db.models import Sum, F
 from datetime import date, timedelta, datetime
 from django.utils.timezone import now
-from api.models import Avoir, Cd, Devis, Traite, TraiteFournisseur, Avance, FichePaie, Achat, FactureAchatProduit, PlanTraiteFournisseur
+from api.models import Avoir, Cd, Devis, Traite, TraiteFournisseur, Avance, FichePaie, Achat, FactureAchatProduit, PlanTraiteFournisseur, Transaction
 from api.utils.dates import get_week_range
-from api.services.schedule_service import get_schedule
-from .traite_service import get_all_traites
+from api.utils.memo import memoized
+from api.services.alert_service import generate_alerts
+from api.services.aggregation_service import aggregate_flows, split_flows
 from decimal import Decimal
+import logging
+
+logger = logging.getLogger(__name__)
 
 def get_period_range(range_func, offset=0):
     return range_func(offset)
 
 def compute_income(range_func=None, offset=0, globally=False): # if globally is true we calculate the global income without a date range
-    if not globally:
-        start_date, end_date = get_period_range(range_func, offset)
-
-    # Facture client payees
-    cd_total = compute_total( 
-        model=Cd,
-        date_field='date_commande',
-        filters={'statut': 'completed', 'is_deleted': False},
-        exclude_filters={'mode_paiement__in': ['mixte', 'traite']}, 
-        date_range=None if globally else (start_date, end_date),
-        aggregate_expression={'total': Sum('montant_ttc')}
-    )
-    # Facture client mode_paiement mixte partie comptant
-    cd_mixte_total = compute_total( 
-        model=Cd,
-        date_field='date_commande',
-        filters={'statut': 'completed', 'mode_paiement':'mixte','is_deleted': False},
-        date_range=None if globally else (start_date, end_date),
-        aggregate_expression={'total': Sum('mixte_comptant')}
-    )
-    # Traites client
-    traite_total = compute_total(
-        model=Traite,
-        date_field='date_echeance',
-        filters={'status': 'PAYEE'},
-        date_range=None if globally else (start_date, end_date),
-        aggregate_expression={'total': Sum('montant')}
-    )
-    # Remboursement avoir fournisseur
-    remb_total = compute_total( 
-        model=Avoir,
-        date_field='date_avoir',
-        filters={'date_avoir__lte': now().date()},
-        date_range=None if globally else (start_date, end_date),
-        aggregate_expression={'total': Sum('montant_total')}
-    )
-    print('Total factures client : ', cd_total)
-    print('Total factures mixtes client : ', cd_mixte_total)
-    print('Total traites client : ', traite_total)
-    print('Total remboursements avoirs : ', traite_total)
-    total_income = Decimal(cd_total) + Decimal(cd_mixte_total) + Decimal(traite_total) + Decimal(remb_total)
+    periods = {} if globally else {"period": get_period_range(range_func, offset)}
+    flows = aggregate_flows(periods=periods)
+    totals = flows["global"] if globally else flows["periods"]["period"]
+
+    logger.debug("Total factures client : %s", totals["cd"])
+    logger.debug("Total factures mixtes client : %s", totals["cd_mixte"])
+    logger.debug("Total traites client : %s", totals["traite"])
+    logger.debug("Total remboursements avoirs : %s", totals["avoir"])
+    total_income, _ = split_flows(totals)
     return total_income
 
 def compute_expenses(start_date=None, end_date=None, globally=False):
-    
-    # Factures fournisseurs réglées (mode_paiement != "traite")
-    factures_payees_total = compute_total(
-            model=FactureAchatMatiere,
-            date_field='date_facture',
-            filters={'date_facture__lte': now().date()},
-            exclude_filters={'mode_paiement__in': ['mixte','traite']},
-            date_range=None if globally else (start_date, end_date),
-            aggregate_expression={'total': Sum('prix_total')}
-        )
-    # Factures fournisseurs réglées (mode_paiement == "mixte"), adding part comptant
-    paiement_mixte_total = compute_total(
-            model=FactureAchatMatiere,
-            date_field='date_facture',
-            filters={'date_facture__lte': now().date(), 'mode_paiement':'mixte'},
-            date_range=None if globally else (start_date, end_date),
-            aggregate_expression={'total': Sum('mixte_comptant')}
-        )
-
-    # 4. Traites fournisseurs payées
-    traites_fournisseur_total = compute_total(
-            model=TraiteFournisseur,
-            date_field='date_echeance',
-            filters={'status': 'PAYEE'},
-            date_range=None if globally else (start_date, end_date),
-            aggregate_expression={'total': Sum('montant')}
-        )
-
-    # 5. Salaires payés (net à payer)
-    salaires_payes_total = compute_total(
-            model=FichePaie,
-            date_field='date_paiement',
-            date_range=None if globally else (start_date, end_date),
-            aggregate_expression={'total': Sum('net_a_payer')}
-        )
+    periods = {} if globally else {"period": (start_date, end_date)}
+    flows = aggregate_flows(periods=periods)
+    totals = flows["global"] if globally else flows["periods"]["period"]
 
     # 6. Avances versées non remboursées
     # This will be revised latery
@@ -103,15 +43,14 @@ def compute_expenses(start_date=None, end_date=None, globally=False):
     #     total += max(0, avance.montant - rembourse)
     # avances_non_remboursees_total = total
     
-    print('Total factures fournisseur payées: ', factures_payees_total)
-    print('Total paiement fournisseur mixte: ', paiement_mixte_total)
-    print('Total traites fournisseur: ', traites_fournisseur_total)
-    print('Total salaires payés: ', salaires_payes_total)
+    logger.debug("Total factures fournisseur payées: %s", totals["facture_achat"])
+    logger.debug("Total paiement fournisseur mixte: %s", totals["facture_achat_mixte"])
+    logger.debug("Total traites fournisseur: %s", totals["traite_fournisseur"])
+    logger.debug("Total salaires payés: %s", totals["salaire"])
     # print('Total avances non remboursées: ', avances_non_remboursees_total)
 
-    return (
-        Decimal(factures_payees_total) + Decimal(paiement_mixte_total) + Decimal(traites_fournisseur_total) + Decimal(salaires_payes_total) # + Decimal(avances_non_remboursees_total)
-    )
+    _, total_expenses = split_flows(totals)
+    return total_expenses # + Decimal(avances_non_remboursees_total)
 
 def compute_expected_income(start_date, end_date):
 
@@ -142,9 +81,9 @@ def compute_expected_income(start_date, end_date):
         aggregate_expression={'total': Sum('montant')}
     )
 
-    print('Total achats non payés: ', factures_non_payees)
-    print('Total achats mixtes : ', factures_non_payees_mixte)
-    print('Total traites non payées: ', traites_non_payees)
+    logger.debug("Total achats non payés: %s", factures_non_payees)
+    logger.debug("Total achats mixtes : %s", factures_non_payees_mixte)
+    logger.debug("Total traites non payées: %s", traites_non_payees)
 
     return (
         Decimal(factures_non_payees) + Decimal(factures_non_payees_mixte) + Decimal(traites_non_payees)
@@ -168,13 +107,14 @@ def compute_expected_expenses(start_date, end_date):
         aggregate_expression={'total': Sum('net_a_payer')}
     )
 
-    print('Total traites fournisseurs non payées: ', traites_fournisseurs_non_payees)
-    print('Total salaires à payer: ', salaires_a_payer)
+    logger.debug("Total traites fournisseurs non payées: %s", traites_fournisseurs_non_payees)
+    logger.debug("Total salaires à payer: %s", salaires_a_payer)
 
     return (
         Decimal(traites_fournisseurs_non_payees) + Decimal(salaires_a_payer)
     )
 
+@memoized
 def compute_total(model, date_field, filters=None, exclude_filters=None, date_range=None, aggregate_expression=None):
     filters = filters or {}
     qs = model.objects.filter(**filters)
@@ -187,10 +127,15 @@ def compute_total(model, date_field, filters=None, exclude_filters=None, date_ra
         return qs.aggregate(**aggregate_expression).get('total') or 0
     return qs.aggregate(total=Sum('amount')).get('total') or 0
 
-def compute_income_trend(range_func):
-    global_income = compute_income(globally=True)
-    curr_income = compute_income(range_func, offset=0)
-    prev_income = compute_income(range_func, offset=1)  
+def get_trend_flows(range_func, weekly=False):
+    # Current and previous period flows, computed in one query per source model
+    return aggregate_flows(periods={"current": range_func(0), "previous": range_func(1)}, weekly=weekly)
+
+def compute_income_trend(range_func, flows=None):
+    flows = flows or get_trend_flows(range_func)
+    global_income, _ = split_flows(flows["global"])
+    curr_income, _ = split_flows(flows["periods"]["current"])
+    prev_income, _ = split_flows(flows["periods"]["previous"])
 
     if prev_income == 0:
         trend = 0.0 if curr_income == 0 else 100.0
@@ -199,13 +144,11 @@ def compute_income_trend(range_func):
 
     return round(global_income, 3), round(curr_income, 3), round(trend, 2), round(prev_income, 3)
 
-def compute_expense_trend(range_func):
-    curr_start, curr_end = range_func(0)
-    prev_start, prev_end = range_func(1)
-
-    global_expense = compute_expenses(globally=True)
-    curr_exp = compute_expenses(curr_start, curr_end)
-    prev_exp = compute_expenses(prev_start, prev_end)
+def compute_expense_trend(range_func, flows=None):
+    flows = flows or get_trend_flows(range_func)
+    _, global_expense = split_flows(flows["global"])
+    _, curr_exp = split_flows(flows["periods"]["current"])
+    _, prev_exp = split_flows(flows["periods"]["previous"])
 
     trend = ((curr_exp - prev_exp) / prev_exp * 100) if prev_exp != 0 else (100 if curr_exp else 0)
 
@@ -233,7 +176,7 @@ def compute_expected_expenses_trend(range_func):
 
     return round(curr_expected_income, 3), round(trend, 2), round(prev_expected_income, 3)
 
-def compute_balance_trend(global_income, global_expenses, income_value, expense_value):
+def compute_balance_trend(global_income, global_expenses, income_value, expense_value, prev_income=None, prev_expense=None):
     # Global balance
     global_balance = Decimal(global_income) - Decimal(global_expenses)
 
@@ -241,9 +184,10 @@ def compute_balance_trend(global_income, global_expenses, income_value, expense_
     current_balance = Decimal(income_value) - Decimal(expense_value)
 
     # Previous period
-    prev_start, prev_end = get_week_range(1)
-    prev_income = compute_income(get_week_range, offset=1)
-    prev_expense = compute_expenses(prev_start, prev_end)
+    if prev_income is None or prev_expense is None:
+        prev_start, prev_end = get_week_range(1)
+        prev_income = compute_income(get_week_range, offset=1)
+        prev_expense = compute_expenses(prev_start, prev_end)
 
     # Previous balance
     previous_balance = Decimal(prev_income) - Decimal(prev_expense)
@@ -272,8 +216,7 @@ def compute_forecast_trend(current_balance, previous_balance, expected_income_va
 def get_week_label(start_date):
     return start_date.strftime("%d/%m")
 
-def get_treasury_evolution_weeks(evolution_weeks):
-    today = date.today()
+def get_treasury_evolution_weeks(evolution_weeks, flows=None):
     treasury_balances = []
     labels = []
 
@@ -288,19 +231,15 @@ def get_treasury_evolution_weeks(evolution_weeks):
         return 4  # default: 30d = 4 weeks
     num_weeks = period_to_num_weeks(evolution_weeks)
 
-    for week_offset in reversed(range(num_weeks)):
-        start_date, end_date = get_week_range(offset_weeks=-week_offset)
+    # Every week comes from the same grouped queries (TruncWeek), whatever num_weeks is
+    if flows is None:
+        flows = aggregate_flows(weekly=True)
 
-        # Prepare range_func to pass to compute functions
-        def range_func(offset):
-            return get_week_range(offset_weeks=-offset)
-
-        # Manually compute date range for labels and compute_expenses
+    for week_offset in reversed(range(num_weeks)):
         start_date, end_date = get_week_range(offset_weeks=-week_offset)
 
         labels.append(get_week_label(start_date))
-        income = compute_income(range_func, offset=week_offset)
-        expenses = compute_expenses(start_date, end_date)
+        income, expenses = split_flows(flows["weeks"].get(start_date, {}))
 
         # Compute balance
         balance = income - expenses
@@ -334,7 +273,7 @@ def get_expected_balance_evolution(expected_income, expected_expenses):
 
     # Compute expected balance for this week
     expected_balance = expected_income - expected_expenses
-    print("eeeeeeeeeeeeeeeeeeeeeeeeeeeeee", expected_balance)
+    logger.debug("Expected balance: %s", expected_balance)
     return {
             "week": current_week_label,
             "expected_balance": expected_balance
@@ -344,20 +283,8 @@ def get_expected_balance_evolution(expected_income, expected_expenses):
 
 
 def get_total_transactions_count(range_func):
-    
-    def this_week_range_func(field):
-        start, end = range_func() # This week
-        return {f"{field}__range": (start, end)}
-    total = 0
-
-    total += Cd.objects.filter(**this_week_range_func("date_commande")).count()
-    total += Traite.objects.filter(**this_week_range_func("date_echeance")).count()
-    total += FactureAchatMatiere.objects.filter(**this_week_range_func("date_facture")).count()
-    total += TraiteFournisseur.objects.filter(**this_week_range_func("date_echeance")).count()
-    total += FichePaie.objects.filter(**this_week_range_func("date_paiement")).count()
-    total += Avance.objects.filter(**this_week_range_func("date_demande")).count()
-
-    return total
+    # Single COUNT on the Transaction journal view (every cash-moving table)
+    return Transaction.objects.filter(date__range=range_func(), is_deleted=False).count()
 
 def get_taux_de_recouvrement(range_func):
 
@@ -382,103 +309,35 @@ def get_taux_de_recouvrement(range_func):
     return round(taux, 2)
 
 
-def generate_alerts(forecast, balance, expected_income, expected_expense):
-    alerts = []
-
-    schedule = get_schedule()
-    all_traites_data = get_all_traites()
-    traites = all_traites_data["traites"]
-
-    # Alert 1: Solde critique
-    if forecast < 5000:
-        alerts.append({
-            "type": "critical",
-            "title": "Solde critique prévu",
-            "description": f"Solde prévisionnel faible : {forecast} DT (seuil: 5,000 DT)",
-        })
-
-    # Alert 2: Solde net négatif
-    if balance < 0:
-        alerts.append({
-            "type": "danger",
-            "title": "Solde actuel négatif",
-            "description": f"Solde de trésorerie actuel est négatif : {balance} DT",
-        })
-
-    # Alert 3: Dépenses prévues supérieures aux recettes attendues
-    if expected_expense > expected_income:
-        delta = expected_expense - expected_income
-        alerts.append({
-            "type": "warning",
-            "title": "Dépenses prévues > Recettes attendues",
-            "description": f"Écart de {delta} DT entre les dépenses ({expected_expense}) et les recettes ({expected_income}) attendues.",
-        })
-
-    # Alert 4: Evénements à venir importants
-    for item in schedule:
-        amount = Decimal(item["amount"])
-        if amount < -10000:
-            alerts.append({
-                "type": "info",
-                "title": "Dépense importante à venir",
-                "description": f"{item['description']} le {item['date']} ({-amount} DT)",
-            })
-        elif amount > 10000:
-            alerts.append({
-                "type": "info",
-                "title": "Encaissement important prévu",
-                "description": f"{item['description']} le {item['date']} (+{amount} DT)",
-            })
-
-    # Alert 5: Traitements en retard
-    traites_en_retard = [t for t in traites if t["etat"] == "echu" and t["statut"] != "payé"]
-    if traites_en_retard:
-        alerts.append({
-            "type": "danger",
-            "title": "Traites en retard",
-            "description": f"{len(traites_en_retard)} traite(s) sont échues et non payées."
-        })
-
-        # Alert 6: Traitements en cours bientôt échues
-    today = datetime.today().date()
-    soon = today + timedelta(days=7)
-    en_cours_bientot_echues = [
-        t for t in traites
-        if t["etat"] == "en-cours" and today <= t["echeance"] <= soon
-    ]
-    if en_cours_bientot_echues:
-        alerts.append({
-            "type": "warning",
-            "title": "Traitements bientôt échus",
-            "description": f"{len(en_cours_bientot_echues)} traite(s) en cours échues dans moins de 7 jours.",
-        })
-
-
-    return alerts
-
-
 def compute_kpis(evolution_weeks, range_func=get_week_range):
     """
     This function aggregates KPI values such as balance, income, expense, and forecast.
     """
-    global_income, income_value, income_trend, previous_income = compute_income_trend(range_func)
-    print('Global expenses: ', global_income, ' Income value: ', income_value, ' | Income trend: ', income_trend)
+    # The balance trend always compares against get_week_range(1), whatever range_func is
+    flows = aggregate_flows(
+        periods={"current": range_func(0), "previous": range_func(1), "balance_previous": get_week_range(1)},
+        weekly=True,
+    )
+
+    global_income, income_value, income_trend, previous_income = compute_income_trend(range_func, flows=flows)
+    logger.debug("Global income: %s | Income value: %s | Income trend: %s", global_income, income_value, income_trend)
     
 
-    global_expenses, expenses_value, expenses_trend, previous_expenses = compute_expense_trend(range_func)
-    print('Global expenses: ', global_expenses, 'Expenses value: ', expenses_value, ' | Expenses trend: ', expenses_trend)
+    global_expenses, expenses_value, expenses_trend, previous_expenses = compute_expense_trend(range_func, flows=flows)
+    logger.debug("Global expenses: %s | Expenses value: %s | Expenses trend: %s", global_expenses, expenses_value, expenses_trend)
 
-    global_balance, balance_value, balance_trend, previous_balance = compute_balance_trend(global_income, global_expenses, income_value, expenses_value)
-    print('Global expenses: ', global_expenses, ' Balance value: ', balance_value, ' | Balance trend: ', balance_trend)
+    balance_previous_income, balance_previous_expenses = split_flows(flows["periods"]["balance_previous"])
+    global_balance, balance_value, balance_trend, previous_balance = compute_balance_trend(global_income, global_expenses, income_value, expenses_value, balance_previous_income, balance_previous_expenses)
+    logger.debug("Global balance: %s | Balance value: %s | Balance trend: %s", global_balance, balance_value, balance_trend)
 
     expected_expenses_value, expected_expenses_trend, previous_expected_expenses = compute_expected_expenses_trend(range_func)
-    print('Expected income value: ', expected_expenses_value, ' | Income trend: ', expected_expenses_trend)
+    logger.debug("Expected expenses value: %s | Expenses trend: %s", expected_expenses_value, expected_expenses_trend)
     
     expected_income_value, expected_income_trend, previous_expected_income = compute_expected_income_trend(range_func)
-    print('Expected income value: ', expected_income_value, ' | Income trend: ', expected_income_trend)
+    logger.debug("Expected income value: %s | Income trend: %s", expected_income_value, expected_income_trend)
 
     forecast_value, forecast_trend = compute_forecast_trend(balance_value, previous_balance, expected_income_value, previous_expected_income, expected_expenses_value, previous_expected_expenses)
-    print('Forecast value: ', str(forecast_value), ' | Forecast trend: ', str(forecast_trend))
+    logger.debug("Forecast value: %s | Forecast trend: %s", forecast_value, forecast_trend)
 
     return {
         "balance": {"value": balance_value, "trend": balance_trend, "positive": balance_value >= 0},
@@ -491,7 +350,7 @@ def compute_kpis(evolution_weeks, range_func=get_week_range):
         "expected_income": {"value": expected_income_value, "trend": expected_income_trend, "positive": expected_income_trend >= 0},
         "expected_expense": {"value": expected_expenses_value, "trend": expected_expenses_trend, "positive": expected_expenses_trend >= 0},
         "expected_balance_evolution": get_expected_balance_evolution(expected_income_value, expected_expenses_value),
-        "treasury_chart_data": get_treasury_evolution_weeks(evolution_weeks),
+        "treasury_chart_data": get_treasury_evolution_weeks(evolution_weeks, flows=flows),
         "nb_transactions": get_total_transactions_count(get_week_range),
         "taux_de_recouvrement": get_taux_de_recouvrement(get_week_range),
         "alerts": generate_alerts(forecast_value, balance_value, expected_income_value, expected_expenses_value)
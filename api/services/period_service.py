@@ -1,22 +1,33 @@
 from datetime import date, timedelta
-from django.db.models import Sum, Q
-from api.models import Traite, Cd, FactureAchatProduit, TraiteFournisseur
-from api.utils.dates import get_week_range
+from django.db.models import Sum, Count, Q, DateField
+from django.db.models.functions import TruncWeek, TruncMonth, TruncQuarter, TruncYear
+from api.models import Traite, Cd, FactureAchatProduit, TraiteFournisseur, TresorerieJour
+from api.utils.dates import get_week_range, get_period_range
+from api.services.aggregation_service import to_decimal
+from api.services.chart_data import compute_chart_data
+from api.services.kpi_service import compute_kpis
+from api.services.traite_service import get_all_traites
 from decimal import Decimal
 
+
+def compute_rollup_total(flux, start_date, end_date):
+    # Reads the TresorerieJour daily rollup instead of the document table
+    return TresorerieJour.objects.filter(
+        flux=flux,
+        date__range=(start_date, end_date)
+    ).aggregate(total=Sum('montant'))['total'] or 0
+
 def compute_encaissements(start_date, end_date):
     # 1. Factures payées directement (cash, virement, etc.)
     direct_total = Cd.objects.filter(
         statut='completed',
+        is_deleted=False,
         date_commande__range=(start_date, end_date),
         mode_paiement__in=['cash', 'virement', 'cheque', 'carte']
     ).aggregate(total=Sum('montant_ttc'))['total'] or 0
 
     # 2. Traites payées pendant la période
-    traite_total = Traite.objects.filter(
-        status='PAYEE',
-        date_echeance__range=(start_date, end_date)
-    ).aggregate(total=Sum('montant'))['total'] or 0
+    traite_total = compute_rollup_total('traite', start_date, end_date)
 
     return round(direct_total + traite_total, 3)
 
@@ -40,17 +51,14 @@ def compute_encaissement_trend(start_curr, end_curr):
 
 def compute_decaissements(start_date, end_date):
     # 1. Direct payments (cash, virement, cheque, carte)
-    direct_total = FactureAchatMatiere.objects.filter(
+    direct_total = FactureAchatProduit.objects.filter(
         # statut='payée',
         date_facture__range=(start_date, end_date),
         mode_paiement__in=['cash', 'virement', 'cheque', 'carte']
     ).aggregate(total=Sum('prix_total'))['total'] or 0
 
     # 2. Traites fournisseurs payées
-    traite_total = TraiteFournisseur.objects.filter(
-        status='PAYEE',
-        date_echeance__range=(start_date, end_date)
-    ).aggregate(total=Sum('montant'))['total'] or 0
+    traite_total = compute_rollup_total('traite_fournisseur', start_date, end_date)
 
     return round(direct_total + traite_total, 3)
 
@@ -95,10 +103,7 @@ def compute_resultat_net_trend(start_curr, end_curr):
     return round(curr_result, 3), trend
 
 def compute_traites_fournisseurs_total(start_date, end_date):
-    return TraiteFournisseur.objects.filter(
-        status='PAYEE',
-        date_echeance__range=(start_date, end_date)
-    ).aggregate(total=Sum('montant'))['total'] or 0
+    return compute_rollup_total('traite_fournisseur', start_date, end_date)
 
 def compute_traites_fournisseurs_trend(start_curr, end_curr):
     delta = end_curr - start_curr
@@ -116,10 +121,7 @@ def compute_traites_fournisseurs_trend(start_curr, end_curr):
     return round(curr_total, 3), trend
 
 def compute_traites_clients_total(start_date, end_date):
-    return Traite.objects.filter(
-        status='PAYEE',
-        date_echeance__range=(start_date, end_date)
-    ).aggregate(total=Sum('montant'))['total'] or 0
+    return compute_rollup_total('traite', start_date, end_date)
 
 def compute_traites_clients_trend(start_curr, end_curr):
     delta = end_curr - start_curr
@@ -190,3 +192,177 @@ def compute_echues_total_and_count_with_trend(start_curr, end_curr):
         trend = round(((curr_total - prev_total) / abs(prev_total)) * 100, 1)
 
     return round(curr_total, 3), curr_count, trend
+
+
+# -------- N-period comparison
+
+PERIOD_GRANULARITIES = {
+    "week": (TruncWeek, 1),
+    "month": (TruncMonth, 1),
+    "quarter": (TruncQuarter, 3),
+    "year": (TruncYear, 12),
+}
+DIRECT_PAYMENT_MODES = ['cash', 'virement', 'cheque', 'carte']
+
+
+def get_period_starts(granularity, count, today=None):
+    """First day of the last `count` periods (oldest first) and the end of the current one."""
+    today = today or date.today()
+    if granularity == "week":
+        monday = today - timedelta(days=today.weekday())
+        starts = [monday - timedelta(weeks=i) for i in range(count - 1, -1, -1)]
+        return starts, monday + timedelta(days=6)
+
+    _, months = PERIOD_GRANULARITIES[granularity]
+    if granularity == "year":
+        first_month = 1
+    else:
+        first_month = today.month - (today.month - 1) % months
+    index = today.year * 12 + first_month - 1
+    starts = []
+    for i in range(count):
+        year, month = divmod(index - i * months, 12)
+        starts.append(date(year, month + 1, 1))
+    year, month = divmod(index + months, 12)
+    return starts[::-1], date(year, month + 1, 1) - timedelta(days=1)
+
+
+def _grouped_totals(qs, date_field, granularity, start_date, end_date, **aggregates):
+    trunc, _ = PERIOD_GRANULARITIES[granularity]
+    rows = (
+        qs.filter(**{f"{date_field}__range": (start_date, end_date)})
+        .annotate(period=trunc(date_field, output_field=DateField()))
+        .values("period")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return {row.pop("period"): row for row in rows}
+
+
+def compare_periods(granularity="month", count=12, today=None):
+    """
+    Encaissements, décaissements, résultat net, traites and échues for each
+    of the last `count` periods, with one grouped query per source table.
+    """
+    today = today or date.today()
+    starts, end_date = get_period_starts(granularity, count, today)
+    start_date = starts[0]
+
+    cd = _grouped_totals(
+        Cd.objects.filter(statut='completed', is_deleted=False, mode_paiement__in=DIRECT_PAYMENT_MODES),
+        'date_commande', granularity, start_date, end_date,
+        total=Sum('montant_ttc'),
+    )
+    achats = _grouped_totals(
+        FactureAchatProduit.objects.filter(mode_paiement__in=DIRECT_PAYMENT_MODES),
+        'date_facture', granularity, start_date, end_date,
+        total=Sum('prix_total'),
+    )
+    echue = Q(date_echeance__lt=today)
+    traites = _grouped_totals(
+        Traite.objects.all(), 'date_echeance', granularity, start_date, end_date,
+        payees=Sum('montant', filter=Q(status='PAYEE')),
+        echues=Sum('montant', filter=echue & Q(status='NON_PAYEE')),
+        echues_count=Count('id', filter=echue & Q(status='NON_PAYEE')),
+    )
+    echue_fournisseur = echue & Q(status__in=["NON_PAYEE", "PARTIELLEMENT_PAYEE"])
+    traites_fournisseurs = _grouped_totals(
+        TraiteFournisseur.objects.all(), 'date_echeance', granularity, start_date, end_date,
+        payees=Sum('montant', filter=Q(status='PAYEE')),
+        echues=Sum('montant', filter=echue_fournisseur),
+        echues_count=Count('id', filter=echue_fournisseur),
+    )
+
+    periods = []
+    ends = [start - timedelta(days=1) for start in starts[1:]] + [end_date]
+    for start, end in zip(starts, ends):
+        traite = traites.get(start, {})
+        traite_fournisseur = traites_fournisseurs.get(start, {})
+        traites_clients = to_decimal(traite.get('payees'))
+        traites_fournisseurs_total = to_decimal(traite_fournisseur.get('payees'))
+        encaissements = to_decimal(cd.get(start, {}).get('total')) + traites_clients
+        decaissements = to_decimal(achats.get(start, {}).get('total')) + traites_fournisseurs_total
+        periods.append({
+            "start": start,
+            "end": end,
+            "encaissements": round(encaissements, 3),
+            "decaissements": round(decaissements, 3),
+            "resultat_net": round(encaissements - decaissements, 3),
+            "traites_clients": round(traites_clients, 3),
+            "traites_fournisseurs": round(traites_fournisseurs_total, 3),
+            "echues": {
+                "value": round(to_decimal(traite.get('echues')) + to_decimal(traite_fournisseur.get('echues')), 3),
+                "count": traite.get('echues_count', 0) + traite_fournisseur.get('echues_count', 0),
+            },
+        })
+
+    return {"granularity": granularity, "periods": periods}
+
+
+def compute_period_summary(period):
+    """KPIs, traites and chart of the current week / month / quarter / year (PeriodView)."""
+    range_func, label = get_period_range(period)
+    start_date, end_date = range_func()
+    kpiData = compute_kpis(evolution_weeks=4, range_func=range_func)
+    traites = get_all_traites(range_func=range_func, globally=False)
+    chart_data = compute_chart_data(start_date, end_date, label, period)
+    return build_period_summary(period, kpiData, traites, chart_data)
+
+
+def build_period_summary(period, kpiData, traites, chart_data):
+    """PeriodView payload from the KPIs, traites and chart of the period."""
+    period_labels = {
+        "week": "Cette semaine",
+        "month": "Ce mois",
+        "quarter": "Ce trimestre",
+        "year": "Cette année"
+    }
+    label = period_labels.get(period, "Cette période")
+
+    income, income_trend = kpiData["income"]["value"], kpiData["income"]["trend"]
+    expense, expense_trend =  kpiData["expense"]["value"],  kpiData["income"]["trend"]
+    net, net_trend =  kpiData["balance"]["value"],  kpiData["balance"]["trend"]
+    traites_fournisseurs, traites_trend = [t for t in traites["traites"] if t["type"] == "fournisseur"], traites["stats"]["fournisseurs"]["trend"]
+    traites_clients, traites_clients_trend = [t for t in traites["traites"] if t["type"] == "client"], traites["stats"]["clients"]["trend"]
+    echues_total, echues_count, echues_trend = [t for t in traites["traites"] if t["etat"] == "echu"], traites["stats"]["echues"]["trend"], traites["stats"]["echues"]["count"]
+
+    return {
+        "encaissements": {
+            "value": income,
+            "trend": income_trend,
+            "positive": income_trend >= 0,
+            "label": label
+        },
+        "decaissements": {
+            "value": -expense,
+            "trend": -expense_trend,
+            "positive": False,
+            "label": label
+        },
+        "resultatNet": {
+            "value": net,
+            "trend": net_trend,
+            "positive": net_trend >= 0,
+            "label": label
+        },
+        "traitesFournisseurs": {
+            "value": traites_fournisseurs,
+            "trend": -traites_trend,
+            "positive": False,
+            "label": label
+        },
+        "traitesClients": {
+            "value": traites_clients,
+            "trend": traites_clients_trend,
+            "positive": traites_clients_trend >= 0,
+            "label": label
+        },
+        "echues": {
+            "value": echues_total,
+            "trend": echues_trend,
+            "count": echues_count,
+            "positive": False,
+            "label": label
+        },
+        "chart_data": chart_data
+    }
@@ -0,0 +1,42 @@
+from api.utils.memo import request_memo
+from .cache_service import get_stamp, is_fresh, pop_refresh_requests, store_latest
+from .kpi_service import compute_kpis
+from .period_service import compute_period_summary
+from .traite_service import get_all_traites
+
+# Payloads served with get_or_serve_stale, by name
+PAYLOAD_COMPUTES = {
+    "kpis": compute_kpis,
+    "period": compute_period_summary,
+    "traites": get_all_traites,
+}
+EVOLUTION_WINDOWS = ["7d", "30d", "90d", "1y"]
+PERIODS = ["week", "month", "quarter", "year"]
+
+
+def get_standard_payloads():
+    """(name, params) of every payload kept warm by the worker."""
+    return (
+        [("kpis", (window,)) for window in EVOLUTION_WINDOWS]
+        + [("period", (period,)) for period in PERIODS]
+        + [("traites", ())]
+    )
+
+
+def precompute():
+    """
+    Recomputes the stale standard payloads, the ones the views served stale
+    first, in one request_memo() so that they share the treasury aggregates.
+    Returns the (name, params) refreshed.
+    """
+    standard = get_standard_payloads()
+    payloads = list(dict.fromkeys(pop_refresh_requests(standard) + standard))
+    refreshed = []
+    with request_memo():
+        for name, params in payloads:
+            if name not in PAYLOAD_COMPUTES or is_fresh(name, *params):
+                continue
+            stamp = get_stamp()
+            store_latest(name, params, PAYLOAD_COMPUTES[name](*params), stamp)
+            refreshed.append((name, params))
+    return refreshed
@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import Sum, Count, F, DateTimeField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from api.models import TresorerieJour
+from .cache_service import bump_data_version
+from .aggregation_service import get_flow_sources, get_model_flows, get_date_filter, to_decimal
+from .snapshot_service import get_closed_until
+
+logger = logging.getLogger(__name__)
+
+
+def to_day(value):
+    # FichePaie.date_paiement is a datetime, the rollup is per day
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _daily_rows(model, date_field, flows, days=None):
+    expressions = {}
+    for name, _, amount_field, flow_q, _ in flows:
+        expressions[f"{name}__montant"] = Sum(amount_field, filter=flow_q)
+        expressions[f"{name}__nombre"] = Count("pk", filter=flow_q)
+
+    if isinstance(model._meta.get_field(date_field), DateTimeField):
+        day = TruncDate(date_field)
+    else:
+        day = F(date_field)
+
+    qs = model.objects.filter(**{f"{date_field}__isnull": False})
+    if days is not None:
+        qs = qs.filter(reduce(or_, (get_date_filter(model, date_field, day, day) for day in days)))
+
+    for row in qs.values(day=day).annotate(**expressions).order_by():
+        for name, _, _, _, _ in flows:
+            if row[f"{name}__nombre"]:
+                yield TresorerieJour(
+                    date=row["day"],
+                    flux=name,
+                    montant=to_decimal(row[f"{name}__montant"]),
+                    nombre=row[f"{name}__nombre"],
+                )
+
+
+def refresh_days(model, days):
+    """Recomputes the rollup rows of the given days for every flow of model."""
+    date_field, flows = get_model_flows(model)
+    days = {to_day(d) for d in days if d is not None}
+    if not flows or not days:
+        return
+
+    closed_until = get_closed_until()
+    if closed_until and min(days) <= closed_until:
+        # The snapshots are immutable: the global totals ignore this change until reopened
+        logger.warning(
+            "%s modifié dans une période clôturée (%s), voir close_tresorerie --reopen",
+            model.__name__, min(days),
+        )
+
+    rows = list(_daily_rows(model, date_field, flows, days))
+    with transaction.atomic():
+        TresorerieJour.objects.filter(
+            flux__in=[name for name, _, _, _, _ in flows], date__in=days
+        ).delete()
+        TresorerieJour.objects.bulk_create(rows)
+
+
+def rebuild_rollup():
+    """Rebuilds the whole TresorerieJour table from the document tables."""
+    rows = []
+    for model, date_field, flows in get_flow_sources():
+        rows.extend(_daily_rows(model, date_field, flows))
+
+    with transaction.atomic():
+        TresorerieJour.objects.all().delete()
+        TresorerieJour.objects.bulk_create(rows, batch_size=1000)
+    bump_data_version()
+    return len(rows)
@@ -1,76 +1,91 @@
 from datetime import date
-from django.utils.timezone import now
+from heapq import merge
+from itertools import islice
+from django.db.models import F
+from django.db.models.functions import Coalesce, TruncDate
 from api.models import Cd, TraiteFournisseur, FichePaie, Traite
+from .aggregation_service import get_date_filter
 
+SCHEDULE_TYPES = ("facture", "traite_fournisseur", "traite_client", "salaire")
 
-def get_schedule(end_date=None):
+
+def _events(rows, description, amount_sign, event_type):
+    # rows are already ordered by date
+    for row in rows:
+        yield {
+            'date': row['day'].isoformat(),
+            'description': f"{description} {row['nom']}",
+            'amount': amount_sign * row['montant'] if row['montant'] is not None else None,
+            'type': event_type
+        }
+
+
+def get_schedule(end_date=None, types=None, limit=None, min_amount=None):
+    """
+    Upcoming events from today to end_date (included), sorted by date.
+    Each source is read with a single values() query already ordered by
+    date and the streams are merged with heapq.merge.
+
+    types: subset of SCHEDULE_TYPES, limit: maximum number of events,
+    min_amount: only events whose absolute amount is above it.
+    """
     today = date.today()
-    upcoming_events = []
+    types = set(types or SCHEDULE_TYPES)
 
     # Date filter
-    if end_date:
-        cd_filter = {'date_commande__range': (today, end_date)}
-        traite_filter = {'date_echeance__range': (today, end_date)}
-        salaire_filter = {'date_paiement__range': (today, end_date)}
-    else:
-        cd_filter = {'date_commande__gte': today}
-        traite_filter = {'date_echeance__gte': today}
-        salaire_filter = {'date_paiement__gte': today}
+    def date_filter(field):
+        if end_date:
+            return {f'{field}__range': (today, end_date)}
+        return {f'{field}__gte': today}
 
+    def ordered(qs):
+        if min_amount is not None:
+            qs = qs.filter(montant__gt=min_amount)
+        qs = qs.order_by('day', 'id')
+        return qs[:limit] if limit else qs
+
+    streams = []
 
     # 1. Upcoming client invoices
-    invoices = Cd.objects.filter(
-        statut='pending',
-        is_deleted=False,
-        **cd_filter
-    )
-    for inv in invoices:
-        upcoming_events.append({
-            'date': inv.date_commande.isoformat(),
-            'description': f"Facture Client {inv.client.nom_client}",
-            'amount': inv.montant_ttc,
-            'type': 'positive'
-        })
+    if "facture" in types:
+        invoices = Cd.objects.filter(
+            statut='pending',
+            is_deleted=False,
+            **date_filter('date_commande')
+        ).values('id', day=F('date_commande'), montant=F('montant_ttc'), nom=F('client__nom_client'))
+        streams.append(_events(ordered(invoices), "Facture Client", 1, 'positive'))
 
     # 2. Upcoming supplier traites
-    traites = TraiteFournisseur.objects.filter(
-        status='NON_PAYEE',
-        plan_traite__is_deleted=False,
-        **traite_filter
-    )
-    for t in traites:
-        upcoming_events.append({
-            'date': t.date_echeance.isoformat(),
-            'description': f"Traite Fournisseur {t.plan_traite.fournisseur.nom}",
-            'amount': -t.montant,
-            'type': 'supplier'
-        })
-    
-    # 3. Upcoming client traites
-    traites = Traite.objects.filter(
-        plan_traite__is_deleted=False,
-        status='NON_PAYEE',
-        **traite_filter
-    )
-    for t in traites:
-        upcoming_events.append({
-            'date': t.date_echeance.isoformat(),
-            'description': f"Traite Client {t.plan_traite.client.nom_client}",
-            'amount': t.montant,
-            'type': 'positive'
-        })
+    if "traite_fournisseur" in types:
+        traites = TraiteFournisseur.objects.filter(
+            status='NON_PAYEE',
+            plan_traite__is_deleted=False,
+            **date_filter('date_echeance')
+        ).values(
+            'id', 'montant', day=F('date_echeance'),
+            nom=Coalesce('plan_traite__fournisseur__nom', 'plan_traite__nom_raison_sociale'),
+        )
+        streams.append(_events(ordered(traites), "Traite Fournisseur", -1, 'supplier'))
 
-    # Salaries
-    salaries = FichePaie.objects.filter(**salaire_filter)
-    for s in salaries:
-        upcoming_events.append({
-            'date': s.date_paiement.strftime("%Y-%m-%d"),
-            'description': f"Salaire employé {s.employe.nom}",
-            'amount': -s.net_a_payer,
-            'type': 'negative'
-        })
+    # 3. Upcoming client traites
+    if "traite_client" in types:
+        traites = Traite.objects.filter(
+            plan_traite__is_deleted=False,
+            status='NON_PAYEE',
+            **date_filter('date_echeance')
+        ).values(
+            'id', 'montant', day=F('date_echeance'),
+            nom=Coalesce('plan_traite__client__nom_client', 'plan_traite__nom_raison_sociale'),
+        )
+        streams.append(_events(ordered(traites), "Traite Client", 1, 'positive'))
 
-    # 4. Sort by date
-    upcoming_events.sort(key=lambda x: x['date'])
+    # 4. Salaries
+    if "salaire" in types:
+        salaries = FichePaie.objects.filter(
+            get_date_filter(FichePaie, 'date_paiement', today, end_date)
+        ).values('id', day=TruncDate('date_paiement'), montant=F('net_a_payer'), nom=F('employe__nom'))
+        streams.append(_events(ordered(salaries), "Salaire employé", -1, 'negative'))
 
-    return upcoming_events
+    # 5. Merge the sorted streams (stable: same date keeps the source order)
+    upcoming_events = merge(*streams, key=lambda x: x['date'])
+    return list(islice(upcoming_events, limit) if limit else upcoming_events)
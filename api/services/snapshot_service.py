@@ -0,0 +1,104 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, Max, Min
+from api.models import TresorerieJour, TresoreriePeriode
+from .cache_service import bump_data_version
+
+SNAPSHOT_GRANULARITIES = [choice for choice, _ in TresoreriePeriode.GRANULARITE_CHOICES]
+
+
+def get_period_bounds(day, granularity):
+    """(first day, last day) of the week / month containing day."""
+    if granularity == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    start = day.replace(day=1)
+    next_month = (start + timedelta(days=31)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+
+def get_closed_until():
+    """Last day covered by a closed period, None if nothing is closed."""
+    return TresoreriePeriode.objects.aggregate(fin=Max("fin"))["fin"]
+
+
+def get_closed_totals():
+    """
+    Returns (closed_until, {flux: total}) summed over every closed period,
+    in one query on the (small) snapshot table.
+    """
+    closed_until = None
+    totals = defaultdict(Decimal)
+    for row in TresoreriePeriode.objects.values("flux").annotate(total=Sum("montant"), fin=Max("fin")).order_by():
+        totals[row["flux"]] += row["total"]
+        closed_until = max(closed_until or row["fin"], row["fin"])
+    return closed_until, totals
+
+
+def close_periods(granularity="month", until=None, today=None):
+    """
+    Freezes the TresorerieJour totals of every complete period not closed
+    yet, up to `until` (default: the end of the previous week / month).
+    Periods are contiguous: closing resumes the day after the last closed one.
+
+    Returns the number of periods closed.
+    """
+    if granularity not in SNAPSHOT_GRANULARITIES:
+        raise ValueError(f"Granularité invalide: {granularity}")
+    today = today or date.today()
+    current_start, _ = get_period_bounds(today, granularity)
+    until = min(until or current_start, current_start - timedelta(days=1))
+
+    closed_until = get_closed_until()
+    if closed_until:
+        start = closed_until + timedelta(days=1)
+    else:
+        first_day = TresorerieJour.objects.aggregate(first=Min("date"))["first"]
+        if first_day is None:
+            return 0
+        start, _ = get_period_bounds(first_day, granularity)
+
+    periods = []
+    while True:
+        _, end = get_period_bounds(start, granularity)
+        if end > until:
+            break
+        periods.append((start, end))
+        start = end + timedelta(days=1)
+    if not periods:
+        return 0
+
+    starts = [debut for debut, _ in periods]
+    totals = defaultdict(lambda: [Decimal("0"), 0])
+    rows = TresorerieJour.objects.filter(date__range=(periods[0][0], periods[-1][1])).values_list(
+        "date", "flux", "montant", "nombre"
+    )
+    for day, flux, montant, nombre in rows:
+        total = totals[(starts[bisect_right(starts, day) - 1], flux)]
+        total[0] += montant
+        total[1] += nombre
+
+    # One row per flux and period, even empty, so that the periods stay contiguous
+    snapshots = [
+        TresoreriePeriode(
+            granularite=granularity, debut=debut, fin=fin, flux=flux,
+            montant=totals[(debut, flux)][0], nombre=totals[(debut, flux)][1],
+        )
+        for debut, fin in periods
+        for flux, _ in TresorerieJour.FLUX_CHOICES
+    ]
+    with transaction.atomic():
+        TresoreriePeriode.objects.bulk_create(snapshots)
+    bump_data_version()
+    return len(periods)
+
+
+def reopen_periods(since):
+    """Deletes the snapshots of the closed periods ending on or after `since`; returns their count."""
+    count = TresoreriePeriode.objects.filter(fin__gte=since).values("debut").distinct().count()
+    TresoreriePeriode.objects.filter(fin__gte=since).delete()
+    bump_data_version()
+    return count
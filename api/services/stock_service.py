@@ -0,0 +1,71 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+from api.models import Produit
+
+
+class InsufficientStockError(ValueError):
+    """Raised by reserve_stock with one error per product that lacks stock."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(error["message"] for error in errors))
+
+
+def get_quantities(lines):
+    """{produit_id: total quantite} of (produit or produit_id, quantite) pairs."""
+    quantities = Counter()
+    for produit, quantite in lines:
+        quantities[getattr(produit, "pk", produit)] += quantite
+    return quantities
+
+
+def reserve_stock(lines, released=()):
+    """
+    Takes the quantities of lines from stock and gives back those of
+    released (the previous lines of an updated document), both lists of
+    (produit, quantite) pairs.
+
+    The products are locked with one SELECT ... FOR UPDATE, checked
+    together (InsufficientStockError lists every product short of stock)
+    and updated with a single UPDATE ... SET stock = stock - CASE ... END,
+    so concurrent documents can't oversell nor lose an update.
+    """
+    deltas = get_quantities(lines)
+    deltas.subtract(get_quantities(released))
+    deltas = {produit_id: delta for produit_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        stocks = {
+            pk: (nom, stock)
+            for pk, nom, stock in Produit.objects.select_for_update()
+            .filter(pk__in=deltas).values_list("pk", "nom_produit", "stock")
+        }
+        errors = []
+        for produit_id, delta in deltas.items():
+            if produit_id not in stocks:
+                errors.append({"produit": produit_id, "message": f"Produit {produit_id} introuvable"})
+                continue
+            nom, stock = stocks[produit_id]
+            if stock < delta:
+                errors.append({
+                    "produit": produit_id,
+                    "available": stock,
+                    "requested": delta,
+                    "message": f"Not enough stock for produit {nom}. Available: {stock}, requested: {delta}",
+                })
+        if errors:
+            raise InsufficientStockError(errors)
+
+        # update() skips auto_now: the timestamp is set here so the product ETags change
+        Produit.objects.filter(pk__in=deltas).update(
+            stock=F("stock") - Case(
+                *(When(pk=produit_id, then=Value(delta)) for produit_id, delta in deltas.items()),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            derniere_mise_a_jour=timezone.now(),
+        )
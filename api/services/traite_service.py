@@ -1,5 +1,8 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import date, timedelta
-from django.db.models import Sum, Q
+from django.db.models import Sum, Count, Q, F, Value, Case, When, CharField, FloatField, ExpressionWrapper
+from django.db.models.functions import Coalesce
 from api.models import Traite, TraiteFournisseur
 
 def compute_trend(current, previous):
@@ -13,6 +16,62 @@ def get_week_range(weeks_ago=0):
     end = start + timedelta(days=6)
     return start, end
 
+def _aggregate_traites(model, start_date, end_date, start_prev, end_prev, globally, today):
+    # Every stats bucket of one model as a filtered aggregate of a single query
+    active = Q(plan_traite__is_deleted=False)
+    current = active & (Q(date_echeance__range=(start_date, end_date)) if not globally else Q())
+    previous = active & Q(date_echeance__range=(start_prev, end_prev))
+    payee = Q(status='PAYEE')
+    echue = Q(date_echeance__lt=today, status="NON_PAYEE")
+
+    totals = model.objects.aggregate(
+        count=Count("id"),
+        total=Sum("montant", filter=current),
+        total_prev=Sum("montant", filter=previous),
+        payees=Sum("montant", filter=current & payee),
+        payees_prev=Sum("montant", filter=previous & payee),
+        echues=Sum("montant", filter=current & echue),
+        echues_count=Count("id", filter=current & echue),
+        # Previous week echues
+        echues_prev=Sum("montant", filter=active & Q(
+            date_echeance__lt=start_date, date_echeance__gte=start_prev, status="NON_PAYEE"
+        )),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+def get_traites_stats(start_date, end_date, start_prev, end_prev, globally=True, today=None):
+    """Builds the stats block of get_all_traites with one query per model."""
+    today = today or date.today()
+    clients = _aggregate_traites(Traite, start_date, end_date, start_prev, end_prev, globally, today)
+    fournisseurs = _aggregate_traites(TraiteFournisseur, start_date, end_date, start_prev, end_prev, globally, today)
+
+    echues_total = clients["echues"] + fournisseurs["echues"]
+    echues_prev = clients["echues_prev"] + fournisseurs["echues_prev"]
+    net = clients["payees"] - fournisseurs["payees"]
+    net_prev = clients["payees_prev"] - fournisseurs["payees_prev"]
+
+    return {
+        "clients": {
+            "value": round(clients["total"], 2),
+            "count": clients["count"],
+            "trend": compute_trend(clients["total"], clients["total_prev"])
+        },
+        "fournisseurs": {
+            "value": -round(fournisseurs["total"], 2),
+            "count": fournisseurs["count"],
+            "trend": -compute_trend(fournisseurs["total"], fournisseurs["total_prev"])  # negative to show it's an outgoing
+        },
+        "echues": {
+            "value": round(echues_total, 2),
+            "count": clients["echues_count"] + fournisseurs["echues_count"],
+            "trend": compute_trend(echues_total, echues_prev)
+        },
+        "net": {
+            "value": round(net, 2),
+            "trend": compute_trend(net, net_prev)
+        }
+    }
+
 def get_all_traites(range_func = None, globally=True):
     today = date.today()
     if not range_func:
@@ -23,107 +82,7 @@ def get_all_traites(range_func = None, globally=True):
     
     start_prev, end_prev = get_week_range(1)
 
-    # -------- 1. Clients traites
-    total_clients = Traite.objects.filter(
-        Q(plan_traite__is_deleted = False), 
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).aggregate(total=Sum("montant"))["total"] or 0
-    
-    total_clients_prev = Traite.objects.filter(
-        date_echeance__range=(start_prev, end_prev),
-        plan_traite__is_deleted = False
-    ).aggregate(total=Sum("montant"))["total"] or 0
-    clients_trend = compute_trend(total_clients, total_clients_prev)
-
-    total_clients_encaissees = Traite.objects.filter(
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-        Q(status='PAYEE'), 
-        Q(plan_traite__is_deleted = False)
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    total_clients_encaissees_prev = Traite.objects.filter(
-        date_echeance__range=(start_prev, end_prev), status='PAYEE',
-        plan_traite__is_deleted = False
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    # -------- 2. Fournisseur traites
-    total_fournisseurs = TraiteFournisseur.objects.filter(
-        Q(plan_traite__is_deleted = False),
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    total_fournisseurs_prev = TraiteFournisseur.objects.filter(
-        date_echeance__range=(start_prev, end_prev),
-        plan_traite__is_deleted = False
-    ).aggregate(total=Sum("montant"))["total"] or 0
-    fournisseurs_trend = compute_trend(total_fournisseurs, total_fournisseurs_prev)
-
-    total_fournisseurs_payees = TraiteFournisseur.objects.filter(
-        Q(status='PAYEE'),
-        Q(plan_traite__is_deleted = False),
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    total_fournisseurs_payees_prev = TraiteFournisseur.objects.filter(
-        date_echeance__range=(start_prev, end_prev), status='PAYEE',
-        plan_traite__is_deleted = False
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    # -------- 3. Echues
-    echues_clients = Traite.objects.filter(
-        Q(date_echeance__lt=today), 
-        Q(status="NON_PAYEE"), 
-        Q(plan_traite__is_deleted = False),
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    echues_fournisseurs = TraiteFournisseur.objects.filter(
-        Q(date_echeance__lt=today), 
-        Q(status="NON_PAYEE"), 
-        Q(plan_traite__is_deleted = False),
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).aggregate(total=Sum("montant"))["total"] or 0
-
-    echues_total = echues_clients + echues_fournisseurs
-
-    # Counts
-    echues_clients_count = Traite.objects.filter(
-        Q(date_echeance__lt=today), 
-        Q(status="NON_PAYEE"), 
-        Q(plan_traite__is_deleted = False),
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).count()
-    echues_fournisseurs_count = TraiteFournisseur.objects.filter(
-        Q(date_echeance__lt=today), 
-        Q(status="NON_PAYEE"), 
-        Q(plan_traite__is_deleted = False),
-        Q(date_echeance__range=(start_date, end_date)) if not globally else Q(),
-    ).count()
-    echues_count = echues_clients_count + echues_fournisseurs_count
-
-    # Previous week echues
-    echues_prev_clients = Traite.objects.filter(
-        date_echeance__lt=start_date,
-        date_echeance__gte=start_prev,
-        plan_traite__is_deleted = False,
-        status="NON_PAYEE"
-    ).aggregate(total=Sum("montant"))["total"] or 0
-    echues_prev_fournisseurs = TraiteFournisseur.objects.filter(
-        date_echeance__lt=start_date,
-        date_echeance__gte=start_prev,
-        plan_traite__is_deleted = False,
-        status="NON_PAYEE"
-    ).aggregate(total=Sum("montant"))["total"] or 0
-    echues_prev = echues_prev_clients + echues_prev_fournisseurs
-    echues_trend = compute_trend(echues_total, echues_prev)
-
-    # -------- 4. Net
-    net = total_clients_encaissees - total_fournisseurs_payees
-    net_prev = total_clients_encaissees_prev - total_fournisseurs_payees_prev
-    net_trend = compute_trend(net, net_prev)
-
-
-    # -------- 5. Build traites list
+    # -------- 1. Build traites list
 
     def get_etat(t):
         if t.status == "PAYEE":
@@ -163,28 +122,104 @@ def get_all_traites(range_func = None, globally=True):
 
     all_traites = sorted(client_data + fournisseur_data, key=lambda x: x["echeance"])
 
-    stats = {
-        "clients": {
-            "value": round(total_clients, 2),
-            "count": Traite.objects.count(),
-            "trend": clients_trend
-        },
-        "fournisseurs": {
-            "value": -round(total_fournisseurs, 2),
-            "count": TraiteFournisseur.objects.count(),
-            "trend": -fournisseurs_trend  # negative to show it's an outgoing
-        },
-        "echues": {
-            "value": round(echues_total, 2),
-            "count": echues_count,
-            "trend": echues_trend
-        },
-        "net": {
-            "value": round(net, 2),
-            "trend": net_trend
-        }
-    }
+    # -------- 2. Stats
+    stats = get_traites_stats(start_date, end_date, start_prev, end_prev, globally, today)
     return {
         "traites": all_traites,
         "stats": stats
     }
+
+
+# -------- Traites feed (clients + fournisseurs merged in SQL)
+
+FEED_TYPES = ("client", "fournisseur")
+FEED_ETATS = ("paye", "echu", "en-cours")
+FEED_FIELDS = ("id", "type", "tier", "ref", "echeance", "montant", "statut", "etat")
+
+
+def encode_feed_cursor(row):
+    raw = f"{row['echeance'].isoformat()}|{row['type']}|{row['id']}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_feed_cursor(cursor):
+    """Returns (echeance, type, id); raises ValueError on a malformed cursor."""
+    try:
+        echeance, feed_type, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return date.fromisoformat(echeance), feed_type, int(pk)
+    except (UnicodeDecodeError, TypeError, binascii.Error) as e:
+        raise ValueError("Curseur invalide") from e
+
+
+def _feed_queryset(model, feed_type, today):
+    tiers = "plan_traite__client__nom_client" if feed_type == "client" else "plan_traite__fournisseur__nom"
+    montant = F("montant") if feed_type == "client" else F("montant") * Value(-1.0)
+    return model.objects.filter(plan_traite__is_deleted=False).annotate(
+        type=Value(feed_type, output_field=CharField()),
+        tier=Coalesce(tiers, "plan_traite__nom_raison_sociale", output_field=CharField()),
+        ref=F("plan_traite__numero_facture"),
+        echeance=F("date_echeance"),
+        montant_signe=ExpressionWrapper(montant, output_field=FloatField()),
+        statut=F("status"),
+        etat=Case(
+            When(status="PAYEE", then=Value("paye")),
+            When(date_echeance__lt=today, then=Value("echu")),
+            default=Value("en-cours"),
+            output_field=CharField(),
+        ),
+    )
+
+
+def _feed_after_cursor(feed_type, cursor):
+    # Rows strictly after the cursor for the order (echeance, type, id)
+    echeance, cursor_type, pk = cursor
+    if feed_type > cursor_type:
+        return Q(date_echeance__gte=echeance)
+    if feed_type < cursor_type:
+        return Q(date_echeance__gt=echeance)
+    return Q(date_echeance__gt=echeance) | Q(date_echeance=echeance, id__gt=pk)
+
+
+def get_traites_feed(cursor=None, limit=50, feed_type=None, etat=None, date_from=None, date_to=None):
+    """
+    One page of client and fournisseur traites ordered by (echeance, type, id).
+    Both sources are merged by a UNION ALL query and read with values():
+    nothing but the page is loaded in memory.
+
+    Returns {"results": [...], "next_cursor": str or None}.
+    """
+    today = date.today()
+    cursor = decode_feed_cursor(cursor) if cursor else None
+
+    parts = []
+    for model, part_type in ((Traite, "client"), (TraiteFournisseur, "fournisseur")):
+        if feed_type and feed_type != part_type:
+            continue
+        qs = _feed_queryset(model, part_type, today)
+        if etat:
+            qs = qs.filter(etat=etat)
+        if date_from:
+            qs = qs.filter(date_echeance__gte=date_from)
+        if date_to:
+            qs = qs.filter(date_echeance__lte=date_to)
+        if cursor:
+            qs = qs.filter(_feed_after_cursor(part_type, cursor))
+        # The columns of a UNION are matched by position
+        parts.append(qs.order_by().values(
+            "id", "type", "tier", "ref", "echeance", "montant_signe", "statut", "etat"
+        ))
+
+    if not parts:
+        return {"results": [], "next_cursor": None}
+
+    qs = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    rows = [
+        dict(zip(FEED_FIELDS, row.values()))
+        for row in qs.order_by("echeance", "type", "id")[:limit + 1]
+    ]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_feed_cursor(rows[-1])
+    return {"results": rows, "next_cursor": next_cursor}
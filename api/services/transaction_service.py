@@ -0,0 +1,159 @@
+from django.db import transaction
+from django.db.models import BooleanField, CharField, Count, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from api.models import (
+    Avance, Avoir, Cd, Client, Employe, FactureAchatProduit, FichePaie, Fournisseur,
+    PlanTraite, PlanTraiteFournisseur, Traite, TraiteFournisseur, Transaction,
+)
+from .aggregation_service import INCOME, EXPENSE
+
+NO_STATUS = Value(None, output_field=CharField())
+NOT_DELETED = Value(False, output_field=BooleanField())
+
+
+def get_transaction_sources():
+    """
+    Every cash-moving model as (model, source_type, direction, columns,
+    dependencies). columns maps each Transaction column to an expression on
+    the model; dependencies are (related model, lookup, fields) whose
+    changes to fields (name, plan deletion...) must refresh the rows.
+    """
+    return [
+        (Cd, "cd", INCOME, {
+            "date": F("date_commande"), "amount": F("montant_ttc"), "status": F("statut"),
+            "counterparty": F("client__nom_client"), "payment_mode": F("mode_paiement"),
+            "is_deleted": F("is_deleted"),
+        }, [(Client, "client", ["nom_client"])]),
+        (Traite, "traite", INCOME, {
+            "date": F("date_echeance"), "amount": F("montant"), "status": F("status"),
+            "counterparty": Coalesce("plan_traite__client__nom_client", "plan_traite__nom_raison_sociale"),
+            "payment_mode": Value("traite"), "is_deleted": F("plan_traite__is_deleted"),
+        }, [
+            (PlanTraite, "plan_traite", ["is_deleted", "nom_raison_sociale"]),
+            (Client, "plan_traite__client", ["nom_client"]),
+        ]),
+        (Avoir, "avoir", INCOME, {
+            "date": F("date_avoir"), "amount": F("montant_total"), "status": NO_STATUS,
+            "counterparty": F("fournisseur"), "payment_mode": F("mode_paiement"),
+            "is_deleted": ExpressionWrapper(Q(deleted_at__isnull=False), output_field=BooleanField()),
+        }, []),
+        (FactureAchatProduit, "facture_achat", EXPENSE, {
+            "date": F("date_facture"), "amount": F("prix_total"), "status": NO_STATUS,
+            "counterparty": F("fournisseur"), "payment_mode": F("mode_paiement"),
+            "is_deleted": NOT_DELETED,
+        }, []),
+        (TraiteFournisseur, "traite_fournisseur", EXPENSE, {
+            "date": F("date_echeance"), "amount": F("montant"), "status": F("status"),
+            "counterparty": Coalesce("plan_traite__fournisseur__nom", "plan_traite__nom_raison_sociale"),
+            "payment_mode": Value("traite"), "is_deleted": F("plan_traite__is_deleted"),
+        }, [
+            (PlanTraiteFournisseur, "plan_traite", ["is_deleted", "nom_raison_sociale"]),
+            (Fournisseur, "plan_traite__fournisseur", ["nom"]),
+        ]),
+        (FichePaie, "fiche_paie", EXPENSE, {
+            "date": TruncDate("date_paiement"), "amount": F("net_a_payer"), "status": F("statut"),
+            "counterparty": F("employe__nom"), "payment_mode": NO_STATUS,
+            "is_deleted": NOT_DELETED,
+        }, [(Employe, "employe", ["nom"])]),
+        (Avance, "avance", EXPENSE, {
+            "date": F("date_demande"), "amount": F("montant"), "status": F("statut"),
+            "counterparty": F("employee__nom"), "payment_mode": NO_STATUS,
+            "is_deleted": NOT_DELETED,
+        }, [(Employe, "employee", ["nom"])]),
+    ]
+
+
+def get_dependency_fields():
+    """{related model: [fields copied into Transaction]} over every source."""
+    fields = {}
+    for _, _, _, _, dependencies in get_transaction_sources():
+        for dependency, _, dependency_fields in dependencies:
+            fields.setdefault(dependency, [])
+            fields[dependency] += [f for f in dependency_fields if f not in fields[dependency]]
+    return fields
+
+
+def get_transaction_source(model):
+    for source in get_transaction_sources():
+        if source[0] is model:
+            return source
+    return None
+
+
+def _transaction_rows(model, source_type, direction, columns, source_filter=None):
+    qs = model.objects.all()
+    if source_filter is not None:
+        qs = qs.filter(source_filter)
+    # "t_" prefix: the annotations must not clash with the model fields (date, status...)
+    annotations = {f"t_{name}": expression for name, expression in columns.items()}
+    for row in qs.values("pk", **annotations).order_by():
+        yield Transaction(
+            source_type=source_type,
+            source_id=row["pk"],
+            direction=direction,
+            **{name: row[f"t_{name}"] for name in columns},
+        )
+
+
+def refresh_transactions(model, source_filter):
+    """Recomputes the journal rows of the model documents matching source_filter (a Q)."""
+    model, source_type, direction, columns, _ = get_transaction_source(model)
+    rows = list(_transaction_rows(model, source_type, direction, columns, source_filter))
+    with transaction.atomic():
+        Transaction.objects.filter(
+            source_type=source_type, source_id__in=[row.source_id for row in rows]
+        ).delete()
+        Transaction.objects.bulk_create(rows)
+
+
+def delete_transactions(model, pks):
+    _, source_type, _, _, _ = get_transaction_source(model)
+    Transaction.objects.filter(source_type=source_type, source_id__in=pks).delete()
+
+
+def rebuild_transactions():
+    """Rebuilds the whole Transaction journal from the document tables."""
+    rows = []
+    for model, source_type, direction, columns, _ in get_transaction_sources():
+        rows.extend(_transaction_rows(model, source_type, direction, columns))
+
+    with transaction.atomic():
+        Transaction.objects.all().delete()
+        Transaction.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def get_transactions_queryset(date_from=None, date_to=None, source_type=None, direction=None, include_deleted=False):
+    qs = Transaction.objects.all()
+    if not include_deleted:
+        qs = qs.filter(is_deleted=False)
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    if source_type:
+        qs = qs.filter(source_type=source_type)
+    if direction:
+        qs = qs.filter(direction=direction)
+    return qs
+
+
+def summarize_transactions(qs):
+    """Count and total per (source_type, direction), in one grouped query."""
+    return list(
+        qs.values("source_type", "direction")
+        .annotate(count=Count("id"), total=Sum("amount"))
+        .order_by("source_type", "direction")
+    )
+
+
+def get_journal(limit=100, **filters):
+    """Latest transactions across every cash-moving table, with their summary."""
+    qs = get_transactions_queryset(**filters)
+    return {
+        "summary": summarize_transactions(qs),
+        "results": list(qs.values(
+            "id", "source_type", "source_id", "date", "direction", "amount",
+            "status", "counterparty", "payment_mode",
+        )[:limit]),
+    }
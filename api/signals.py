@@ -0,0 +1,102 @@
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from .models import (
+    Avance, Avoir, Cd, Traite, TraiteFournisseur, FichePaie, FactureAchatProduit, PlanTraite, PlanTraiteFournisseur,
+)
+from .services.aggregation_service import get_model_flows
+from .services.cache_service import bump_data_version
+from .services.rollup_service import refresh_days
+from .services.transaction_service import (
+    get_dependency_fields, get_transaction_sources, refresh_transactions, delete_transactions,
+)
+from .utils.memo import clear_request_memo
+
+# Models feeding the TresorerieJour daily rollup
+TRESORERIE_MODELS = (Cd, Traite, TraiteFournisseur, FichePaie, Avoir, FactureAchatProduit)
+
+# Models read by the cached results without feeding the rollup (plan soft-delete
+# hides its traites, avances count in nb_transactions)
+DATA_VERSION_MODELS = TRESORERIE_MODELS + (PlanTraite, PlanTraiteFournisseur, Avance)
+
+
+def remember_tresorerie_day(sender, instance, **kwargs):
+    # The date may change on update: both the old and the new day need a refresh
+    instance._tresorerie_old_day = None
+    if instance.pk:
+        date_field, _ = get_model_flows(sender)
+        instance._tresorerie_old_day = (
+            sender.objects.filter(pk=instance.pk).values_list(date_field, flat=True).first()
+        )
+
+
+def refresh_tresorerie_on_save(sender, instance, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    date_field, _ = get_model_flows(sender)
+    refresh_days(sender, [getattr(instance, date_field), getattr(instance, "_tresorerie_old_day", None)])
+
+
+def refresh_tresorerie_on_delete(sender, instance, **kwargs):
+    date_field, _ = get_model_flows(sender)
+    refresh_days(sender, [getattr(instance, date_field)])
+
+
+def bump_tresorerie_version(sender, **kwargs):
+    # Invalidates every cached KPI / period / traites result
+    bump_data_version()
+    clear_request_memo()
+
+
+for model in TRESORERIE_MODELS:
+    pre_save.connect(remember_tresorerie_day, sender=model, dispatch_uid=f"tresorerie_pre_save_{model.__name__}")
+    post_save.connect(refresh_tresorerie_on_save, sender=model, dispatch_uid=f"tresorerie_post_save_{model.__name__}")
+    post_delete.connect(refresh_tresorerie_on_delete, sender=model, dispatch_uid=f"tresorerie_post_delete_{model.__name__}")
+
+for model in DATA_VERSION_MODELS:
+    post_save.connect(bump_tresorerie_version, sender=model, dispatch_uid=f"tresorerie_version_save_{model.__name__}")
+    post_delete.connect(bump_tresorerie_version, sender=model, dispatch_uid=f"tresorerie_version_delete_{model.__name__}")
+
+
+def refresh_transaction_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_transactions(sender, Q(pk=instance.pk))
+
+
+def delete_transaction_on_delete(sender, instance, **kwargs):
+    delete_transactions(sender, [instance.pk])
+
+
+def remember_dependency_fields(sender, instance, **kwargs):
+    instance._transaction_old_values = None
+    if instance.pk:
+        fields = get_dependency_fields()[sender]
+        instance._transaction_old_values = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def refresh_dependent_transactions(sender, instance, created=False, raw=False, **kwargs):
+    # Client / fournisseur / employé renamed, plan de traites (un)deleted...
+    if raw or created:
+        return
+    old_values = getattr(instance, "_transaction_old_values", None)
+    for model, _, _, _, dependencies in get_transaction_sources():
+        for dependency, lookup, fields in dependencies:
+            if dependency is not sender:
+                continue
+            # Only when a field copied into the journal actually changed
+            if old_values is None or any(old_values[f] != getattr(instance, f) for f in fields):
+                refresh_transactions(model, Q(**{lookup: instance.pk}))
+
+
+for model, _, _, _, dependencies in get_transaction_sources():
+    post_save.connect(refresh_transaction_on_save, sender=model, dispatch_uid=f"transaction_post_save_{model.__name__}")
+    post_delete.connect(delete_transaction_on_delete, sender=model, dispatch_uid=f"transaction_post_delete_{model.__name__}")
+    for dependency, _, _ in dependencies:
+        pre_save.connect(
+            remember_dependency_fields, sender=dependency,
+            dispatch_uid=f"transaction_dependency_pre_save_{dependency.__name__}",
+        )
+        post_save.connect(
+            refresh_dependent_transactions, sender=dependency,
+            dispatch_uid=f"transaction_dependency_{dependency.__name__}",
+        )
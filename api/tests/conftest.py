@@ -0,0 +1,79 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.models import (
+    Client, Cd, FactureAchatProduit, Fournisseur, PlanTraite, PlanTraiteFournisseur, Traite, TraiteFournisseur,
+)
+from api.services.cache_service import WORKER_KEY
+
+
+@pytest.fixture
+def client():
+    return Client.objects.create(
+        nom_client="Test Client",
+        numero_fiscal="123 4567A/B/C/000",
+    )
+
+
+@pytest.fixture
+def flows_data(client):
+    today = timezone.now().date()
+    last_week = today - timedelta(days=7)
+    Cd.objects.create(
+        numero_commande="FAC-T-00001", client=client, date_commande=today,
+        statut="completed", mode_paiement="cash", montant_ht=1000, montant_ttc=1000,
+    )
+    Cd.objects.create(
+        numero_commande="FAC-T-00002", client=client, date_commande=last_week,
+        statut="completed", mode_paiement="mixte", mixte_comptant=300, montant_ht=900, montant_ttc=900,
+    )
+    # Ignored: pending and deleted invoices
+    Cd.objects.create(
+        numero_commande="FAC-T-00003", client=client, date_commande=today,
+        statut="pending", mode_paiement="cash", montant_ht=5000, montant_ttc=5000,
+    )
+    Cd.objects.create(
+        numero_commande="FAC-T-00004", client=client, date_commande=today,
+        statut="completed", mode_paiement="cash", montant_ht=5000, montant_ttc=5000, is_deleted=True,
+    )
+    FactureAchatProduit.objects.create(mode_paiement="cash", prix_total=Decimal("200.00"), date_facture=today)
+    fournisseur = Fournisseur.objects.create(nom="Test Fournisseur", num_reg_fiscal="1", adresse="Tunis", telephone="1")
+    plan = PlanTraiteFournisseur.objects.create(fournisseur=fournisseur, nombre_traite=0)
+    TraiteFournisseur.objects.create(plan_traite=plan, date_echeance=last_week, status="PAYEE", montant=150)
+    TraiteFournisseur.objects.create(plan_traite=plan, date_echeance=today, status="NON_PAYEE", montant=999)
+    return today, last_week
+
+
+@pytest.fixture
+def traites_data():
+    today = timezone.now().date()
+    client = Client.objects.create(nom_client="Client A", numero_fiscal="123 4567A/B/C/000")
+    fournisseur = Fournisseur.objects.create(nom="Fournisseur B", num_reg_fiscal="1", adresse="Tunis", telephone="1")
+    plan = PlanTraite.objects.create(client=client, nombre_traite=0, numero_facture="FAC-1")
+    plan_fournisseur = PlanTraiteFournisseur.objects.create(fournisseur=fournisseur, nombre_traite=0, numero_facture="ACH-1")
+    for days in (-10, 0, 10):
+        Traite.objects.create(plan_traite=plan, date_echeance=today + timedelta(days=days), montant=100)
+        TraiteFournisseur.objects.create(
+            plan_traite=plan_fournisseur, date_echeance=today + timedelta(days=days), montant=40,
+            status="PAYEE" if days == 0 else "NON_PAYEE",
+        )
+    return today
+
+
+@pytest.fixture
+def staff_client():
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user("staff", password="x", is_staff=True))
+    return client
+
+
+@pytest.fixture
+def worker():
+    cache.clear()
+    cache.set(WORKER_KEY, 1)
+    yield
+    cache.delete(WORKER_KEY)
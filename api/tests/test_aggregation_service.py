@@ -0,0 +1,56 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Cd, TraiteFournisseur, TresorerieJour
+from api.services.aggregation_service import aggregate_flows, split_flows
+from api.services.kpi_service import get_treasury_evolution_weeks
+from api.services.rollup_service import rebuild_rollup
+from api.utils.dates import get_week_range
+
+
+@pytest.mark.django_db
+def test_aggregate_flows_periods(flows_data):
+    today, last_week = flows_data
+    flows = aggregate_flows(periods={
+        "current": get_week_range(0),
+        "previous": get_week_range(-1),
+    })
+
+    assert split_flows(flows["global"]) == (Decimal("1300"), Decimal("350"))
+    assert split_flows(flows["periods"]["current"]) == (Decimal("1000"), Decimal("200"))
+    assert split_flows(flows["periods"]["previous"]) == (Decimal("300"), Decimal("150"))
+
+
+@pytest.mark.django_db
+def test_evolution_weeks_query_count_is_constant(flows_data):
+    with CaptureQueriesContext(connection) as short:
+        get_treasury_evolution_weeks("7d")
+    with CaptureQueriesContext(connection) as long:
+        chart = get_treasury_evolution_weeks("1y")
+
+    # TresoreriePeriode snapshots + TresorerieJour rollup
+    assert len(short) == len(long) == 2
+    assert len(chart["datasets"][0]["data"]) == 52
+    assert chart["datasets"][0]["data"][-1] == Decimal("800")
+    assert chart["datasets"][0]["data"][-2] == Decimal("150")
+
+
+@pytest.mark.django_db
+def test_rollup_follows_document_changes(flows_data):
+    today, last_week = flows_data
+    cd = Cd.objects.get(numero_commande="FAC-T-00001")
+    cd.date_commande = last_week
+    cd.save()
+    TraiteFournisseur.objects.filter(status="NON_PAYEE").get().delete()
+
+    assert TresorerieJour.objects.get(date=last_week, flux="cd").montant == Decimal("1000")
+    assert not TresorerieJour.objects.filter(date=today, flux="cd").exists()
+
+    def non_zero(totals):
+        return {flow: amount for flow, amount in totals.items() if amount}
+
+    documents = non_zero(aggregate_flows(from_documents=True)["global"])
+    assert non_zero(aggregate_flows()["global"]) == documents
+    rebuild_rollup()
+    assert non_zero(aggregate_flows()["global"]) == documents
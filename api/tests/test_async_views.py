@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.test import AsyncClient
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from api.utils.query_budget import get_summary, reset_stats
+
+
+@pytest.fixture
+def token():
+    return Token.objects.create(user=User.objects.create_user("async", password="x")).key
+
+
+def async_get(path, **headers):
+    return async_to_sync(AsyncClient().get)(path, headers=headers)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sync_path, async_path", [
+    ("/api/kpis/", "/api/async/kpis/"),
+    ("/api/period/?period=month", "/api/async/period/?period=month"),
+    ("/api/tresorerietraites/", "/api/async/tresorerietraites/"),
+    ("/api/schedule/?horizon=30", "/api/async/schedule/?horizon=30"),
+    ("/api/dashboard/main-insights/", "/api/async/dashboard/main-insights/"),
+])
+def test_async_views_match_sync_views(flows_data, token, settings, sync_path, async_path):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    api_client = APIClient()
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    expected = api_client.get(sync_path)
+
+    response = async_get(async_path, authorization=f"Token {token}")
+    assert response.status_code == expected.status_code == 200
+    assert response.json() == expected.json()
+
+
+@pytest.mark.django_db
+def test_async_views_auth_and_budget(flows_data, token):
+    assert async_get("/api/async/kpis/").status_code == 401
+    # Token authentication only, like the DRF views: a session is not enough
+    session_client = AsyncClient()
+    async_to_sync(session_client.aforce_login)(User.objects.get(username="async"))
+    assert async_to_sync(session_client.get)("/api/async/kpis/").status_code == 401
+    assert async_get("/api/async/schedule/?type=x", authorization=f"Token {token}").status_code == 400
+
+    reset_stats()
+    assert async_get("/api/async/dashboard/counts/").json()["total_clients"] == 1
+    summary = {e["endpoint"]: e for e in get_summary()}
+    assert summary["api:async-dashboard-counts"]["max_queries"] == 7
+
+
+def test_async_views_are_coroutines():
+    from api import async_views
+    assert asyncio.iscoroutinefunction(async_views.kpis)
+    assert asyncio.iscoroutinefunction(async_views.main_dashboard_insights)
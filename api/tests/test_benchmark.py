@@ -0,0 +1,31 @@
+import pytest
+from datetime import date, timedelta
+from django.core.management import call_command
+from django.db.models import Max, Min, Sum
+from api.models import Cd, Traite
+
+
+def snapshot():
+    return (
+        Cd.objects.count(),
+        Cd.objects.aggregate(total=Sum("montant_ttc"))["total"],
+        list(Traite.objects.order_by("date_echeance", "montant").values_list("date_echeance", "status")[:50]),
+    )
+
+
+@pytest.mark.django_db
+def test_seed_benchmark_is_deterministic():
+    call_command("seed_benchmark", scale=1, seed=7)
+    first = snapshot()
+    call_command("seed_benchmark", scale=1, seed=7, flush=True)
+
+    assert first[0] == 500
+    assert snapshot() == first
+
+
+@pytest.mark.django_db
+def test_seed_benchmark_dates_are_anchored():
+    call_command("seed_benchmark", "--today", "2024-03-15")
+    dates = Cd.objects.aggregate(first=Min("date_commande"), last=Max("date_commande"))
+    anchor = date(2024, 3, 15)
+    assert anchor - timedelta(days=365) <= dates["first"] <= dates["last"] <= anchor + timedelta(days=90)
@@ -0,0 +1,55 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from api.models import Cd, PlanTraite
+from api.services.cache_service import get_data_version, get_or_compute
+from api.services.kpi_service import compute_kpis, compute_total
+from api.utils.memo import request_memo
+
+
+@pytest.mark.django_db
+def test_kpis_cached_until_treasury_write(flows_data):
+    cache.clear()
+    first = get_or_compute("kpis", lambda: compute_kpis("7d"), "7d")
+    version = get_data_version()
+
+    with CaptureQueriesContext(connection) as queries:
+        assert get_or_compute("kpis", lambda: compute_kpis("7d"), "7d") == first
+    # Cache reads only (DatabaseCache by default): no application table queried
+    assert not any('"api_' in q["sql"] for q in queries.captured_queries)
+
+    cd = Cd.objects.get(numero_commande="FAC-T-00001")
+    cd.montant_ht = cd.montant_ttc = 1500
+    cd.save()
+
+    assert get_data_version() != version
+    second = get_or_compute("kpis", lambda: compute_kpis("7d"), "7d")
+    assert second["global_income"]["value"] == first["global_income"]["value"] + 500
+
+
+@pytest.mark.django_db
+def test_request_memo_reuses_compute_total(flows_data):
+    today, _ = flows_data
+    args = (Cd, "date_commande", {"statut": "completed", "is_deleted": False})
+    with request_memo():
+        first = compute_total(*args, date_range=(today, today), aggregate_expression={"total": Sum("montant_ttc")})
+        with CaptureQueriesContext(connection) as queries:
+            second = compute_total(*args, date_range=(today, today), aggregate_expression={"total": Sum("montant_ttc")})
+
+    assert first == second == 1000
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db
+def test_traites_follow_plan_soft_delete(staff_client, traites_data):
+    cache.clear()
+    first = staff_client.get("/api/tresorerietraites/")
+    plan = PlanTraite.objects.get()
+    response = staff_client.patch(f"/api/plans-traite/{plan.pk}/soft-delete/", {"is_deleted": True}, format="json")
+    assert response.status_code == 200
+
+    second = staff_client.get("/api/tresorerietraites/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert second.status_code == 200
+    assert second.json()["stats"] != first.json()["stats"]
@@ -0,0 +1,44 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.services.chart_data import get_chart_series, get_buckets
+
+
+def test_buckets_are_gap_filled():
+    assert get_buckets("quarter", date(2025, 2, 10), date(2025, 12, 1)) == [
+        date(2025, 1, 1), date(2025, 4, 1), date(2025, 7, 1), date(2025, 10, 1),
+    ]
+    assert len(get_buckets("week", date(2025, 1, 1), date(2025, 3, 31))) == 14
+
+
+@pytest.mark.django_db
+def test_daily_series(flows_data):
+    today, last_week = flows_data
+    with CaptureQueriesContext(connection) as queries:
+        series = get_chart_series("day", last_week, today)
+    assert len(queries) == 1
+
+    income, expense, balance = (dataset["data"] for dataset in series["datasets"])
+    assert len(series["labels"]) == len(income) == 8
+    assert (income[0], expense[0]) == (Decimal("300"), Decimal("150"))
+    assert (income[-1], expense[-1]) == (Decimal("1000"), Decimal("200"))
+    assert income[1:-1] == expense[1:-1] == [0] * 6
+    assert balance[-1] == Decimal("800")
+
+    with CaptureQueriesContext(connection) as queries:
+        documents = get_chart_series("day", last_week, today, from_documents=True)
+    assert len(queries) == 6
+    assert documents["datasets"] == series["datasets"]
+
+
+@pytest.mark.django_db
+def test_chart_series_view(staff_client, flows_data):
+    today, last_week = flows_data
+    response = staff_client.get("/api/chart/", {"granularity": "month", "start": last_week.isoformat()})
+    assert response.status_code == 200
+    assert sum(Decimal(str(v)) for v in response.json()["datasets"][2]["data"]) == Decimal("950")
+
+    assert staff_client.get("/api/chart/", {"granularity": "hour"}).status_code == 400
+    assert staff_client.get("/api/chart/", {"granularity": "day", "start": "2000-01-01"}).status_code == 400
@@ -0,0 +1,105 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Client, Cd, Produit
+from api.services.stock_service import reserve_stock
+
+
+@pytest.fixture
+def clients():
+    return [
+        Client.objects.create(nom_client=f"Client {i}", numero_fiscal=f"CG-{i}", code_client=f"CG{i}")
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+def test_list_not_modified(staff_client, clients):
+    response = staff_client.get("/api/clients/")
+    etag = response["ETag"]
+    assert response.status_code == 200 and response.has_header("Last-Modified")
+
+    # One aggregate query, nothing serialized
+    with CaptureQueriesContext(connection) as queries:
+        response = staff_client.get("/api/clients/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert len(queries) == 1
+
+    # The query string is part of the validator
+    assert staff_client.get("/api/clients/?page=1", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    clients[0].nom_client = "Renamed"
+    clients[0].save()
+    response = staff_client.get("/api/clients/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response["ETag"] != etag
+
+    etag = response["ETag"]
+    clients[1].is_deleted = True
+    clients[1].save()
+    assert staff_client.get("/api/clients/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_detail_not_modified(staff_client, clients):
+    url = f"/api/clients/{clients[0].pk}/"
+    response = staff_client.get(url)
+    assert response.json()["nom_client"] == "Client 0"
+
+    assert staff_client.get(url, HTTP_IF_NONE_MATCH=f'W/{response["ETag"]}').status_code == 304
+    assert staff_client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code == 304
+    assert staff_client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+@pytest.mark.django_db
+def test_treasury_not_modified(staff_client, flows_data):
+    cache.clear()
+    etag = staff_client.get("/api/kpis/")["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        assert staff_client.get("/api/kpis/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    # Cache reads only (DatabaseCache by default): no application table queried
+    assert not any('"api_' in q["sql"] for q in queries.captured_queries)
+
+    cd = Cd.objects.get(numero_commande="FAC-T-00001")
+    cd.montant_ht = cd.montant_ttc = 1500
+    cd.save()
+    response = staff_client.get("/api/kpis/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_stale_result_keeps_its_etag(staff_client, flows_data, worker):
+    first = staff_client.get("/api/kpis/")
+    Cd.objects.filter(numero_commande="FAC-T-00001").get().save()
+
+    # The stale payload keeps its own validator, not the current one
+    assert staff_client.get("/api/kpis/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+    assert staff_client.get("/api/kpis/")["ETag"] == first["ETag"]
+
+
+@pytest.mark.django_db
+def test_async_treasury_not_modified(flows_data):
+    from test_async_views import async_get
+
+    cache.clear()
+    etag = async_get("/api/async/period/?period=month")["ETag"]
+    assert async_get("/api/async/period/?period=month", if_none_match=etag).status_code == 304
+    assert async_get("/api/async/period/?period=week", if_none_match=etag).status_code == 200
+
+
+@pytest.mark.django_db
+def test_product_stock_changes_are_seen(staff_client):
+    produit = Produit.objects.create(nom_produit="Tôle", ref_produit="CG-1", stock=10)
+    url = f"/api/produits/{produit.pk}/"
+
+    etag = staff_client.get(url)["ETag"]
+    produit.stock = 8
+    produit.save(update_fields=["stock"])
+    response = staff_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response.json()["stock"] == 8
+
+    etag = response["ETag"]
+    reserve_stock([(produit, 3)])
+    response = staff_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200 and response.json()["stock"] == 5
@@ -0,0 +1,60 @@
+from datetime import date
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from api.models import Cd, Commande, Devis, Avoir, DocumentSequence
+
+YEAR = timezone.localdate().year
+
+
+def create_cd(client, **kwargs):
+    return Cd.objects.create(client=client, date_commande=date.today(), **kwargs)
+
+
+@pytest.mark.django_db
+def test_numbers_per_prefix(client):
+    assert create_cd(client).numero_commande == f"FAC-{YEAR}-00001"
+    assert create_cd(client).numero_commande == f"FAC-{YEAR}-00002"
+    assert create_cd(client, type_facture="bon").numero_commande == f"FAC-BL-{YEAR}-00001"
+    assert create_cd(client, nature="avoir").numero_commande == f"AV-{YEAR}-00001"
+
+    # Commande has its own sequence, it no longer reads the Cd table
+    commande = Commande.objects.create(client=client, date_commande=date.today())
+    assert commande.numero_commande == f"CMD-{YEAR}-00001"
+
+
+@pytest.mark.django_db
+def test_sequence_starts_after_existing_numbers(client):
+    create_cd(client, numero_commande=f"FAC-{YEAR}-00041")
+    create_cd(client, numero_commande=f"FAC-{YEAR}-00007")
+    create_cd(client, numero_commande=f"FAC-{YEAR - 1}-00099")
+    assert create_cd(client).numero_commande == f"FAC-{YEAR}-00042"
+
+    # Constant-cost afterwards: no scan of the documents
+    with CaptureQueriesContext(connection) as queries:
+        assert DocumentSequence.next_number("FAC", YEAR) == 43
+    assert not any("api_cd" in query["sql"] for query in queries.captured_queries)
+
+
+@pytest.mark.django_db
+def test_devis_and_avoir_numbers(client):
+    devis = Devis.objects.create(client=client, date_emission=date.today())
+    assert devis.numero_devis == f"DEV-{YEAR}-00001"
+    assert Devis.objects.create(client=client, date_emission=date.today(), numero_devis="D-1").numero_devis == "D-1"
+
+    # Avoirs fournisseur keep their format and their own sequence
+    create_cd(client, nature="avoir")
+    Avoir.objects.create(numero=f"AV-{YEAR}-004")
+    assert Avoir.objects.create().numero == f"AV-{YEAR}-005"
+
+
+@pytest.mark.django_db
+def test_numbers_typed_by_hand_move_the_sequence(client):
+    assert Devis.objects.create(client=client, date_emission=date.today()).numero_devis == f"DEV-{YEAR}-00001"
+    Devis.objects.create(client=client, date_emission=date.today(), numero_devis=f"DEV-{YEAR}-00010")
+    assert Devis.objects.create(client=client, date_emission=date.today()).numero_devis == f"DEV-{YEAR}-00011"
+
+    Commande.objects.create(client=client, date_commande=date.today())
+    Commande.objects.create(client=client, date_commande=date.today(), numero_commande=f"CMD-{YEAR}-00005")
+    assert Commande.objects.create(client=client, date_commande=date.today()).numero_commande == f"CMD-{YEAR}-00006"
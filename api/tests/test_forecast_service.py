@@ -0,0 +1,32 @@
+import pytest
+from datetime import timedelta
+from api.models import Cd, Client
+from api.services.forecast_service import compute_forecast
+
+
+@pytest.mark.django_db
+def test_forecast_cumulates_daily_commitments(traites_data):
+    forecast = compute_forecast(days=30, today=traites_data)
+
+    assert len(forecast["solde"]) == 31
+    assert forecast["solde_initial"] == -40
+    # Overdue traites are expected today
+    assert forecast["encaissements"][0] == 200 and forecast["decaissements"][0] == 40
+    assert forecast["solde"][0] == 120
+    assert forecast["solde"][9] == 120
+    assert forecast["solde"][10] == forecast["solde"][-1] == 180
+
+
+@pytest.mark.django_db
+def test_forecast_ignores_pending_avoirs(traites_data):
+    client = Client.objects.get()
+    day = traites_data + timedelta(days=5)
+    for nature, montant in (("facture", 500), ("avoir", 300), ("avoir-facture", 300)):
+        Cd.objects.create(
+            client=client, date_commande=day, statut="pending", mode_paiement="cash",
+            montant_ht=montant, montant_ttc=montant, nature=nature,
+        )
+
+    forecast = compute_forecast(days=30, today=traites_data)
+    assert forecast["encaissements"][5] == 500
+    assert forecast["solde"][5] == 620
@@ -0,0 +1,105 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Categorie, Client, Produit, SousCategorie
+
+PRODUITS_CSV = """nom_produit;ref_produit;materiau;categorie;sous_categorie;stock;prix_unitaire
+Tôle 1;;acier;Tôles;Fines;10;12.5
+Tôle 2;;acier;Tôles;;5;
+Profilé;AL-0040;aluminium;;;0;3
+Tube;;aluminium;;;;
+;;acier;;;;
+Inconnu;;;Bois;;;
+Doublon;OT-0001;;;;;
+Mauvais stock;;acier;;;beaucoup;
+"""
+
+
+def upload(content, name="produits.csv"):
+    return SimpleUploadedFile(name, content.encode())
+
+
+@pytest.fixture
+def categories():
+    tole = Categorie.objects.create(nom="Tôles")
+    SousCategorie.objects.create(categorie=tole, nom="Fines")
+    Produit.objects.create(nom_produit="Existant", ref_produit="AC-0007", materiau="acier")
+    Produit.objects.create(nom_produit="Manuel", ref_produit="OT-0001")
+
+
+@pytest.mark.django_db
+def test_import_produits(staff_client, categories):
+    response = staff_client.post("/api/produits/import/", {"file": upload(PRODUITS_CSV)})
+    assert response.status_code == 200
+    report = response.json()
+    assert report["created"] == 4
+    assert {error["row"]: list(error["errors"]) for error in report["errors"]} == {
+        6: ["nom_produit"],
+        7: ["categorie"],
+        8: ["ref_produit"],
+        9: ["stock"],
+    }
+
+    # Contiguous ranges after the existing codes and the codes of the file
+    refs = dict(Produit.objects.values_list("nom_produit", "ref_produit"))
+    assert (refs["Tôle 1"], refs["Tôle 2"]) == ("AC-0008", "AC-0009")
+    assert (refs["Profilé"], refs["Tube"]) == ("AL-0040", "AL-0041")
+    tole = Produit.objects.get(nom_produit="Tôle 1")
+    assert (tole.categorie.nom, tole.sous_categorie.nom, tole.stock) == ("Tôles", "Fines", 10)
+
+    # The sequence continues after the import
+    assert Produit.objects.create(nom_produit="Après", materiau="acier").ref_produit == "AC-0010"
+
+
+@pytest.mark.django_db
+def test_import_query_count(staff_client, categories):
+    lines = "".join(f"Produit {i},acier,Tôles,Fines\n" for i in range(2500))
+    content = "nom_produit,materiau,categorie,sous_categorie\n" + lines
+    with CaptureQueriesContext(connection) as queries:
+        response = staff_client.post("/api/produits/import/", {"file": upload(content)})
+    assert response.json() == {"created": 2500, "errors": []}
+    # Categories, ref sequence and savepoints; the INSERTs are batched by bulk_create
+    assert len([q for q in queries.captured_queries if not q["sql"].startswith("INSERT")]) < 10
+    assert Produit.objects.filter(materiau="acier").order_by("-ref_produit").first().ref_produit == "AC-2507"
+
+
+@pytest.mark.django_db
+def test_import_invalid_file(staff_client):
+    assert staff_client.post("/api/produits/import/").status_code == 400
+    response = staff_client.post("/api/produits/import/", {"file": upload("x", name="produits.txt")})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_import_corrupt_xlsx(staff_client):
+    pytest.importorskip("openpyxl")
+    response = staff_client.post("/api/produits/import/", {"file": upload(PRODUITS_CSV, name="produits.xlsx")})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_import_clients(staff_client):
+    existing = Client.objects.create(nom_client="Existant", numero_fiscal="100 0000A/B/C/000")
+    content = "\n".join([
+        "nom_client,numero_fiscal,telephone",
+        *(f"Client {i},{200 + i} 0000A/B/C/000,7100000{i}" for i in range(5)),
+        "Déjà là,100 0000A/B/C/000,",
+        "Doublon,300 0000A/B/C/000,",
+        "Doublon bis,300 0000A/B/C/000,",
+        "Mauvais numéro,123,",
+        "Mauvais téléphone,400 0000A/B/C/000,abc",
+    ])
+    with CaptureQueriesContext(connection) as queries:
+        report = staff_client.post("/api/clients/import/", {"file": upload(content, "clients.csv")}).json()
+    assert report["created"] == 5
+    assert [(error["row"], list(error["errors"])) for error in report["errors"]] == [
+        (7, ["numero_fiscal"]), (8, ["numero_fiscal"]), (9, ["numero_fiscal"]),
+        (10, ["numero_fiscal"]), (11, ["telephone"]),
+    ]
+    # The code_client range reservation and one INSERT for the whole batch
+    assert len([q for q in queries.captured_queries if q["sql"].startswith(("INSERT", "UPDATE"))]) == 2
+
+    codes = sorted(Client.objects.exclude(pk=existing.pk).values_list("code_client", flat=True))
+    assert codes == [f"{int(existing.code_client) + i:05d}" for i in range(1, 6)]
+    assert Client.objects.create(nom_client="Après", numero_fiscal="500 0000A/B/C/000").code_client == "00007"
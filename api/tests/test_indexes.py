@@ -0,0 +1,44 @@
+import pytest
+from datetime import date
+from django.db import connection
+from api.models import Cd, Traite, TraiteFournisseur, FichePaie, FactureAchatProduit
+from api.services.aggregation_service import get_date_filter
+
+START, END = date(2025, 1, 1), date(2025, 12, 31)
+
+
+def index_name(model, fields):
+    return next(index.name for index in model._meta.indexes if index.fields == fields)
+
+
+def explain(qs):
+    if connection.vendor == "postgresql":
+        # Tables are empty in tests: forbid the sequential scan the planner would prefer
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    return qs.explain()
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor not in ("sqlite", "postgresql"), reason="EXPLAIN format")
+@pytest.mark.parametrize("qs, model, fields", [
+    (lambda: Cd.objects.filter(statut="completed", is_deleted=False, mode_paiement="mixte",
+                               date_commande__range=(START, END)),
+     Cd, ["statut", "mode_paiement", "date_commande"]),
+    (lambda: Cd.objects.filter(nature="facture", is_deleted=True), Cd, ["nature", "is_deleted"]),
+    (lambda: Traite.objects.filter(status="PAYEE", date_echeance__range=(START, END),
+                                   plan_traite__is_deleted=False),
+     Traite, ["status", "date_echeance"]),
+    (lambda: TraiteFournisseur.objects.filter(status="PAYEE", date_echeance__range=(START, END),
+                                              plan_traite__is_deleted=False),
+     TraiteFournisseur, ["status", "date_echeance"]),
+    # Same date filter as the schedule and the rollup (day bounds, not __date)
+    (lambda: FichePaie.objects.filter(get_date_filter(FichePaie, "date_paiement", START, END)),
+     FichePaie, ["date_paiement"]),
+    (lambda: FactureAchatProduit.objects.filter(date_facture__range=(START, END)),
+     FactureAchatProduit, ["date_facture"]),
+    (lambda: FactureAchatProduit.objects.filter(mode_paiement="mixte", date_facture__range=(START, END)),
+     FactureAchatProduit, ["mode_paiement", "date_facture"]),
+])
+def test_treasury_filters_use_indexes(qs, model, fields):
+    assert index_name(model, fields) in explain(qs())
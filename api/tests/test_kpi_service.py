@@ -0,0 +1,23 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from api.models import Cd
+from api.services.kpi_service import compute_kpis, compute_income, compute_expenses
+from api.utils.dates import get_period_range, get_week_range
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("period", ["week", "month", "year"])
+def test_balance_trend_compares_against_get_week_range_1(flows_data, period):
+    today, _ = flows_data
+    Cd.objects.create(
+        numero_commande="FAC-T-00005", client=Cd.objects.first().client, date_commande=today + timedelta(days=7),
+        statut="completed", mode_paiement="cash", montant_ht=500, montant_ttc=500,
+    )
+    range_func, _ = get_period_range(period)
+    data = compute_kpis("7d", range_func)
+
+    previous = Decimal(compute_income(get_week_range, offset=1)) - Decimal(compute_expenses(*get_week_range(1)))
+    assert previous == Decimal("500")
+    current = Decimal(str(data["balance"]["value"]))
+    assert data["balance"]["trend"] == round((current - previous) / previous * 100, 1)
@@ -0,0 +1,21 @@
+import logging
+import pytest
+from api.utils.log import CorrelationIdFilter, SamplingFilter, get_correlation_id
+
+
+@pytest.mark.django_db
+def test_correlation_id_header(staff_client):
+    response = staff_client.get("/api/schedule/", HTTP_X_REQUEST_ID="abc123")
+    assert response["X-Request-ID"] == "abc123"
+
+    generated = staff_client.get("/api/schedule/")["X-Request-ID"]
+    assert generated and generated != "abc123"
+    assert get_correlation_id() == "-"
+
+
+def test_filters():
+    record = logging.LogRecord("api", logging.DEBUG, __file__, 1, "msg", None, None)
+    assert CorrelationIdFilter().filter(record) and record.correlation_id == "-"
+    assert not SamplingFilter(0).filter(record)
+    record.levelno = logging.WARNING
+    assert SamplingFilter(0).filter(record)
@@ -0,0 +1,29 @@
+import importlib
+import pytest
+from django.apps import apps
+from api.models import TresorerieJour, Transaction
+
+fill_tresorerie = importlib.import_module("api.migrations.0009_fill_tresorerie")
+
+
+def rollup_rows():
+    return sorted(TresorerieJour.objects.values_list("date", "flux", "montant", "nombre"))
+
+
+def journal_rows():
+    return sorted(Transaction.objects.values_list("source_type", "source_id", "date", "amount", "is_deleted"))
+
+
+@pytest.mark.django_db
+def test_fill_tresorerie_migration_matches_the_signals(flows_data):
+    expected_rollup, expected_journal = rollup_rows(), journal_rows()
+    assert expected_rollup and expected_journal
+    # An upgraded database: documents, but empty rollup and journal tables
+    TresorerieJour.objects.all().delete()
+    Transaction.objects.all().delete()
+
+    fill_tresorerie.fill_rollup(apps, None)
+    fill_tresorerie.fill_transactions(apps, None)
+
+    assert rollup_rows() == expected_rollup
+    assert journal_rows() == expected_journal
@@ -0,0 +1,33 @@
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.services.period_service import compare_periods
+
+
+@pytest.mark.django_db
+def test_compare_periods_one_query_per_source(traites_data):
+    today = traites_data
+    with CaptureQueriesContext(connection) as queries:
+        data = compare_periods("week", 8, today=today + timedelta(days=14))
+
+    assert len(queries) == 4
+    periods = data["periods"]
+    assert len(periods) == 8
+    assert [p["end"] - p["start"] for p in periods] == [timedelta(days=6)] * 8
+
+    current = next(p for p in periods if p["start"] <= today <= p["end"])
+    assert current["decaissements"] == current["traites_fournisseurs"] == Decimal("40")
+    assert current["resultat_net"] == Decimal("-40")
+    assert sum(p["echues"]["count"] for p in periods) == 5
+
+
+@pytest.mark.django_db
+def test_compare_periods_ignores_pending_and_deleted_invoices(flows_data):
+    today, _ = flows_data
+    periods = compare_periods("week", 4, today=today)["periods"]
+
+    current = next(p for p in periods if p["start"] <= today <= p["end"])
+    # Only FAC-T-00001 (the mixte invoice is last week, pending and deleted are ignored)
+    assert current["encaissements"] == Decimal("1000")
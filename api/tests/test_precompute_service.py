@@ -0,0 +1,74 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from api.models import Cd
+from api.services.cache_service import WORKER_KEY, get_latest_key, get_or_serve_stale, is_fresh, pop_refresh_requests
+from api.services.kpi_service import compute_kpis
+from api.services.precompute_service import get_standard_payloads, precompute
+
+
+def get_kpis():
+    return get_or_serve_stale("kpis", lambda: compute_kpis("7d"), "7d")
+
+
+def write():
+    cd = Cd.objects.get(numero_commande="FAC-T-00001")
+    cd.montant_ht = cd.montant_ttc = 1500
+    cd.save()
+
+
+@pytest.mark.django_db
+def test_stale_while_revalidate(flows_data, worker):
+    first = get_kpis()
+    write()
+
+    # Stale result served at once, the worker is asked to refresh it
+    with CaptureQueriesContext(connection) as queries:
+        assert get_kpis() == first
+    # Cache reads only (DatabaseCache by default): no application table queried
+    assert not any('"api_' in q["sql"] for q in queries.captured_queries)
+    assert not is_fresh("kpis", "7d")
+
+    assert ("kpis", ("7d",)) in precompute()
+    assert get_kpis()["global_income"]["value"] == first["global_income"]["value"] + 500
+    assert precompute() == []
+
+
+@pytest.mark.django_db
+def test_computed_inline_without_worker(flows_data):
+    cache.clear()
+    first = get_kpis()
+    write()
+    assert get_kpis()["global_income"]["value"] == first["global_income"]["value"] + 500
+
+
+@pytest.mark.django_db
+def test_precompute_command(flows_data, capsys):
+    cache.clear()
+    call_command("precompute_tresorerie", "--once")
+    assert f"Refreshed {len(get_standard_payloads())} payload(s)" in capsys.readouterr().out
+    assert all(is_fresh(name, *params) for name, params in get_standard_payloads())
+    assert cache.get(WORKER_KEY) is None
+
+
+@pytest.mark.django_db
+def test_refresh_requests(flows_data, worker):
+    get_kpis()
+    write()
+    get_kpis()
+    get_kpis()
+    assert pop_refresh_requests(get_standard_payloads()) == [("kpis", ("7d",))]
+    assert pop_refresh_requests(get_standard_payloads()) == []
+
+
+@pytest.mark.django_db
+def test_unknown_params_are_rejected(staff_client, worker):
+    assert staff_client.get("/api/kpis/", {"evolution_weeks": "42d"}).status_code == 400
+    assert staff_client.get("/api/period/", {"period": "decade"}).status_code == 400
+    assert async_to_sync(AsyncClient().get)("/api/async/period/?period=decade").status_code == 400
+    assert cache.get(get_latest_key("kpis", "42d")) is None
+    assert cache.get(get_latest_key("period", "decade")) is None
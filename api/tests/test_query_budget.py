@@ -0,0 +1,32 @@
+import pytest
+from api.utils.query_budget import UNRESOLVED, QueryBudgetExceeded, get_summary, reset_stats
+
+
+@pytest.mark.django_db
+def test_query_budget_summary(staff_client, settings):
+    reset_stats()
+    settings.QUERY_BUDGETS = {"api:schedule": 0}
+    assert staff_client.get("/api/schedule/").status_code == 200
+
+    summary = {e["endpoint"]: e for e in staff_client.get("/api/query-budget/").json()}
+    assert summary["api:schedule"]["requests"] == 1
+    assert summary["api:schedule"]["max_queries"] == 4
+    assert summary["api:schedule"]["overruns"] == 1
+
+
+@pytest.mark.django_db
+def test_query_budget_raise(staff_client, settings):
+    settings.QUERY_BUDGETS = {"api:schedule": 3}
+    settings.QUERY_BUDGET_RAISE = True
+    with pytest.raises(QueryBudgetExceeded):
+        staff_client.get("/api/schedule/")
+
+
+@pytest.mark.django_db
+def test_unresolved_paths_share_one_entry(staff_client):
+    reset_stats()
+    for path in ("/nowhere/1/", "/nowhere/2/", "/api/nowhere/"):
+        assert staff_client.get(path).status_code == 404
+    summary = {e["endpoint"]: e for e in get_summary()}
+    assert list(summary) == [UNRESOLVED]
+    assert summary[UNRESOLVED]["requests"] == 3
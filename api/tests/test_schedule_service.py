@@ -0,0 +1,32 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.services.schedule_service import get_schedule
+
+
+@pytest.mark.django_db
+def test_schedule_merges_sources_in_date_order(traites_data):
+    today = traites_data
+    with CaptureQueriesContext(connection) as queries:
+        events = get_schedule(end_date=today + timedelta(days=30))
+
+    assert len(queries) == 4
+    assert [(e["date"], e["description"], e["amount"]) for e in events] == [
+        (today.isoformat(), "Traite Client Client A", 100),
+        ((today + timedelta(days=10)).isoformat(), "Traite Fournisseur Fournisseur B", -40),
+        ((today + timedelta(days=10)).isoformat(), "Traite Client Client A", 100),
+    ]
+
+
+@pytest.mark.django_db
+def test_schedule_type_filter_and_limit(traites_data):
+    events = get_schedule(types=["traite_client"], limit=1)
+    assert [e["description"] for e in events] == ["Traite Client Client A"]
+
+
+@pytest.mark.django_db
+def test_schedule_view_bounds_params(staff_client, traites_data):
+    assert len(staff_client.get("/api/schedule/", {"limit": -1, "horizon": 30}).json()) == 1
+    assert len(staff_client.get("/api/schedule/", {"horizon": 99999999}).json()) == 3
+    assert staff_client.get("/api/schedule/", {"limit": "x"}).status_code == 400
@@ -0,0 +1,55 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Cd, TresorerieJour, TresoreriePeriode
+from api.services.aggregation_service import aggregate_flows, split_flows
+from api.services.kpi_service import get_treasury_evolution_weeks
+from api.services.snapshot_service import close_periods, get_closed_until, reopen_periods
+
+
+@pytest.mark.django_db
+def test_global_is_snapshots_plus_delta(flows_data):
+    today, last_week = flows_data
+    assert close_periods("week", today=today) > 0
+    closed_until = get_closed_until()
+    assert last_week <= closed_until < today
+    assert TresoreriePeriode.objects.get(fin=closed_until, flux="cd_mixte").montant == Decimal("300")
+
+    # The closed days are no longer read: dropping them keeps the same global totals
+    TresorerieJour.objects.filter(date__lte=closed_until).delete()
+    with CaptureQueriesContext(connection) as queries:
+        flows = aggregate_flows()
+    assert len(queries) == 2
+    assert split_flows(flows["global"]) == (Decimal("1300"), Decimal("350"))
+
+    # Nothing left to close
+    assert close_periods("week", today=today) == 0
+
+
+@pytest.mark.django_db
+def test_closed_periods_are_immutable_until_reopened(flows_data):
+    today, last_week = flows_data
+    close_periods("week", today=today)
+    snapshot = TresoreriePeriode.objects.first()
+    with pytest.raises(ValueError):
+        snapshot.save()
+
+    Cd.objects.filter(numero_commande="FAC-T-00002").get().delete()
+    assert split_flows(aggregate_flows()["global"])[0] == Decimal("1300")
+
+    reopen_periods(last_week)
+    assert get_closed_until() is None or get_closed_until() < last_week
+    assert split_flows(aggregate_flows()["global"])[0] == Decimal("1000")
+    assert close_periods("week", today=today) > 0
+    assert split_flows(aggregate_flows()["global"])[0] == Decimal("1000")
+
+
+@pytest.mark.django_db
+def test_closed_weeks_are_still_charted(flows_data):
+    today, last_week = flows_data
+    before = get_treasury_evolution_weeks("30d")["datasets"][0]["data"]
+    assert before[-2] == Decimal("150")
+
+    close_periods("week", today=today)
+    assert get_treasury_evolution_weeks("30d")["datasets"][0]["data"] == before
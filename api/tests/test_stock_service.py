@@ -0,0 +1,86 @@
+from datetime import date
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Cd, PdC, Produit
+from api.services.stock_service import InsufficientStockError, reserve_stock
+
+
+@pytest.fixture
+def produits():
+    return [
+        Produit.objects.create(nom_produit=f"Produit {i}", ref_produit=f"ST-{i}", stock=10, prix_unitaire=5)
+        for i in range(3)
+    ]
+
+
+def stocks(produits):
+    return [Produit.objects.get(pk=produit.pk).stock for produit in produits]
+
+
+@pytest.mark.django_db
+def test_reserve_stock(produits):
+    a, b, c = produits
+    with CaptureQueriesContext(connection) as queries:
+        reserve_stock([(a, 3), (b, 4), (a, 2)])
+    assert stocks(produits) == [5, 6, 10]
+    updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1 and "CASE" in updates[0]
+
+    # Update of a document: old lines given back, new ones taken, net
+    reserve_stock([(a.pk, 1), (c.pk, 10)], released=[(a.pk, 5), (b.pk, 4)])
+    assert stocks(produits) == [9, 10, 0]
+
+
+@pytest.mark.django_db
+def test_reserve_stock_reports_every_line(produits):
+    a, b, c = produits
+    with pytest.raises(InsufficientStockError) as error:
+        reserve_stock([(a, 11), (b, 1), (c, 20)])
+    assert [(e["produit"], e["available"], e["requested"]) for e in error.value.errors] == [
+        (a.pk, 10, 11), (c.pk, 10, 20),
+    ]
+    assert stocks(produits) == [10, 10, 10]
+
+
+@pytest.mark.django_db
+def test_cd_stock(staff_client, client, produits):
+    a, b, _ = produits
+    payload = {
+        "client": client.pk,
+        "date_commande": date.today().isoformat(),
+        "produits": [
+            {"produit": a.pk, "quantite": 4, "prix_unitaire": 5},
+            {"produit": b.pk, "quantite": 11, "prix_unitaire": 5},
+        ],
+    }
+    response = staff_client.post("/api/cds/", payload, format="json")
+    assert response.status_code == 400
+    assert [e["produit"] for e in response.json()["errors"]] == [b.pk]
+    assert not Cd.objects.exists() and stocks(produits)[:2] == [10, 10]
+
+    payload["produits"][1]["quantite"] = 6
+    assert staff_client.post("/api/cds/", payload, format="json").status_code == 201
+    assert stocks(produits)[:2] == [6, 4]
+
+    cd = Cd.objects.get()
+    assert staff_client.post(f"/api/cds/{cd.pk}/delete_logically/").status_code == 200
+    assert stocks(produits)[:2] == [10, 10]
+    assert PdC.objects.filter(cd=cd).count() == 2
+
+
+@pytest.mark.django_db
+def test_cd_stock_changes_product_etags(staff_client, client, produits):
+    a, _, _ = produits
+    detail = staff_client.get(f"/api/produits/{a.pk}/")
+    listing = staff_client.get("/api/produits/")
+    payload = {
+        "client": client.pk,
+        "date_commande": date.today().isoformat(),
+        "produits": [{"produit": a.pk, "quantite": 3, "prix_unitaire": 5}],
+    }
+    assert staff_client.post("/api/cds/", payload, format="json").status_code == 201
+
+    response = staff_client.get(f"/api/produits/{a.pk}/", HTTP_IF_NONE_MATCH=detail["ETag"])
+    assert response.status_code == 200 and response.json()["stock"] == 7
+    assert staff_client.get("/api/produits/", HTTP_IF_NONE_MATCH=listing["ETag"]).status_code == 200
@@ -0,0 +1,90 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from api.devis_serializers import DevisDetailSerializer
+from api.models import Devis, Produit, ProduitDevis
+from api.utils.totals import defer_totals
+
+
+@pytest.fixture
+def produits():
+    return [
+        Produit.objects.create(nom_produit=f"Produit {i}", ref_produit=f"TT-{i}", stock=10, prix_unitaire=10)
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def calculations(monkeypatch):
+    """Ids of the Devis recalculated, one entry per calculate_totals() call."""
+    calls = []
+    calculate_totals = Devis.calculate_totals
+
+    def counted(self):
+        calls.append(self.pk)
+        return calculate_totals(self)
+
+    monkeypatch.setattr(Devis, "calculate_totals", counted)
+    return calls
+
+
+def add_lines(devis, produits):
+    for produit in produits:
+        ProduitDevis.objects.create(devis=devis, produit=produit, quantite=2, prix_unitaire=10)
+
+
+@pytest.mark.django_db
+def test_defer_totals(client, produits, calculations):
+    devis = Devis.objects.create(client=client, date_emission=date.today())
+    other = Devis.objects.create(client=client, date_emission=date.today())
+    calculations.clear()
+
+    with defer_totals():
+        add_lines(devis, produits)
+        with defer_totals():
+            add_lines(other, produits[:1])
+        # The nested block defers to the outer one
+        assert calculations == []
+    assert sorted(calculations) == sorted([devis.pk, other.pk])
+    assert Devis.objects.get(pk=devis.pk).montant_ht == Decimal("60")
+    assert Devis.objects.get(pk=other.pk).montant_ht == Decimal("20")
+
+    # Outside a block each line still recalculates its document
+    calculations.clear()
+    add_lines(other, produits[1:])
+    assert calculations == [other.pk, other.pk]
+
+
+@pytest.mark.django_db
+def test_defer_totals_discarded_on_error(client, produits, calculations):
+    devis = Devis.objects.create(client=client, date_emission=date.today())
+    calculations.clear()
+    with pytest.raises(RuntimeError):
+        with defer_totals():
+            add_lines(devis, produits)
+            raise RuntimeError
+    assert calculations == []
+
+
+@pytest.mark.django_db
+def test_devis_serializer_recalculates_once(client, produits, calculations):
+    # Through the serializer: the API response reads the missing Produit.prix
+    data = {
+        "client": client.pk,
+        "date_emission": date.today().isoformat(),
+        "date_validite": date.today().isoformat(),
+        "produits": [{"produit": produit.pk, "quantite": 1, "prix_unitaire": 10} for produit in produits],
+    }
+    serializer = DevisDetailSerializer(data=data)
+    assert serializer.is_valid(), serializer.errors
+    devis = serializer.save()
+    assert calculations.count(devis.pk) == 1
+    assert Devis.objects.get(pk=devis.pk).montant_ht == Decimal("30")
+
+    calculations.clear()
+    data["produits"] = data["produits"][:2]
+    serializer = DevisDetailSerializer(devis, data=data)
+    assert serializer.is_valid(), serializer.errors
+    serializer.save()
+    assert calculations == [devis.pk]
+    assert Devis.objects.get(pk=devis.pk).montant_ht == Decimal("20")
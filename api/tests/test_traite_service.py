@@ -0,0 +1,47 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from datetime import timedelta
+from api.services.traite_service import get_traites_feed, get_traites_stats, get_week_range
+
+
+@pytest.mark.django_db
+def test_feed_is_merged_ordered_and_paginated(traites_data):
+    rows, cursor = [], None
+    while True:
+        page = get_traites_feed(cursor=cursor, limit=4)
+        rows += page["results"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(rows) == 6
+    assert [(r["echeance"], r["type"]) for r in rows] == sorted((r["echeance"], r["type"]) for r in rows)
+    assert rows[0] == {
+        "id": rows[0]["id"], "type": "client", "tier": "Client A", "ref": "FAC-1",
+        "echeance": traites_data - timedelta(days=10), "montant": 100, "statut": "NON_PAYEE", "etat": "echu",
+    }
+    assert rows[1]["montant"] == -40 and rows[1]["tier"] == "Fournisseur B"
+
+
+@pytest.mark.django_db
+def test_feed_filters(traites_data):
+    page = get_traites_feed(feed_type="fournisseur", etat="paye")
+    assert [(r["type"], r["echeance"]) for r in page["results"]] == [("fournisseur", traites_data)]
+
+    page = get_traites_feed(etat="en-cours", date_from=traites_data)
+    assert len(page["results"]) == 3
+
+
+@pytest.mark.django_db
+def test_stats_one_query_per_model(traites_data):
+    start_date, end_date = get_week_range(0)
+    start_prev, end_prev = get_week_range(1)
+    with CaptureQueriesContext(connection) as queries:
+        stats = get_traites_stats(start_date, end_date, start_prev, end_prev, globally=True)
+
+    assert len(queries) == 2
+    assert stats["clients"] == {"value": 300, "count": 3, "trend": 0}
+    assert stats["fournisseurs"]["value"] == -120
+    assert stats["echues"]["value"] == 140 and stats["echues"]["count"] == 2
+    assert stats["net"]["value"] == -40
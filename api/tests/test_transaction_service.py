@@ -0,0 +1,69 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Avance, Employe, FichePaie, Fournisseur, PlanTraiteFournisseur, Transaction
+from api.services.cache_service import get_data_version
+from api.services.kpi_service import get_total_transactions_count
+from api.services.transaction_service import get_journal, rebuild_transactions
+
+
+@pytest.fixture
+def journal_data(flows_data):
+    employe = Employe.objects.create(id_employe="E1", nom="Employé 1", salaire=1000)
+    FichePaie.objects.create(employe=employe, mois=1, annee=2025, salaire_base=1000, net_a_payer=800)
+    return flows_data
+
+
+@pytest.mark.django_db
+def test_journal_normalizes_sources(journal_data):
+    today, last_week = journal_data
+    fiche = Transaction.objects.get(source_type="fiche_paie")
+    assert (fiche.date, fiche.direction, fiche.amount, fiche.counterparty) == (today, "expense", Decimal("800"), "Employé 1")
+    assert Transaction.objects.filter(source_type="cd", is_deleted=True).count() == 1
+    assert set(Transaction.objects.filter(source_type="traite_fournisseur").values_list("counterparty", flat=True)) == {"Test Fournisseur"}
+
+    with CaptureQueriesContext(connection) as queries:
+        assert get_total_transactions_count(lambda: (today, today)) == 5
+    assert len(queries) == 1
+
+    # Kept current by the signals, same rows as a full rebuild
+    fournisseur = Fournisseur.objects.get()
+    with CaptureQueriesContext(connection) as queries:
+        fournisseur.save()
+    assert not [q for q in queries.captured_queries if "api_transaction" in q["sql"]]
+    fournisseur.nom = "Fournisseur renommé"
+    fournisseur.save()
+    assert set(Transaction.objects.filter(source_type="traite_fournisseur").values_list("counterparty", flat=True)) == {"Fournisseur renommé"}
+    plan = PlanTraiteFournisseur.objects.get()
+    plan.is_deleted = True
+    plan.save()
+    assert Transaction.objects.filter(source_type="traite_fournisseur", is_deleted=True).count() == 2
+    plan.is_deleted = False
+    plan.save()
+    live = set(Transaction.objects.values_list("source_type", "source_id", "amount", "counterparty", "is_deleted"))
+    assert rebuild_transactions() == len(live) == 8
+    assert set(Transaction.objects.values_list("source_type", "source_id", "amount", "counterparty", "is_deleted")) == live
+
+
+@pytest.mark.django_db
+def test_avance_invalidates_cached_counts(journal_data):
+    today, _ = journal_data
+    count = get_total_transactions_count(lambda: (today, today))
+    version = get_data_version()
+    Avance.objects.create(employee=Employe.objects.get(), montant=100, motif="Avance", nbr_mensualite=1)
+    assert get_data_version() != version
+    assert get_total_transactions_count(lambda: (today, today)) == count + 1
+
+
+@pytest.mark.django_db
+def test_journal(staff_client, journal_data):
+    summary = {(row["source_type"], row["direction"]): row for row in get_journal()["summary"]}
+    assert summary[("cd", "income")]["count"] == 3
+    assert summary[("cd", "income")]["total"] == Decimal("6900")
+    assert summary[("traite_fournisseur", "expense")]["total"] == Decimal("1149")
+
+    response = staff_client.get("/api/transactions/", {"direction": "expense", "limit": 2})
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 2
+    assert staff_client.get("/api/transactions/", {"type": "x"}).status_code == 400
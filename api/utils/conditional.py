@@ -0,0 +1,119 @@
+"""
+Conditional GET: ETag / Last-Modified validators computed before the
+response is built, so that If-None-Match / If-Modified-Since are answered
+with a 304 without serializing anything.
+"""
+import hashlib
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework.response import Response
+
+from api.services.cache_service import get_stamp, track_served_stamp
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest())
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)."""
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        # Weak comparison: a proxy may have turned the ETag into W/"..."
+        etags = [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        return "*" in etags or etag in etags
+    if last_modified is not None:
+        if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        return if_modified_since is not None and int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    return set_validators(HttpResponseNotModified(), etag, last_modified)
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified on list and retrieve of a ModelViewSet whose model
+    has a last update timestamp (auto_now). The list validator is
+    max(timestamp) + count + max(pk) of the filtered queryset (one aggregate
+    query), the detail validator the row timestamp.
+
+    Changes that don't touch the timestamp (queryset.update(), lines saved
+    without their document) are not seen: set-based writers must set it
+    themselves, like reserve_stock for Produit, whose partial saves always
+    include it.
+    """
+    last_modified_field = "derniere_mise_a_jour"
+
+    def list(self, request, *args, **kwargs):
+        state = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max(self.last_modified_field), count=Count("pk"), last_pk=Max("pk"),
+        )
+        last_modified = state["last_modified"]
+        etag = make_etag(request.get_full_path(), last_modified, state["count"], state["last_pk"])
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        return set_validators(super().list(request, *args, **kwargs), etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = getattr(instance, self.last_modified_field)
+        etag = make_etag(request.get_full_path(), instance.pk, last_modified)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), etag, last_modified)
+
+
+def _stamp_etag(request, stamp):
+    return make_etag(request.get_full_path(), *stamp)
+
+
+def _finalize(request, response, served):
+    # A stale result (served while the worker recomputes it) keeps its own stamp
+    if response.status_code != 200:
+        return response
+    etag = _stamp_etag(request, served.get("stamp") or get_stamp())
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return set_validators(response, etag)
+
+
+def conditional_on_data_version(method):
+    """
+    ETag of a treasury APIView.get: the data version and the day, i.e. the
+    key of the cached result (cache_service), so no query is needed.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        etag = _stamp_etag(request, get_stamp())
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        with track_served_stamp() as served:
+            response = method(self, request, *args, **kwargs)
+        return _finalize(request, response, served)
+    return wrapper
+
+
+def aconditional_on_data_version(view):
+    """conditional_on_data_version for the async function views."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        etag = _stamp_etag(request, await sync_to_async(get_stamp)())
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+        with track_served_stamp() as served:
+            response = await view(request, *args, **kwargs)
+        return await sync_to_async(_finalize)(request, response, served)
+    return wrapper
@@ -0,0 +1,61 @@
+import atexit
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+# Correlation id of the current request, "-" outside of a request
+_correlation_id = ContextVar("correlation_id", default="-")
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+def set_correlation_id(value=None):
+    """Sets (or generates) the correlation id; returns a token for reset_correlation_id."""
+    return _correlation_id.set(value or uuid.uuid4().hex[:12])
+
+
+def reset_correlation_id(token):
+    _correlation_id.reset(token)
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Adds record.correlation_id; runs in the caller thread, before the queue."""
+
+    def filter(self, record):
+        record.correlation_id = get_correlation_id()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a `rate` fraction of the records below WARNING."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class QueueListenerHandler(QueueHandler):
+    """
+    Prepares the records on the calling thread (QueueHandler.prepare merges
+    the message with its args and exception text) and enqueues them; a
+    QueueListener thread applies the output format and does the blocking
+    write to stdout.
+    """
+
+    def __init__(self, format=None, datefmt=None):
+        super().__init__(queue.SimpleQueue())
+        target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(logging.Formatter(format, datefmt))
+        self.listener = QueueListener(self.queue, target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
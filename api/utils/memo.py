@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# {key: result} for the current request, None outside of request_memo()
+_request_memo = ContextVar("request_memo", default=None)
+
+
+@contextmanager
+def request_memo():
+    """Memoizes the @memoized functions until the end of the block."""
+    token = _request_memo.set({})
+    try:
+        yield
+    finally:
+        _request_memo.reset(token)
+
+
+def clear_request_memo():
+    memo = _request_memo.get()
+    if memo is not None:
+        memo.clear()
+
+
+def memoized(func):
+    """
+    Caches the result of func by its arguments inside request_memo();
+    outside of it func is simply called.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        memo = _request_memo.get()
+        if memo is None:
+            return func(*args, **kwargs)
+        key = (func.__module__, func.__qualname__, repr(args), repr(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = func(*args, **kwargs)
+        return memo[key]
+    return wrapper
@@ -0,0 +1,72 @@
+import threading
+import time
+from django.conf import settings
+
+_lock = threading.Lock()
+# {url name: {"requests", "queries", "max_queries", "time_ms", "max_time_ms", "overruns"}}
+_stats = {}
+# Stats entry of the requests that resolved to no view (404...): one bucket, not one per path
+UNRESOLVED = "<unresolved>"
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """connection.execute_wrapper() counting the queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+def get_budget(name):
+    return getattr(settings, "QUERY_BUDGETS", {}).get(name, getattr(settings, "QUERY_BUDGET_DEFAULT", None))
+
+
+def record(name, count, duration, overrun):
+    time_ms = duration * 1000
+    with _lock:
+        entry = _stats.setdefault(name, {
+            "requests": 0, "queries": 0, "max_queries": 0,
+            "time_ms": 0.0, "max_time_ms": 0.0, "overruns": 0,
+        })
+        entry["requests"] += 1
+        entry["queries"] += count
+        entry["max_queries"] = max(entry["max_queries"], count)
+        entry["time_ms"] += time_ms
+        entry["max_time_ms"] = max(entry["max_time_ms"], time_ms)
+        entry["overruns"] += int(overrun)
+
+
+def get_summary():
+    """Per endpoint stats, the worst offenders first."""
+    with _lock:
+        stats = {name: dict(entry) for name, entry in _stats.items()}
+    summary = []
+    for name, entry in stats.items():
+        summary.append({
+            "endpoint": name,
+            "budget": get_budget(name),
+            "requests": entry["requests"],
+            "avg_queries": round(entry["queries"] / entry["requests"], 1),
+            "max_queries": entry["max_queries"],
+            "avg_time_ms": round(entry["time_ms"] / entry["requests"], 2),
+            "max_time_ms": round(entry["max_time_ms"], 2),
+            "overruns": entry["overruns"],
+        })
+    return sorted(summary, key=lambda e: (-e["overruns"], -e["max_queries"]))
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
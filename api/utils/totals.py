@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# {(model label, pk): (document, update_fields)} inside defer_totals(), else None
+_deferred = ContextVar("deferred_totals", default=None)
+
+
+@contextmanager
+def defer_totals():
+    """
+    The documents passed to update_totals() inside the block (by every
+    line saved) are recalculated and saved once, when the block exits
+    without error. Nested blocks defer to the outermost one.
+    """
+    if _deferred.get() is not None:
+        yield
+        return
+    pending = {}
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    for document, update_fields in pending.values():
+        document.calculate_totals()
+        document.save(update_fields=update_fields)
+
+
+def update_totals(document, update_fields=None):
+    """document.calculate_totals() then save(update_fields), or later inside defer_totals()."""
+    pending = _deferred.get()
+    if pending is None:
+        document.calculate_totals()
+        document.save(update_fields=update_fields)
+        return
+    key = (document._meta.label, document.pk)
+    if key in pending:
+        _, previous_fields = pending[key]
+        # A full save wins over a partial one
+        if previous_fields is None or update_fields is None:
+            update_fields = None
+        else:
+            update_fields = [*previous_fields, *(f for f in update_fields if f not in previous_fields)]
+    # The last instance seen carries the latest changes of the caller
+    pending[key] = (document, update_fields)
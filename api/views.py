@@ -1,9 +1,12 @@
+import logging
 from django.forms import ValidationError
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from datetime import date, timedelta
 from django.db.models import Q
+from .utils.conditional import ConditionalGetMixin, conditional_on_data_version
+from .services.import_service import import_clients, import_produits, read_rows as read_import_rows
 from .models import Client, Produit, Entreprise, Categorie, SousCategorie
 from .serializers import (
     ClientSerializer,
@@ -22,6 +25,8 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework import viewsets, filters
 
+logger = logging.getLogger(__name__)
+
 # A supprimer
 # class MatiereViewSet(viewsets.ModelViewSet):
 #     """
@@ -174,7 +179,7 @@ from .models import Client
 from .serializers import ClientSerializer
 
 
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API pour la gestion des clients avec support de la corbeille.
     """
@@ -308,6 +313,21 @@ class ClientViewSet(viewsets.ModelViewSet):
             )
         return super().update(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_description="Importer des clients depuis un fichier CSV ou XLSX (champ file)",
+        responses={200: "Nombre de clients créés et erreurs par ligne", 400: "Fichier invalide"},
+    )
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_file(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"message": "Fichier manquant (champ file)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = read_import_rows(upload)
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(import_clients(rows))
+
 from django.utils import timezone
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -335,7 +355,7 @@ class SousCategorieViewSet(viewsets.ModelViewSet):
     queryset = SousCategorie.objects.all()
     serializer_class = SousCategorieSerializer
 
-class ProduitViewSet(viewsets.ModelViewSet):
+class ProduitViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API pour la gestion des produits.
     
@@ -479,6 +499,25 @@ class ProduitViewSet(viewsets.ModelViewSet):
             "message": f"{deleted_count} produits supprimés définitivement de la corbeille"
         })
 
+    @swagger_auto_schema(
+        operation_description="Importer des produits depuis un fichier CSV ou XLSX (champ file)",
+        responses={200: "Nombre de produits créés et erreurs par ligne", 400: "Fichier invalide"},
+    )
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_file(self, request):
+        """
+        Bulk import: the valid rows are created, the invalid ones are
+        reported with their line number
+        """
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"message": "Fichier manquant (champ file)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = read_import_rows(upload)
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(import_produits(rows))
+
     # A supprimer
     # @swagger_auto_schema(
     #     operation_description="Récupérer les produits filtrés par type de matière",
@@ -806,7 +845,7 @@ from .serializers import (
 )
 
 
-class BonRetourFournisseurViewSet(ModelViewSet):
+class BonRetourFournisseurViewSet(ConditionalGetMixin, ModelViewSet):
     queryset = BonRetourFournisseur.objects.select_related("fournisseur").prefetch_related(
         "matiere_retours__matiere"
     )
@@ -1153,110 +1192,185 @@ class FichePaieViewSet(viewsets.ModelViewSet):
 # Tresorerie
 from rest_framework.permissions import IsAuthenticated
 from .services.kpi_service import compute_kpis
-from .services.schedule_service import get_schedule
+from .services.schedule_service import get_schedule, SCHEDULE_TYPES
 from .services.traite_service import get_all_traites
-from .services.period_service import (compute_encaissement_trend, compute_decaissement_trend, compute_resultat_net_trend, compute_traites_fournisseurs_trend, compute_traites_clients_trend, compute_echues_total_and_count_with_trend)
-from .services.chart_data import compute_chart_data
-from .utils.dates import get_period_range
+from .services.period_service import (compute_period_summary, compute_encaissement_trend, compute_decaissement_trend, compute_resultat_net_trend, compute_traites_fournisseurs_trend, compute_traites_clients_trend, compute_echues_total_and_count_with_trend, compare_periods, PERIOD_GRANULARITIES)
+from .services.chart_data import get_chart_series, CHART_GRANULARITIES
 from .services.kpi_service import compute_kpis
-from .services.traite_service import get_all_traites
+from .services.traite_service import get_all_traites, get_traites_feed, FEED_TYPES, FEED_ETATS
+from .services.cache_service import get_or_compute, get_or_serve_stale
+from .services.precompute_service import EVOLUTION_WINDOWS, PERIODS
+from .services.forecast_service import compute_forecast, FORECAST_DAYS
+from .services.transaction_service import get_journal
+from .models import Transaction
+from .utils.query_budget import get_summary as get_query_budget_summary
 
 class PeriodView(APIView):
+    @conditional_on_data_version
     def get(self, request):
         period = request.query_params.get("period", "week")
-        range_func, label = get_period_range(period)
-        start_date, end_date = range_func()
-        kpiData = compute_kpis(evolution_weeks=4, range_func=range_func)
-        traites = get_all_traites(range_func=range_func, globally=False)
-
-        period_labels = {
-            "week": "Cette semaine",
-            "month": "Ce mois",
-            "quarter": "Ce trimestre",
-            "year": "Cette année"
-        }
-        label = period_labels.get(period, "Cette période")
-
-        income, income_trend = kpiData["income"]["value"], kpiData["income"]["trend"]
-        expense, expense_trend =  kpiData["expense"]["value"],  kpiData["income"]["trend"]
-        net, net_trend =  kpiData["balance"]["value"],  kpiData["balance"]["trend"]
-        traites_fournisseurs, traites_trend = [t for t in traites["traites"] if t["type"] == "fournisseur"], traites["stats"]["fournisseurs"]["trend"]
-        traites_clients, traites_clients_trend = [t for t in traites["traites"] if t["type"] == "client"], traites["stats"]["clients"]["trend"]
-        echues_total, echues_count, echues_trend = [t for t in traites["traites"] if t["etat"] == "echu"], traites["stats"]["echues"]["trend"], traites["stats"]["echues"]["count"]
-        chart_data = compute_chart_data(start_date, end_date, label, period)
-
-        # income, income_trend = compute_encaissement_trend(start_date, end_date)
-        # expense, expense_trend = compute_decaissement_trend(start_date, end_date)
-        # net, net_trend = compute_resultat_net_trend(start_date, end_date)
-        # traites_fournisseurs, traites_trend = compute_traites_fournisseurs_trend(start_date, end_date)
-        # traites_clients, traites_clients_trend = compute_traites_clients_trend(start_date, end_date)
-        # echues_total, echues_count, echues_trend = compute_echues_total_and_count_with_trend(start_date, end_date)
-        # chart_data = compute_chart_data(start_date, end_date, label, period)
+        if period not in PERIODS:
+            return Response({"message": f"Période invalide: {period}"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_or_serve_stale("period", lambda: compute_period_summary(period), period))
 
-        return Response({
-            "encaissements": {
-                "value": income,
-                "trend": income_trend,
-                "positive": income_trend >= 0,
-                "label": label
-            },
-            "decaissements": {
-                "value": -expense,
-                "trend": -expense_trend,
-                "positive": False,
-                "label": label
-            },
-            "resultatNet": {
-                "value": net,
-                "trend": net_trend,
-                "positive": net_trend >= 0,
-                "label": label
-            },
-            "traitesFournisseurs": {
-                "value": traites_fournisseurs,
-                "trend": -traites_trend,
-                "positive": False,
-                "label": label
-            },
-            "traitesClients": {
-                "value": traites_clients,
-                "trend": traites_clients_trend,
-                "positive": traites_clients_trend >= 0,
-                "label": label
-            },
-            "echues": {
-                "value": echues_total,
-                "trend": echues_trend,
-                "count": echues_count,
-                "positive": False,
-                "label": label
-            },
-            "chart_data": chart_data
-        })
+class PeriodCompareView(APIView):
+    """
+    Query params: granularity (week/month/quarter/year, default month),
+    periods (number of periods, default 12).
+    """
+    permission_classes = [IsAuthenticated]
+
+    @conditional_on_data_version
+    def get(self, request):
+        granularity = request.query_params.get("granularity", "month")
+        if granularity not in PERIOD_GRANULARITIES:
+            return Response({"message": f"Granularité invalide: {granularity}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            count = max(1, min(int(request.query_params.get("periods", 12)), 60))
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = get_or_compute("period_compare", lambda: compare_periods(granularity, count), granularity, count)
+        return Response(data)
 
 class TraiteView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_data_version
     def get(self, request):
-        data = get_all_traites()
-        print("Traites data:", data) 
+        data = get_or_serve_stale("traites", get_all_traites)
+        logger.debug("Traites: %d rows", len(data["traites"]))
         return Response(data)
 
+class TraiteFeedView(APIView):
+    """
+    Paginated feed of client and fournisseur traites ordered by échéance.
+    Query params: cursor, limit, type (client/fournisseur),
+    etat (paye/echu/en-cours), date_from, date_to (YYYY-MM-DD).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        feed_type = params.get("type") or None
+        etat = params.get("etat") or None
+        if feed_type and feed_type not in FEED_TYPES:
+            return Response({"message": f"Type invalide: {feed_type}"}, status=status.HTTP_400_BAD_REQUEST)
+        if etat and etat not in FEED_ETATS:
+            return Response({"message": f"Etat invalide: {etat}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(params.get("limit", 50)), 500))
+            date_from = date.fromisoformat(params["date_from"]) if params.get("date_from") else None
+            date_to = date.fromisoformat(params["date_to"]) if params.get("date_to") else None
+            data = get_traites_feed(
+                cursor=params.get("cursor"), limit=limit, feed_type=feed_type,
+                etat=etat, date_from=date_from, date_to=date_to,
+            )
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+class ForecastView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @conditional_on_data_version
+    def get(self, request):
+        try:
+            days = max(1, min(int(request.query_params.get("days", FORECAST_DAYS)), 3 * FORECAST_DAYS))
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_or_compute("forecast", lambda: compute_forecast(days), days))
+
+class ChartSeriesView(APIView):
+    """
+    Income / expense / balance series for chart.js.
+    Query params: granularity (day/week/month/quarter, default week),
+    start, end (YYYY-MM-DD, default the last 12 weeks).
+    """
+    permission_classes = [IsAuthenticated]
+
+    @conditional_on_data_version
+    def get(self, request):
+        params = request.query_params
+        granularity = params.get("granularity", "week")
+        if granularity not in CHART_GRANULARITIES:
+            return Response({"message": f"Granularité invalide: {granularity}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            end_date = date.fromisoformat(params["end"]) if params.get("end") else date.today()
+            start_date = date.fromisoformat(params["start"]) if params.get("start") else end_date - timedelta(weeks=12)
+            data = get_or_compute(
+                "chart_series", lambda: get_chart_series(granularity, start_date, end_date),
+                granularity, start_date, end_date,
+            )
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+class TransactionJournalView(APIView):
+    """
+    Journal of every cash-moving document (Transaction view).
+    Query params: date_from, date_to (YYYY-MM-DD), type (source type),
+    direction (income/expense), limit (default 100).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        source_type = params.get("type") or None
+        direction = params.get("direction") or None
+        if source_type and source_type not in dict(Transaction.SOURCE_CHOICES):
+            return Response({"message": f"Type invalide: {source_type}"}, status=status.HTTP_400_BAD_REQUEST)
+        if direction and direction not in dict(Transaction.DIRECTION_CHOICES):
+            return Response({"message": f"Direction invalide: {direction}"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(params.get("limit", 100)), 1000))
+            date_from = date.fromisoformat(params["date_from"]) if params.get("date_from") else None
+            date_to = date.fromisoformat(params["date_to"]) if params.get("date_to") else None
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_journal(
+            limit=limit, date_from=date_from, date_to=date_to, source_type=source_type, direction=direction,
+        ))
+
+class QueryBudgetView(APIView):
+    """SQL query count / DB time per endpoint since the process started."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_query_budget_summary())
+
 class KPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_on_data_version
     def get(self, request):
         evolution_weeks = request.GET.get("evolution_weeks", "30d")
-        data = compute_kpis(evolution_weeks)
+        if evolution_weeks not in EVOLUTION_WINDOWS:
+            return Response({"message": f"Fenêtre invalide: {evolution_weeks}"}, status=status.HTTP_400_BAD_REQUEST)
+        data = get_or_serve_stale("kpis", lambda: compute_kpis(evolution_weeks), evolution_weeks)
         return Response(data)
 
 class ScheduleView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        end_date = date.today() + timedelta(days=7)
-        data = get_schedule(end_date=end_date)
-        return Response(data)
+        """
+        Query params: horizon (days, default 7), type (comma separated
+        SCHEDULE_TYPES), limit.
+        """
+        try:
+            params = self.parse_params(request.GET)
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(get_schedule(**params))
+
+    @staticmethod
+    def parse_params(params):
+        types = [t for t in params.get("type", "").split(",") if t]
+        if any(t not in SCHEDULE_TYPES for t in types):
+            raise ValueError(f"Type invalide: {params.get('type')}")
+        horizon = max(0, min(int(params.get("horizon", 7)), 366))
+        limit = max(1, min(int(params["limit"]), 500)) if params.get("limit") else None
+        return {"end_date": date.today() + timedelta(days=horizon), "types": types, "limit": limit}
 
 def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -54,6 +54,14 @@ python manage.py collectstatic --noinput
 print_status "Running database migrations..."
 python manage.py migrate
 
+# 5a. Create the shared cache table (DatabaseCache, no-op when it exists)
+print_status "Creating cache table..."
+python manage.py createcachetable
+
+# 5b. Rebuild the daily treasury rollup (TresorerieJour) and the Transaction journal
+print_status "Rebuilding treasury rollup..."
+python manage.py rebuild_tresorerie
+
 # 6. Run system checks
 print_status "Running system checks..."
 python manage.py check --deploy
@@ -73,6 +81,10 @@ print_status "Restarting services..."
 # For manual gunicorn restart:
 # pkill -f gunicorn || true
 # nohup gunicorn --bind 0.0.0.0:8000 lazercut.wsgi:application &
+# The async reporting endpoints (api/async/...) only free the worker under ASGI:
+# nohup gunicorn --bind 0.0.0.0:8000 -k uvicorn.workers.UvicornWorker lazercut.asgi:application &
+# Treasury precompute worker (fills the shared cache read by the web workers):
+# nohup python manage.py precompute_tresorerie &
 
 print_warning "Please manually restart your web server (gunicorn/nginx/apache)"
 
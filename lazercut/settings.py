@@ -17,7 +17,6 @@ import os
 import dj_database_url
 
 DEBUG = os.environ.get('DEBUG', 'True') == 'True'
-print(f"DEBUG: {DEBUG}")
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -65,6 +64,7 @@ SWAGGER_SETTINGS = {
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.CorrelationIdMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -73,6 +73,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryBudgetMiddleware',
+    'api.middleware.RequestMemoMiddleware',
 ]
 CORS_ALLOW_ALL_ORIGINS = True  # For quick testing only, change to specific origins for production
 
@@ -160,7 +162,6 @@ WSGI_APPLICATION = 'lazercut.wsgi.application'
 
 
 if DEBUG:
-    print("DEBUG is True")
     # If DEBUG is True, use SQLite database
     DATABASES = {
         'default': {
@@ -179,7 +180,6 @@ if DEBUG:
 else:
     # If DEBUG is False, use PostgreSQL database
     DATABASE_URL = os.environ.get('DATABASE_URL')
-    print(f"DATABASE_URL: {DATABASE_URL}")
     if not DATABASE_URL:
         raise ValueError("DATABASE_URL environment variable not set")
 
@@ -187,6 +187,67 @@ else:
         'default': dj_database_url.parse(DATABASE_URL)
     }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The treasury KPI cache is invalidated through a version counter stored in
+# this cache, and filled by the precompute_tresorerie worker: it must be shared
+# by every process. Default: the database (python manage.py createcachetable),
+# CACHE_BACKEND / CACHE_LOCATION for redis or memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'lazercut_cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# SQL query budget per URL name, checked by api.middleware.QueryBudgetMiddleware
+# (the token authentication query included). Summary: api/query-budget/
+# The cached endpoints include the DatabaseCache round trips of a cache miss.
+QUERY_BUDGET_DEFAULT = int(os.environ.get('QUERY_BUDGET_DEFAULT', 50))
+QUERY_BUDGETS = {
+    'api:kpis': 35,
+    'api:period': 45,
+    'api:period-compare': 15,
+    'api:schedule': 5,
+    'api:traites': 15,
+    'api:traites-feed': 2,
+    'api:forecast': 20,
+    'api:chart-series': 12,
+    'api:transactions': 2,
+    'api:async-kpis': 35,
+    'api:async-period': 45,
+    'api:async-schedule': 5,
+    'api:async-traites': 15,
+}
+# Raise QueryBudgetExceeded instead of logging a warning
+QUERY_BUDGET_RAISE = os.environ.get('QUERY_BUDGET_RAISE', 'False') == 'True'
+
+# Logging: records are enqueued on the request thread and written to stdout by
+# a QueueListener thread. Debug output is dropped at the logger level unless
+# LOG_LEVEL=DEBUG; LOG_SAMPLE_RATE keeps a fraction of the records below WARNING.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'correlation_id': {'()': 'api.utils.log.CorrelationIdFilter'},
+        'sampling': {'()': 'api.utils.log.SamplingFilter', 'rate': LOG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'queue': {
+            '()': 'api.utils.log.QueueListenerHandler',
+            'format': '%(asctime)s %(levelname)s [%(correlation_id)s] %(name)s: %(message)s',
+            'filters': ['correlation_id', 'sampling'],
+        },
+    },
+    'loggers': {
+        'api': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        'lazercut': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 